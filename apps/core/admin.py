@@ -0,0 +1,10 @@
+# ==================== apps/core/admin.py ====================
+from django.contrib import admin
+from .models import Tombstone
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ['model', 'object_id', 'deleted_at']
+    list_filter = ['model']
+    readonly_fields = ['model', 'object_id', 'deleted_at']
+    ordering = ['-deleted_at']
@@ -0,0 +1,313 @@
+# ==================== apps/core/bulk.py ====================
+"""
+Création / modification / suppression en masse (outils d'administration).
+
+    POST   .../bulk/   [{...}, {...}]                 -> bulk_create
+    PATCH  .../bulk/   [{'id': 1, 'prix': 10}, ...]    -> bulk_update
+    DELETE .../bulk/   {'ids': [1, 2, 3]}
+
+Validation en mémoire avec le serializer d'écriture du viewset (ListSerializer,
+sans les UniqueValidator qui font une requête par ligne) ; l'unicité de
+`bulk_unique_fields` est vérifiée en une requête `__in`. Tout ou rien : à la
+moindre erreur, rien n'est écrit et la réponse 400 contient une erreur par
+élément (`{}` pour les éléments valides), dans l'ordre de la requête.
+
+La suppression en masse est un DELETE direct (`raw_delete`), sans le
+collecteur de Django qui charge les lignes et envoie un signal par ligne :
+les traces de suppression sont créées en un seul INSERT et `bulk_changed`
+invalide une fois pour tout le lot. Si une relation exige le collecteur
+(PROTECT, SET_NULL, enfants avec signaux), `queryset.delete()` est utilisé
+et les récepteurs post_delete ne font rien pendant `bulk_operation()`.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import models, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework.validators import UniqueValidator
+
+from .caching import invalidate
+from .models import Tombstone
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_operation():
+    """Les récepteurs de signaux par ligne testent `in_bulk_operation()` et ne font rien"""
+    previous = getattr(_state, 'active', False)
+    _state.active = True
+    try:
+        yield
+    finally:
+        _state.active = previous
+
+
+def in_bulk_operation():
+    return getattr(_state, 'active', False)
+
+
+def without_unique_validators(serializer):
+    """Retire les UniqueValidator (une requête par ligne) des champs du serializer"""
+    for field in serializer.fields.values():
+        field.validators = [
+            validator for validator in field.validators
+            if not isinstance(validator, UniqueValidator)
+        ]
+    return serializer
+
+
+def is_id(value):
+    """Identifiant entier (True / False sont des int en Python : refusés)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def raw_delete(queryset):
+    """
+    DELETE direct du queryset, enfants en CASCADE supprimés d'abord (un DELETE
+    par relation) ; retourne False sans rien supprimer si une relation exige
+    le collecteur (PROTECT, SET_NULL, enfants avec signaux ou relations)
+    """
+    model = queryset.model
+    if model._meta.many_to_many:
+        return False
+    collector = Collector(using=queryset.db)
+    children = []
+    for relation in model._meta.related_objects:
+        if relation.on_delete is models.DO_NOTHING:
+            continue
+        related = relation.related_model._base_manager.using(queryset.db).filter(
+            **{f'{relation.field.name}__in': queryset.values('pk')}
+        )
+        if relation.on_delete is not models.CASCADE or not collector.can_fast_delete(related):
+            return False
+        children.append(related)
+
+    for related in children:
+        related._raw_delete(related.db)
+    queryset._raw_delete(queryset.db)
+    return True
+
+
+class BulkMixin:
+    """
+    `bulk_create_serializer_class` / `bulk_update_serializer_class` :
+    serializers d'écriture ; `bulk_unique_fields` : champs uniques vérifiés
+    en une requête ; `prepare_bulk_instance` remplace la logique de `save()`
+    (bulk_create / bulk_update ne l'appellent pas) et peut modifier les
+    champs de `bulk_prepared_fields`, toujours écrits par bulk_update.
+    """
+    bulk_create_serializer_class = None
+    bulk_update_serializer_class = None
+    bulk_unique_fields = ()
+    bulk_prepared_fields = ()
+    bulk_max_items = 10000
+    bulk_batch_size = 1000
+
+    def prepare_bulk_instance(self, instance):
+        return instance
+
+    def bulk_snapshot(self, ids):
+        """Appelé avant modification / suppression, lignes verrouillées ; le résultat est passé à `bulk_changed`"""
+        return None
+
+    def bulk_changed(self, ids=None, snapshot=None):
+        """Appelé après écriture : bulk_create / bulk_update n'envoient pas de signaux"""
+        invalidate(*self.cache_namespaces)
+
+    def bulk_error(self, message, errors=None):
+        payload = {'error': message}
+        if errors is not None:
+            payload['errors'] = errors
+        return Response(payload, status=status.HTTP_400_BAD_REQUEST)
+
+    def get_bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return None, self.bulk_error('Une liste non vide est attendue')
+        if len(items) > self.bulk_max_items:
+            return None, self.bulk_error(f'Au plus {self.bulk_max_items} éléments par requête')
+        return items, None
+
+    def validate_bulk(self, serializer_class, items, partial=False):
+        """
+        Retourne (lignes validées, erreurs par élément) : un élément invalide
+        garde dans sa ligne les champs uniques valides, pour que la
+        vérification d'unicité porte aussi sur lui
+        """
+        serializer = serializer_class(data=items, many=True, partial=partial, context=self.get_serializer_context())
+        child = without_unique_validators(serializer.child)
+        rows, errors = [], []
+        for item in items:
+            try:
+                rows.append(child.run_validation(item))
+                errors.append({})
+            except ValidationError as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {'non_field_errors': exc.detail}
+                errors.append(dict(detail))
+                rows.append(self.valid_unique_values(child, item, detail))
+        return rows, errors
+
+    def valid_unique_values(self, child, item, errors):
+        values = {}
+        if not isinstance(item, dict):
+            return values
+        for field in self.bulk_unique_fields:
+            if field in item and field not in errors:
+                try:
+                    values[field] = child.fields[field].run_validation(item[field])
+                except ValidationError:
+                    pass
+        return values
+
+    def validate_bulk_items(self, serializer_class, items, partial=False, exclude_ids=()):
+        """Validation des champs puis unicité, toujours vérifiée : retourne (lignes, erreurs ou None)"""
+        rows, errors = self.validate_bulk(serializer_class, items, partial=partial)
+        for index, unique_errors in enumerate(self.check_bulk_unique(rows, exclude_ids) or ()):
+            for field, messages in unique_errors.items():
+                errors[index].setdefault(field, messages)
+        return rows, errors if any(errors) else None
+
+    def check_bulk_unique(self, rows, exclude_ids=()):
+        """Doublons dans la requête et en base (une requête par champ unique)"""
+        errors = [{} for _ in rows]
+        model = self.get_queryset().model
+        for field in self.bulk_unique_fields:
+            values = {}
+            for index, row in enumerate(rows):
+                if field in row:
+                    values.setdefault(row[field], []).append(index)
+
+            existing = set(
+                model.objects.filter(**{f'{field}__in': list(values)})
+                .exclude(pk__in=list(exclude_ids))
+                .values_list(field, flat=True)
+            ) if values else set()
+
+            for value, indexes in values.items():
+                if value in existing or len(indexes) > 1:
+                    for index in indexes:
+                        errors[index][field] = ['Cette valeur existe déjà.' if value in existing
+                                                else 'Valeur en double dans la requête.']
+        return errors if any(errors) else None
+
+    @swagger_auto_schema(
+        methods=['post'],
+        operation_description="Création en masse (tout ou rien, erreurs par élément)",
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+    )
+    @swagger_auto_schema(
+        methods=['patch'],
+        operation_description="Modification en masse : chaque élément contient son id et les champs à modifier",
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+    )
+    @swagger_auto_schema(
+        methods=['delete'],
+        operation_description="Suppression en masse : {'ids': [...]}",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER))},
+        ),
+    )
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_destroy(request)
+
+    def bulk_create(self, request):
+        items, error = self.get_bulk_items(request)
+        if error:
+            return error
+
+        rows, errors = self.validate_bulk_items(self.bulk_create_serializer_class, items)
+        if errors:
+            return self.bulk_error('Validation échouée', errors)
+
+        model = self.get_queryset().model
+        instances = [self.prepare_bulk_instance(model(**row)) for row in rows]
+        with transaction.atomic():
+            created = model.objects.bulk_create(instances, batch_size=self.bulk_batch_size)
+        self.bulk_changed([instance.pk for instance in created])
+
+        return Response(
+            {'created': len(created), 'ids': [instance.pk for instance in created]},
+            status=status.HTTP_201_CREATED
+        )
+
+    def bulk_update(self, request):
+        items, error = self.get_bulk_items(request)
+        if error:
+            return error
+
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        if not all(is_id(pk) for pk in ids):
+            return self.bulk_error('Chaque élément doit contenir un id entier')
+        if len(set(ids)) != len(ids):
+            return self.bulk_error('Un même id apparaît plusieurs fois')
+
+        rows, errors = self.validate_bulk_items(
+            self.bulk_update_serializer_class, items, partial=True, exclude_ids=ids
+        )
+        if errors:
+            return self.bulk_error('Validation échouée', errors)
+
+        model = self.get_queryset().model
+        with transaction.atomic():
+            instances = model.objects.select_for_update().in_bulk(ids)
+            missing = [pk for pk in ids if pk not in instances]
+            if missing:
+                return Response(
+                    {'error': 'Éléments introuvables', 'missing': missing},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            snapshot = self.bulk_snapshot(ids)
+
+            now = timezone.now()
+            fields = {'updated_at', *self.bulk_prepared_fields}
+            for pk, row in zip(ids, rows):
+                instance = instances[pk]
+                for field, value in row.items():
+                    setattr(instance, field, value)
+                    fields.add(field)
+                instance.updated_at = now
+                self.prepare_bulk_instance(instance)
+            model.objects.bulk_update(
+                [instances[pk] for pk in ids], sorted(fields), batch_size=self.bulk_batch_size
+            )
+        self.bulk_changed(ids, snapshot)
+
+        return Response({'updated': len(ids)})
+
+    def bulk_destroy(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids or not all(is_id(pk) for pk in ids):
+            return self.bulk_error("Le paramètre ids est requis (liste d'entiers)")
+        if len(ids) > self.bulk_max_items:
+            return self.bulk_error(f'Au plus {self.bulk_max_items} éléments par requête')
+
+        model = self.get_queryset().model
+        with transaction.atomic():
+            found = set(model.objects.filter(pk__in=ids).select_for_update().values_list('pk', flat=True))
+            snapshot = self.bulk_snapshot(list(found))
+            # Traces de suppression pour la synchro en un INSERT
+            Tombstone.objects.bulk_create(
+                [Tombstone(model=model._meta.label_lower, object_id=pk) for pk in found],
+                batch_size=self.bulk_batch_size,
+            )
+            queryset = model._base_manager.filter(pk__in=found)
+            if not raw_delete(queryset):
+                with bulk_operation():
+                    queryset.delete()
+        self.bulk_changed(list(found), snapshot)
+
+        return Response({'deleted': len(found), 'missing': [pk for pk in ids if pk not in found]})
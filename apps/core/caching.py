@@ -0,0 +1,151 @@
+# ==================== apps/core/caching.py ====================
+"""
+Cache des réponses GET de l'API (corps déjà rendu), à clés versionnées.
+
+Chaque clé contient la version courante des espaces de noms dont dépend la
+vue ('products', 'suppliers'...). Les signaux save/delete des modèles
+incrémentent ces versions : les anciennes entrées ne sont plus jamais lues
+et expirent d'elles-mêmes.
+
+Les versions doivent être partagées par tous les workers gunicorn :
+CACHE_URL doit pointer vers un backend partagé (Redis, Memcached). Avec le
+cache mémoire local (LocMemCache, défaut), une écriture ne serait vue que
+par le worker qui l'a traitée : le cache des réponses est alors désactivé,
+sauf API_CACHE_ALLOW_LOCAL=True (un seul processus, ex: runserver), et
+aucune version n'est lue pour les réponses. Les URLs redis:// utilisent le
+client `redis` (requirements.txt).
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:{}'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+
+def is_shared_cache(cache=None):
+    """Vrai si le backend est commun à tous les processus (versions visibles de tous les workers)"""
+    return not isinstance(cache or _cache(), (LocMemCache, DummyCache))
+
+
+def response_cache_enabled():
+    if _timeout() <= 0:
+        return False
+    return is_shared_cache() or getattr(settings, 'API_CACHE_ALLOW_LOCAL', False)
+
+
+def _new_version():
+    # Une version recréée après éviction ne réutilise jamais une ancienne valeur
+    return int(time.time() * 1000)
+
+
+def _record(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    """Compteurs hit/miss du worker courant"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def get_versions(namespaces):
+    cache = _cache()
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_version(), None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump_versions(*namespaces):
+    cache = _cache()
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def invalidate(*namespaces):
+    """Invalide les réponses en cache, maintenant et après le commit en cours"""
+    bump_versions(*namespaces)
+    transaction.on_commit(lambda: bump_versions(*namespaces))
+
+
+class CachedResponseMixin:
+    """
+    Met en cache les réponses de `list` et `retrieve` d'un ViewSet.
+    Les autres actions GET peuvent passer par `cached_response()`.
+    """
+    cache_namespaces = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def get_response_cache_key(self, request):
+        params = sorted((key, request.query_params.getlist(key)) for key in request.query_params)
+        raw = repr((
+            self.basename, self.action, sorted(self.kwargs.items()),
+            request.scheme, request.get_host(), request.path, params,
+            request.accepted_media_type, get_versions(self.cache_namespaces),
+            getattr(self, 'response_validator', None),
+        ))
+        return RESPONSE_KEY.format(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        self._response_cache_key = None
+        # Cache désactivé : aucun accès au backend (ni version, ni réponse).
+        # L'API navigable (HTML) dépend de l'utilisateur : jamais mise en cache
+        if not response_cache_enabled() or request.method != 'GET' or request.accepted_renderer.format == 'api':
+            return handler(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        cached = _cache().get(key)
+        if cached is not None:
+            _record('hits')
+            status_code, content_type, content = cached
+            response = HttpResponse(content, status=status_code, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _record('misses')
+        response = handler(request, *args, **kwargs)
+        response['X-Cache'] = 'MISS'
+        self._response_cache_key = key
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, '_response_cache_key', None)
+        if key and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            _cache().set(key, (response.status_code, response['Content-Type'], response.content), _timeout())
+        return response
@@ -0,0 +1,19 @@
+# ==================== apps/core/checks.py ====================
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .caching import is_shared_cache
+
+
+@register(deploy=True)
+def api_cache_check(app_configs, **kwargs):
+    """Cache des réponses désactivé tant que le backend n'est pas partagé entre workers (check --deploy)"""
+    if getattr(settings, 'API_CACHE_TIMEOUT', 300) <= 0 or getattr(settings, 'API_CACHE_ALLOW_LOCAL', False):
+        return []
+    if is_shared_cache():
+        return []
+    return [Warning(
+        "Cache des réponses API désactivé : le backend de cache est local au processus.",
+        hint="Définir CACHE_URL (ex: redis://...) ou API_CACHE_ALLOW_LOCAL=True pour un seul processus.",
+        id='core.W001',
+    )]
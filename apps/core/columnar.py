@@ -0,0 +1,88 @@
+# ==================== apps/core/columnar.py ====================
+"""
+Format colonnes pour les gros téléchargements de listes (ex: caisse qui
+synchronise tout le catalogue).
+
+    GET /api/products/?format=columnar     (JSON)
+    GET /api/products/?format=msgpack      (MessagePack, si installé)
+
+Chaque clé n'apparaît qu'une fois : `results` devient
+{'rows': n, 'columns': {champ: [valeurs...]}}. Les colonnes très répétitives
+(`columnar_dictionary_fields` du viewset : catégorie, devise, pays...) sont
+encodées par dictionnaire : {'dictionary': [valeurs distinctes], 'codes': [indices]}.
+Les champs de pagination (count, next...) sont conservés tels quels.
+"""
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .renderers import ORJSONRenderer
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dépend de l'installation
+    msgpack = None
+
+
+def to_columnar(rows, dictionary_fields=()):
+    names = list(rows[0]) if rows else []
+    columns = {}
+    for name in names:
+        values = [row[name] for row in rows]
+        if name in dictionary_fields:
+            index = {}
+            codes = [index.setdefault(value, len(index)) for value in values]
+            columns[name] = {'dictionary': list(index), 'codes': codes}
+        else:
+            columns[name] = values
+    return {'rows': len(rows), 'columns': columns}
+
+
+def columnar_payload(data, renderer_context=None):
+    """Convertit une liste (paginée ou non) ; les autres réponses (erreurs...) restent inchangées"""
+    view = (renderer_context or {}).get('view')
+    dictionary_fields = getattr(view, 'columnar_dictionary_fields', ())
+    if isinstance(data, list):
+        return to_columnar(data, dictionary_fields)
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        payload = dict(data)
+        payload['results'] = to_columnar(data['results'], dictionary_fields)
+        return payload
+    return data
+
+
+class ColumnarJSONRenderer(ORJSONRenderer):
+    media_type = 'application/vnd.perfum.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(columnar_payload(data, renderer_context), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Nécessite le paquet msgpack (sinon ?format=msgpack n'est pas proposé)"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(
+            columnar_payload(data, renderer_context),
+            default=JSONEncoder().default,
+            use_bin_type=True,
+        )
+
+
+class ColumnarMixin:
+    """Ajoute les rendus colonnes (JSON et MessagePack) à l'action `list`"""
+    columnar_dictionary_fields = ()
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == 'list':
+            renderers.append(ColumnarJSONRenderer())
+            if msgpack is not None:
+                renderers.append(MessagePackRenderer())
+        return renderers
@@ -0,0 +1,112 @@
+# ==================== apps/core/conditional.py ====================
+"""
+GET conditionnels (ETag / Last-Modified) pour les ViewSets.
+
+Les validateurs viennent d'une sonde agrégée bon marché, en une seule requête :
+- liste : MAX(updated_at) et COUNT(*) du queryset filtré (le COUNT détecte
+  les suppressions dans l'ETag) ; Last-Modified prend aussi la dernière
+  trace de suppression du modèle, que MAX(updated_at) ne voit pas
+- détail : updated_at de l'objet
+- les deux : les sous-requêtes de `get_probe_annotations` (données d'autres
+  tables qui entrent dans la représentation, ex. taux de change)
+Si le client présente un If-None-Match / If-Modified-Since à jour, la vue
+répond 304 (GET comme HEAD) sans requête principale, sans sérialisation et
+sans corps.
+
+L'ETag calculé fait partie de la clé du cache des réponses
+(`response_validator`, apps/core/caching.py) : une entrée en cache ne peut
+être servie qu'avec l'état de la base qu'elle représente.
+"""
+import hashlib
+
+from django.db.models import Count, Max, Subquery, Value
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Tombstone
+
+
+def scalar_subquery(queryset, aggregate):
+    """Sous-requête scalaire `SELECT <agrégat> FROM ...` (toujours une ligne), utilisable dans la sonde"""
+    return Subquery(
+        queryset.order_by().annotate(_probe=Value(1)).values('_probe')
+        .annotate(value=aggregate).values('value')
+    )
+
+
+class ConditionalGetMixin:
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.get_list_validators, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.get_detail_validators, super().retrieve, *args, **kwargs)
+
+    def get_etag_extra(self):
+        """Données hors queryset, déjà en mémoire, qui influencent la représentation"""
+        return None
+
+    def get_probe_annotations(self):
+        """{nom: scalar_subquery(...)} : données en base hors queryset, lues par la sonde et ajoutées à l'ETag"""
+        return {}
+
+    def get_list_validators(self):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        extra = self.get_probe_annotations()
+        # Sous-requêtes non corrélées : évaluées une fois, MAX() les admet dans l'agrégat
+        # (NULL pour une liste vide : l'ETag change quand même via COUNT)
+        probe = queryset.aggregate(
+            last_modified=Max('updated_at'),
+            total=Count('pk'),
+            deleted=Max(scalar_subquery(
+                Tombstone.objects.filter(model=queryset.model._meta.label_lower), Max('deleted_at')
+            )),
+            **{name: Max(expression) for name, expression in extra.items()},
+        )
+        last_modified = max(filter(None, (probe['last_modified'], probe['deleted'])), default=None)
+        return last_modified, (probe['last_modified'], probe['total'], *(probe[name] for name in extra))
+
+    def get_detail_validators(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        extra = self.get_probe_annotations()
+        row = (
+            self.get_queryset()
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .annotate(**extra)
+            .values_list('updated_at', *extra)
+            .first()
+        )
+        if row is None:
+            return None, None
+        return row[0], row
+
+    def make_etag(self, request, state):
+        params = sorted((key, request.query_params.getlist(key)) for key in request.query_params)
+        raw = repr((
+            self.basename, self.action, state, self.get_etag_extra(),
+            request.get_host(), request.path, params, request.accepted_media_type,
+        ))
+        return '"%s"' % hashlib.sha1(raw.encode(), usedforsecurity=False).hexdigest()
+
+    def conditional_response(self, request, get_validators, handler, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+
+        last_modified, state = get_validators()
+        if last_modified is None and self.action == 'retrieve':
+            # Objet introuvable : laisser la vue répondre 404
+            return handler(request, *args, **kwargs)
+
+        etag = self.make_etag(request, state)
+        # Clé du cache des réponses : jamais de corps en cache d'un autre état que celui de l'ETag
+        self.response_validator = etag
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,145 @@
+# ==================== apps/core/fastread.py ====================
+"""
+Lecture rapide des listes : dictionnaires construits depuis `.values()` et
+rendus avec orjson, sans instances de modèle ni ModelSerializer.
+
+Activée par viewset via API_FAST_READ_VIEWSETS (basenames du routeur, ex:
+['product', 'supplier']). La sortie reste identique à celle du serializer :
+mêmes champs et même ordre (y compris ?fields= / ?omit=), mêmes formats de
+date ; les champs calculés sont ajoutés par `transform_fast_row`, avec le
+contexte du serializer construit une seule fois pour la requête.
+"""
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.encoding import is_protected_type
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .renderers import ORJSONRenderer
+
+# Champs DRF dont la représentation est la valeur Python telle que lue en base
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.FloatField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.JSONField,
+)
+
+
+def field_converter(field):
+    """None si la valeur brute est déjà au bon format, sinon la conversion du champ DRF"""
+    if isinstance(field, PASSTHROUGH_FIELDS) and not isinstance(field, serializers.DecimalField):
+        return None
+    if isinstance(field, serializers.ModelField):
+        # ModelField lit l'instance : value_to_string sur un objet minimal portant la valeur
+        model_field = field.model_field
+
+        def convert(value):
+            if is_protected_type(value):
+                return value
+            return model_field.value_to_string(SimpleNamespace(**{model_field.attname: value}))
+        return convert
+    if isinstance(field, serializers.DateTimeField):
+        return datetime_converter(field)
+    return field.to_representation
+
+
+def datetime_converter(field):
+    """
+    DateTimeField.to_representation avec le fuseau résolu une seule fois
+    (au lieu d'une recherche du fuseau courant par valeur)
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+class FastReadMixin:
+    """
+    `list` servi depuis `.values()` quand le viewset est listé dans
+    API_FAST_READ_VIEWSETS. Les champs calculés (SerializerMethodField...)
+    sont lus en base via `field_sources` du serializer et remplis par
+    `transform_fast_row(row, fields, context)` (`context` : celui du
+    serializer, partagé par toute la page) ; les champs annotés par
+    `get_queryset` sont lus tels quels.
+    """
+
+    def use_fast_read(self):
+        return self.basename in getattr(settings, 'API_FAST_READ_VIEWSETS', ())
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if not self.use_fast_read():
+            return renderers
+        return [
+            ORJSONRenderer() if type(renderer) is JSONRenderer else renderer
+            for renderer in renderers
+        ]
+
+    def transform_fast_row(self, row, fields, context):
+        return row
+
+    def get_fast_columns(self, serializer, fields, queryset):
+        model = queryset.model
+        sources = getattr(serializer, 'field_sources', {})
+        annotations = queryset.query.annotations
+        columns = {}
+        for name in fields:
+            for column in ((name,) if name in annotations else sources.get(name, (name,))):
+                columns[column] = None
+        # Clés lues par la pagination par curseur (`pk` renommé : les lignes ont la clé 'id')
+        for key in getattr(self.pagination_class, 'keyset_ordering', ()):
+            key = key.lstrip('-')
+            columns[model._meta.pk.name if key == 'pk' else key] = None
+        return list(columns)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().list(request, *args, **kwargs)
+
+        # Serializer instancié une fois pour connaître les champs (sparse compris) et leurs formats
+        serializer = self.get_serializer()
+        context = serializer.context
+        computed = set(getattr(serializer, 'field_sources', {}))
+        fields = list(serializer.fields)
+        converters = [
+            (name, None if name in computed else field_converter(serializer.fields[name]))
+            for name in fields
+        ]
+
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.values(*self.get_fast_columns(serializer, fields, queryset))
+
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else queryset
+
+        data = []
+        for row in rows:
+            row = self.transform_fast_row(row, fields, context)
+            data.append({
+                name: (
+                    convert(row[name]) if convert is not None and row[name] is not None else row[name]
+                )
+                for name, convert in converters
+            })
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
@@ -0,0 +1,66 @@
+# apps/core/management/commands/export_catalog.py
+
+import sys
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from apps.core.export import EXPORT_WRITERS
+
+
+def get_exporters():
+    """{jeu de données: viewset} déclarés par les applications (AppConfig.exporters)"""
+    exporters = {}
+    for config in apps.get_app_configs():
+        exporters.update(getattr(config, 'exporters', {}))
+    return exporters
+
+
+class Command(BaseCommand):
+    help = 'Exporte les produits ou les fournisseurs en CSV / NDJSON (en flux, mémoire constante)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'dataset',
+            choices=sorted(get_exporters()),
+            help='Données à exporter',
+        )
+        parser.add_argument(
+            '--output',
+            choices=list(EXPORT_WRITERS),
+            default='csv',
+            help='Format de sortie (csv par défaut)',
+        )
+        parser.add_argument(
+            '--file',
+            type=str,
+            help='Fichier de destination (sortie standard par défaut)',
+        )
+
+    def handle(self, *args, **options):
+        viewset = import_string(get_exporters()[options['dataset']])()
+        lines = viewset.stream_export(viewset.queryset.all(), options['output'])
+
+        if not options['file']:
+            for line in lines:
+                sys.stdout.write(line)
+            return
+
+        count = -1 if options['output'] == 'csv' else 0
+        try:
+            with open(options['file'], 'w', encoding='utf-8', newline='') as handle:
+                for line in lines:
+                    handle.write(line)
+                    count += 1
+        except OSError as e:
+            raise CommandError(f"Impossible d'écrire {options['file']} : {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {count} lignes exportées dans {options['file']}"
+        ))
+
+
+# UTILISATION :
+# python manage.py export_catalog products --output=csv --file=produits.csv
+# python manage.py export_catalog suppliers --output=ndjson > fournisseurs.ndjson
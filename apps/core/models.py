@@ -0,0 +1,24 @@
+# ==================== apps/core/models.py ====================
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """Trace d'une suppression, pour la synchronisation incrémentale des clients"""
+    model = models.CharField(max_length=100, help_text="Ex: products.product")
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+        verbose_name = 'Suppression'
+        verbose_name_plural = 'Suppressions'
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} supprimé le {self.deleted_at}"
+
+    @classmethod
+    def record(cls, instance):
+        return cls.objects.create(model=instance._meta.label_lower, object_id=instance.pk)
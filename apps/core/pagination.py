@@ -0,0 +1,177 @@
+# ==================== apps/core/pagination.py ====================
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par curseur (keyset) sur un ordre total, ex: ('-created_at', 'id').
+
+    Le curseur encode les valeurs de tri de la dernière ligne de la page ;
+    la page suivante est un `WHERE (clé) > (curseur) ... LIMIT n` servi par
+    un index composite : la page 1000 coûte autant que la page 1, sans COUNT(*).
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    ordering = ()
+    invalid_cursor_message = 'Curseur invalide'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.keys = [self._parse_key(key) for key in self.ordering]
+
+        queryset = queryset.order_by(*[self._order_expression(name, desc) for name, desc in self.keys])
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self._position(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        payload = json.dumps(position, default=str, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            values = json.loads(base64.urlsafe_b64decode(encoded + padding))
+            if not isinstance(values, list) or len(values) != len(self.keys):
+                raise ValueError
+            return [
+                None if value is None else self.model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.keys, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _parse_key(self, key):
+        name = key.lstrip('-')
+        if name == 'pk':
+            name = self.model._meta.pk.name
+        return name, key.startswith('-')
+
+    def _nullable(self, name):
+        return self.model._meta.get_field(name).null
+
+    def _order_expression(self, name, descending):
+        # Ordre des NULL explicite et identique à celui d'un index btree Postgres
+        if not self._nullable(name):
+            return f'-{name}' if descending else name
+        if descending:
+            return F(name).desc(nulls_first=True)
+        return F(name).asc(nulls_last=True)
+
+    def _position(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.keys]
+        return [getattr(row, name) for name, _ in self.keys]
+
+    def _beyond(self, name, descending, value):
+        """Lignes strictement après `value` pour une colonne de la clé"""
+        nullable = self._nullable(name)
+        if value is None:
+            # NULL est en fin d'ordre croissant et en tête d'ordre décroissant
+            return Q(**{f'{name}__isnull': False}) if descending else Q(pk__in=[])
+        condition = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+        if nullable and not descending:
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+
+    def _after(self, position):
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(self.keys, position):
+            condition |= equal & self._beyond(name, descending, value)
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+
+        # Borne redondante sur la première colonne : permet un Index Scan qui
+        # démarre directement au curseur au lieu de filtrer depuis le début
+        name, descending = self.keys[0]
+        if position[0] is not None and not self._nullable(name):
+            condition &= Q(**{f'{name}__lte' if descending else f'{name}__gte': position[0]})
+        return condition
+
+
+class CatalogPagination(PageNumberPagination):
+    """
+    Pagination par numéro de page (par défaut) avec un mode curseur opt-in :
+    dès que `?cursor=` est présent (vide pour la première page), la liste est
+    paginée en keyset sur `keyset_ordering`, sans COUNT(*) ni OFFSET.
+    """
+    keyset_ordering = ()
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_ordering and self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination()
+            self.keyset.ordering = self.keyset_ordering
+            self.keyset.cursor_query_param = self.cursor_query_param
+            self.display_page_controls = False
+            return self.keyset.paginate_queryset(queryset, request, view=view)
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return None
+        return super().get_previous_link()
@@ -0,0 +1,35 @@
+# ==================== apps/core/renderers.py ====================
+"""
+Rendu JSON avec orjson (dépendance optionnelle).
+
+Même sortie que `rest_framework.renderers.JSONRenderer` (compact, UTF-8,
+\\u2028/\\u2029 échappés, dates via l'encodeur DRF) mais plusieurs fois plus
+rapide. Sans orjson, ou pour un rendu indenté, le rendu DRF standard est utilisé.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'installation
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Dates laissées à l'encodeur DRF : millisecondes et suffixe 'Z' identiques
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
@@ -0,0 +1,107 @@
+# ==================== apps/core/sparse.py ====================
+"""
+Sélection dynamique des champs (sparse fieldsets) sur les lectures.
+
+    GET /api/products/?fields=code,nom_parfum,prix,image_url
+    GET /api/suppliers/?omit=created_at,updated_at
+
+Le serializer ne garde que les champs demandés (les SerializerMethodField
+écartés ne sont jamais appelés) et la vue restreint le SELECT avec `.only()`
+aux colonnes nécessaires, déclarées dans `field_sources` pour les champs
+calculés. Les clés de curseur de la pagination de l'action sont toujours
+chargées : `pagination_class`, ou `<action>_pagination_class` pour une
+action paginée autrement (ex: `sync_pagination_class`, apps/core/sync.py).
+"""
+from rest_framework import permissions
+from rest_framework.exceptions import ParseError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _names(request, param):
+    raw = request.query_params.get(param)
+    if raw is None:
+        return None
+    return [name.strip() for name in raw.split(',') if name.strip()]
+
+
+def selected_fields(request, available):
+    """
+    Champs à rendre d'après ?fields= / ?omit=, dans l'ordre de `available` ;
+    None si aucun paramètre n'est fourni
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return None
+    fields = _names(request, FIELDS_PARAM)
+    omit = _names(request, OMIT_PARAM)
+    if fields is None and omit is None:
+        return None
+
+    unknown = sorted((set(fields or []) | set(omit or [])) - set(available))
+    if unknown:
+        raise ParseError({'error': f"Champs inconnus : {', '.join(unknown)}"})
+
+    kept = set(available if fields is None else fields) - set(omit or [])
+    return [name for name in available if name in kept]
+
+
+def keyset_columns(pagination_class):
+    """Colonnes des clés de curseur d'une classe de pagination (lues en Python)"""
+    ordering = (
+        getattr(pagination_class, 'keyset_ordering', None)
+        or getattr(pagination_class, 'ordering', None)
+        or ()
+    )
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+    return [key.lstrip('-') for key in ordering]
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer de lecture limité aux champs demandés dans la requête du contexte.
+
+    `field_sources` : {champ calculé: colonnes du modèle nécessaires} ; les
+    autres champs correspondent à la colonne de même nom.
+    """
+    field_sources = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = selected_fields(self.context.get('request'), list(self.fields))
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+    @classmethod
+    def sparse_columns(cls, request):
+        """Colonnes à charger pour la requête, ou None pour toutes"""
+        selected = selected_fields(request, list(cls.Meta.fields))
+        if selected is None:
+            return None
+        columns = []
+        for name in selected:
+            for column in cls.field_sources.get(name, (name,)):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+
+class SparseFieldsetMixin:
+    """Restreint le SELECT des lectures aux colonnes des champs demandés"""
+    sparse_actions = ('list', 'retrieve', 'sync')
+
+    def get_sparse_required_columns(self):
+        # Clés lues en Python par la pagination par curseur de l'action
+        pagination_class = getattr(self, f'{self.action}_pagination_class', None) or self.pagination_class
+        return ['pk'] + keyset_columns(pagination_class)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if self.action in self.sparse_actions and hasattr(serializer_class, 'sparse_columns'):
+            columns = serializer_class.sparse_columns(self.request)
+            if columns is not None:
+                queryset = queryset.only(*dict.fromkeys(columns + self.get_sparse_required_columns()))
+        return queryset
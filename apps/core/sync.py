@@ -0,0 +1,110 @@
+# ==================== apps/core/sync.py ====================
+"""
+Synchronisation incrémentale (delta-sync) pour les clients qui gardent une
+copie locale du catalogue.
+
+GET .../sync/?updated_since=<ISO 8601> renvoie les lignes modifiées depuis
+cette date (paginées par curseur sur (updated_at, id)) et, sur la première
+page, les ids supprimés (Tombstone). Le client conserve `next_updated_since`
+pour son prochain appel ; sans `updated_since`, tout est renvoyé.
+
+`next_updated_since` est en UTC avec le suffixe `Z` : recopié tel quel dans
+une URL, il ne contient pas de `+` (décodé en espace). Une date reçue avec
+un décalage dont le `+` est devenu une espace ("...T10:00:00 00:00") est
+quand même acceptée.
+"""
+import re
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .models import Tombstone
+from .pagination import KeysetPagination
+
+
+# "+HH:MM" décodé en " HH:MM" par une URL non encodée
+_DECODED_OFFSET_RE = re.compile(r' (\d{2}(?::?\d{2})?)$')
+
+
+def format_since(value):
+    """Date UTC ISO 8601 avec suffixe Z"""
+    return value.astimezone(dt_timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def parse_since(raw):
+    """Date ISO 8601 (None si invalide), y compris un décalage dont le + est devenu une espace"""
+    try:
+        since = parse_datetime(_DECODED_OFFSET_RE.sub(r'+\1', raw.strip()))
+    except ValueError:
+        return None
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+class SyncPagination(KeysetPagination):
+    ordering = ('updated_at', 'id')
+    page_size = 1000
+    max_page_size = 5000
+
+
+class SyncMixin:
+    sync_pagination_class = SyncPagination
+
+    @swagger_auto_schema(
+        operation_description="Synchronisation incrémentale : lignes modifiées et ids supprimés depuis une date",
+        manual_parameters=[
+            openapi.Parameter('updated_since', openapi.IN_QUERY, 
+                            description="Date ISO 8601 (valeur next_updated_since du dernier appel)", 
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, 
+                            description="Page suivante des modifications", 
+                            type=openapi.TYPE_STRING),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Lignes modifiées et supprimées depuis `updated_since`"""
+        since = None
+        raw_since = request.query_params.get('updated_since')
+        if raw_since:
+            since = parse_since(raw_since)
+            if since is None:
+                return Response(
+                    {'error': 'Le paramètre updated_since doit être une date ISO 8601'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        # Marge pour les transactions validées après leur updated_at
+        margin = timedelta(seconds=getattr(settings, 'SYNC_SAFETY_MARGIN', 5))
+        next_since = timezone.now() - margin
+
+        queryset = self.get_queryset()
+        if since is not None:
+            queryset = queryset.filter(updated_at__gt=since)
+
+        paginator = self.sync_pagination_class()
+        rows = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(rows, many=True)
+
+        deleted = []
+        if since is not None and paginator.cursor_query_param not in request.query_params:
+            deleted = list(
+                Tombstone.objects
+                .filter(model=queryset.model._meta.label_lower, deleted_at__gt=since)
+                .values_list('object_id', flat=True)
+            )
+
+        return Response({
+            'next_updated_since': format_since(next_since),
+            'next': paginator.get_next_link(),
+            'updated': serializer.data,
+            'deleted': deleted,
+        })
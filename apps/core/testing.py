@@ -0,0 +1,37 @@
+# ==================== apps/core/testing.py ====================
+"""
+Outils communs aux tests des applications (apps/*/tests.py).
+"""
+from django.test import override_settings
+
+
+def walk_cursor(client, url):
+    """Suit les liens `next` d'une liste paginée par curseur ; retourne les lignes dans l'ordre"""
+    rows = []
+    while url:
+        response = client.get(url, HTTP_HOST='localhost')
+        assert response.status_code == 200, response.content
+        payload = response.json()
+        rows.extend(payload['results'])
+        url = payload['next']
+    return rows
+
+
+class FastReadComparisonMixin:
+    """
+    À combiner avec TestCase : le chemin rapide (.values() + orjson) doit
+    rendre exactement les octets du serializer pour chaque URL de `urls`.
+    """
+    fast_read_basename = None
+    urls = []
+
+    def get(self, url, fast):
+        with override_settings(API_FAST_READ_VIEWSETS=[self.fast_read_basename] if fast else []):
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.content
+
+    def test_fast_path_matches_serializer(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url, fast=True), self.get(url, fast=False))
@@ -1,6 +1,13 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Product, CategoryImage
+from .cache import cloudinary_url, is_cloudinary_image
+from .models import Product, CategoryImage, ImageUpload, current_variants
+
+
+def preview_url(variants, fallback, width='160'):
+    """Miniature WebP (160px pour écrans haute densité) plutôt que l'image pleine taille"""
+    return variants.get('webp', {}).get(width) or fallback
+
 
 @admin.register(CategoryImage)
 class CategoryImageAdmin(admin.ModelAdmin):
@@ -10,10 +17,10 @@ class CategoryImageAdmin(admin.ModelAdmin):
     def image_preview(self, obj):
         """Affiche un aperçu de l'image avec gestion d'erreur"""
         try:
-            if obj.image and hasattr(obj.image, 'url'):
+            if is_cloudinary_image(obj.image):
                 return format_html(
                     '<img src="{}" style="max-height: 100px; max-width: 100px;" />',
-                    obj.image.url
+                    preview_url(current_variants(obj.image, obj.image_variants), cloudinary_url(obj.image))
                 )
         except Exception as e:
             return format_html('<span style="color: red;">Erreur: {}</span>', str(e))
@@ -49,9 +56,9 @@ class ProductAdmin(admin.ModelAdmin):
     def image_preview(self, obj):
         """Affiche un aperçu de l'image avec gestion d'erreur robuste"""
         try:
-            image_url = obj.image_url
+            image_url, source = obj.resolve_image()
             if image_url:
-                source = obj.get_image_source()
+                image_url = preview_url(obj.get_image_variants(), image_url)
                 color = '#28a745' if source == 'Produit' else '#007bff'
                 return format_html(
                     '<div style="text-align: center;">'
@@ -78,4 +85,17 @@ class ProductAdmin(admin.ModelAdmin):
                 return format_html('<span style="color: #dc3545;">✗ Aucune</span>')
         except Exception as e:
             return format_html('<span style="color: #dc3545;">Erreur</span>')
-    image_source.short_description = 'Source Image'
\ No newline at end of file
+    image_source.short_description = 'Source Image'
+
+
+@admin.register(ImageUpload)
+class ImageUploadAdmin(admin.ModelAdmin):
+    list_display = ['product', 'status', 'created_at', 'updated_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['product__code', 'product__nom_parfum']
+    readonly_fields = ['product', 'temp_file', 'status', 'error', 'created_at', 'updated_at']
+    ordering = ['-created_at']
+
+    def get_queryset(self, request):
+        # Octets du fichier reçu jamais lus par l'admin
+        return super().get_queryset(request).select_related('product').defer('data')
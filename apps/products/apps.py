@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.products'
-    verbose_name = 'Produits'
\ No newline at end of file
+    verbose_name = 'Produits'
+    # Jeux de données de la commande export_catalog (apps/core)
+    exporters = {'products': 'apps.products.views.ProductViewSet'}
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,151 @@
+# ==================== apps/products/cache.py ====================
+"""
+Cache des URLs (et variantes) d'images par défaut des catégories.
+
+Il n'existe que deux CategoryImage ('Hommes' et 'Femmes') : chaque worker garde
+les dictionnaires {catégorie: url} et {catégorie: variantes} en mémoire, optionnellement adossé au cache
+Django (CATEGORY_IMAGE_CACHE_ALIAS) pour le partager entre workers.
+Les signaux post_save/post_delete de CategoryImage invalident le cache : avec
+un cache partagé, ils incrémentent une version que chaque worker compare à
+sa copie locale au plus une fois par CATEGORY_IMAGE_VERSION_CHECK_INTERVAL
+(pas d'aller-retour réseau par lecture) ; sans cache partagé, les autres
+workers rechargent au plus tard après CATEGORY_IMAGE_CACHE_TIMEOUT.
+
+Les URLs Cloudinary sont aussi mémorisées par ressource (public_id, version,
+format…) : une nouvelle image a une nouvelle version, donc une nouvelle clé,
+et l'ancienne entrée sort simplement de l'LRU.
+"""
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+
+CACHE_KEY = 'products:category_images'
+VERSION_KEY = 'products:category_images:version'
+
+_lock = threading.Lock()
+_state = {'maps': None, 'version': None, 'expires_at': 0.0, 'checked_until': 0.0}
+
+
+@lru_cache(maxsize=getattr(settings, 'CLOUDINARY_URL_CACHE_SIZE', 50000))
+def _build_cloudinary_url(resource_type, upload_type, version, public_id, fmt):
+    from cloudinary import CloudinaryResource
+
+    return CloudinaryResource(
+        public_id=public_id, format=fmt, version=version, type=upload_type, resource_type=resource_type
+    ).url
+
+
+def is_cloudinary_image(value):
+    """
+    Valeur du champ image portant une ressource ; ne pas tester
+    `hasattr(image, 'url')` : la propriété `url` reconstruit l'URL à chaque accès
+    """
+    from cloudinary import CloudinaryResource
+
+    return isinstance(value, CloudinaryResource) and bool(value.public_id)
+
+
+def cloudinary_url(image):
+    """
+    URL d'une ressource Cloudinary, construite une seule fois par version d'image
+    (mémorisée sur l'instance et dans un LRU partagé par le worker)
+    """
+    url = getattr(image, '_cached_url', None)
+    if url is not None:
+        return url
+    if getattr(image, 'url_options', None):
+        # Options d'URL spécifiques : pas de mémorisation partagée
+        return image.url
+    url = _build_cloudinary_url(image.resource_type, image.type, image.version, image.public_id, image.format)
+    image._cached_url = url
+    return url
+
+
+def _timeout():
+    return getattr(settings, 'CATEGORY_IMAGE_CACHE_TIMEOUT', 300)
+
+
+def _check_interval():
+    return getattr(settings, 'CATEGORY_IMAGE_VERSION_CHECK_INTERVAL', 2)
+
+
+def _shared_cache():
+    alias = getattr(settings, 'CATEGORY_IMAGE_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def _shared_version(shared):
+    """Version courante dans le cache partagé (incrémentée à chaque invalidation)"""
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        shared.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = shared.get(VERSION_KEY)
+    return version
+
+
+def _get_maps():
+    """{'urls': {catégorie: url}, 'variants': {catégorie: variantes}}"""
+    shared = _shared_cache()
+    now = time.monotonic()
+    maps = _state['maps']
+    if maps is not None and now < _state['expires_at'] and (shared is None or now < _state['checked_until']):
+        return maps
+
+    # Avec un cache partagé, la version y est relue au plus une fois par
+    # intervalle : une invalidation faite par un autre worker est vue ensuite
+    version = _shared_version(shared) if shared is not None else None
+    if maps is not None and _state['version'] == version and now < _state['expires_at']:
+        _state['checked_until'] = now + _check_interval()
+        return maps
+
+    with _lock:
+        maps = _state['maps']
+        if maps is not None and _state['version'] == version and time.monotonic() < _state['expires_at']:
+            return maps
+
+        maps = None
+        if shared is not None:
+            entry = shared.get(CACHE_KEY)
+            if entry is not None and entry[0] == version:
+                maps = entry[1]
+        if maps is None:
+            from .models import CategoryImage
+            maps = CategoryImage.image_maps()
+            if shared is not None:
+                shared.set(CACHE_KEY, (version, maps), _timeout())
+
+        now = time.monotonic()
+        _state['maps'] = maps
+        _state['version'] = version
+        _state['expires_at'] = now + _timeout()
+        _state['checked_until'] = now + _check_interval()
+        return maps
+
+
+def get_category_image_urls():
+    """Retourne {catégorie: url}, sans requête tant que le cache est valide"""
+    return _get_maps()['urls']
+
+
+def get_category_image_variants():
+    """Retourne {catégorie: {format: {largeur: url}}} des images de catégorie"""
+    return _get_maps()['variants']
+
+
+def invalidate_category_image_urls():
+    """Vide le cache local et, s'il est configuré, le cache partagé"""
+    with _lock:
+        _state['maps'] = None
+        _state['expires_at'] = 0.0
+        _state['checked_until'] = 0.0
+
+    shared = _shared_cache()
+    if shared is not None:
+        try:
+            shared.incr(VERSION_KEY)
+        except ValueError:
+            shared.set(VERSION_KEY, int(time.time() * 1000), None)
+        shared.delete(CACHE_KEY)
@@ -0,0 +1,62 @@
+# ==================== apps/products/facets.py ====================
+"""
+Compteurs de facettes du catalogue (catégorie, tranches de prix, stock).
+
+Toutes les facettes sont calculées en une seule requête d'agrégation
+conditionnelle (`COUNT(*) FILTER (WHERE ...)` sous Postgres) sur le queryset
+déjà filtré par la vue, au lieu d'une requête filtrée par facette.
+"""
+import math
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import Product
+
+
+def price_bounds(raw=None):
+    """
+    Bornes des tranches de prix, triées et sans doublon : `raw` ('2000,5000')
+    ou PRODUCT_FACET_PRICE_BOUNDS. Lève ValueError si une borne est invalide.
+    """
+    if raw is None:
+        bounds = getattr(settings, 'PRODUCT_FACET_PRICE_BOUNDS', [])
+    else:
+        bounds = [float(bound) for bound in raw.split(',') if bound.strip()]
+    if any(not math.isfinite(bound) or bound < 0 for bound in bounds):
+        raise ValueError(raw)
+    return sorted({bound for bound in bounds if bound > 0})
+
+
+def price_ranges(bounds):
+    """[(min, max), ...] : [0, b1), [b1, b2), ..., [bn, +∞) ; max None pour la dernière"""
+    edges = [0] + list(bounds)
+    return list(zip(edges, edges[1:] + [None]))
+
+
+def facet_counts(queryset, bounds):
+    ranges = price_ranges(bounds)
+    aggregates = {'total': Count('pk')}
+    for index, (value, _) in enumerate(Product.CATEGORY_CHOICES):
+        aggregates[f'categorie_{index}'] = Count('pk', filter=Q(categorie=value))
+    for index, (low, high) in enumerate(ranges):
+        condition = Q(prix__gte=low) if high is None else Q(prix__gte=low, prix__lt=high)
+        aggregates[f'prix_{index}'] = Count('pk', filter=condition)
+    aggregates['in_stock'] = Count('pk', filter=Q(stock__gt=0))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+    return {
+        'count': counts['total'],
+        'categorie': [
+            {'value': value, 'label': label, 'count': counts[f'categorie_{index}']}
+            for index, (value, label) in enumerate(Product.CATEGORY_CHOICES)
+        ],
+        'prix': [
+            {'min': low, 'max': high, 'count': counts[f'prix_{index}']}
+            for index, (low, high) in enumerate(ranges)
+        ],
+        'stock': {
+            'in_stock': counts['in_stock'],
+            'out_of_stock': counts['total'] - counts['in_stock'],
+        },
+    }
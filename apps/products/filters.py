@@ -0,0 +1,34 @@
+# ==================== apps/products/filters.py ====================
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework import filters
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Recherche produits indexée (Postgres) :
+    - plein texte sur `search_vector` (config 'french', maintenu par trigger)
+    - trigrammes sur les noms et abréviations d'étiquette ("B. Chnl", "Blk. Opm")
+    - préfixe sur le code (index btree `_like` du champ unique)
+    Résultats triés par pertinence. Hors Postgres, repli sur le SearchFilter DRF.
+    """
+    search_config = 'french'
+    trigram_fields = ['nom_parfum', 'nom_etiquette']
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        text = ' '.join(terms)
+        query = SearchQuery(text, config=self.search_config, search_type='websearch')
+        condition = Q(search_vector=query) | Q(code__startswith=text)
+        rank = SearchRank(F('search_vector'), query)
+        for field in self.trigram_fields:
+            condition |= Q(**{f'{field}__trigram_word_similar': text})
+            rank = rank + TrigramWordSimilarity(text, field)
+
+        return queryset.annotate(search_rank=rank).filter(condition).order_by('-search_rank', 'id')
@@ -1,11 +1,13 @@
 # apps/products/management/commands/fix_product_images.py
 
 from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+from apps.core.caching import invalidate
 from apps.products.models import Product
-from django.db import connection
 
 class Command(BaseCommand):
-    help = 'Nettoie les images des produits de manière sécurisée'
+    help = 'Nettoie les images des produits de manière sécurisée (UPDATE ensembliste par catégorie)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -18,10 +20,27 @@ class Command(BaseCommand):
             action='store_true',
             help='Nettoyer toutes les catégories',
         )
+        parser.add_argument(
+            '--set-image',
+            type=str,
+            help='Réassigner cette image Cloudinary (ex: image/upload/v1/parfums/products/x.jpg) au lieu de vider',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Afficher le nombre de produits concernés sans rien modifier',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=0,
+            help='Traiter par lots de N produits (clé id) pour les très grandes tables ; 0 = un seul UPDATE par catégorie',
+        )
 
     def handle(self, *args, **options):
         categorie = options.get('categorie')
         all_categories = options.get('all')
+        categories = [value for value, _ in Product.CATEGORY_CHOICES]
 
         if not categorie and not all_categories:
             self.stdout.write(self.style.ERROR(
@@ -29,55 +48,85 @@ class Command(BaseCommand):
             ))
             return
 
+        if categorie and categorie not in categories:
+            self.stdout.write(self.style.ERROR(
+                f"Catégorie inconnue : {categorie} (choix : {', '.join(categories)})"
+            ))
+            return
+
         # Déterminer les catégories à traiter
-        categories_to_process = []
-        if all_categories:
-            categories_to_process = ['Hommes', 'Femmes']
-        else:
-            categories_to_process = [categorie]
+        categories_to_process = categories if all_categories else [categorie]
+        new_image = options.get('set_image')
 
-        total_updated = 0
-        total_errors = 0
+        # Comptage de toutes les catégories en une seule requête agrégée
+        counts = Product.objects.aggregate(**{
+            f'{key}_{cat}': Count('pk', filter=Q(categorie=cat) & condition)
+            for cat in categories_to_process
+            for key, condition in (('total', Q()), ('affected', self.affected_filter(new_image)))
+        })
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('🔎 Simulation (--dry-run) : aucune modification'))
+            for cat in categories_to_process:
+                self.stdout.write(
+                    f"📦 {cat} : {counts[f'affected_{cat}']} produits concernés "
+                    f"sur {counts[f'total_{cat}']}"
+                )
+            return
 
+        total_updated = 0
         for cat in categories_to_process:
             self.stdout.write(f"\n📦 Traitement catégorie: {cat}")
-            
-            products = Product.objects.filter(categorie=cat)
-            count = 0
-            errors = 0
-
-            for product in products:
-                try:
-                    # Utiliser une requête SQL directe pour éviter les problèmes Cloudinary
-                    with connection.cursor() as cursor:
-                        cursor.execute(
-                            "UPDATE products_product SET image = NULL WHERE id = %s",
-                            [product.id]
-                        )
-                    count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f"✓ {product.code} - {product.nom_parfum}")
-                    )
-                except Exception as e:
-                    errors += 1
-                    self.stdout.write(
-                        self.style.ERROR(f"✗ Erreur {product.code}: {str(e)}")
-                    )
+            try:
+                count = self.update_category(cat, new_image, options['batch_size'])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"✗ Erreur {cat}: {str(e)}"))
+                continue
 
             total_updated += count
-            total_errors += errors
-
             self.stdout.write(f"\n--- Résumé {cat} ---")
-            self.stdout.write(f"Images supprimées : {count}")
-            self.stdout.write(f"Erreurs : {errors}")
-            self.stdout.write(f"Total produits : {products.count()}")
+            self.stdout.write(f"Images {'réassignées' if new_image else 'supprimées'} : {count}")
+            self.stdout.write(f"Total produits : {counts[f'total_{cat}']}")
+
+        # QuerySet.update n'envoie pas de signaux : invalider les réponses en cache
+        if total_updated:
+            invalidate('products')
 
         self.stdout.write(self.style.SUCCESS(
-            f"\n✅ TERMINÉ - Total : {total_updated} mis à jour, {total_errors} erreurs"
+            f"\n✅ TERMINÉ - Total : {total_updated} mis à jour"
         ))
 
+    def affected_filter(self, new_image):
+        """Produits réellement modifiés : image présente, ou différente de la nouvelle"""
+        if new_image:
+            return ~Q(image=new_image)
+        return Q(image__isnull=False)
+
+    def update_category(self, cat, new_image, batch_size):
+        """Un UPDATE pour la catégorie, ou un UPDATE par lot d'ids croissants"""
+        queryset = Product.objects.filter(Q(categorie=cat) & self.affected_filter(new_image))
+        values = {'image': new_image or None, 'updated_at': timezone.now()}
+
+        if batch_size <= 0:
+            return queryset.update(**values)
+
+        count = 0
+        last_id = 0
+        while True:
+            ids = list(
+                queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return count
+            count += Product.objects.filter(pk__in=ids).update(**values)
+            last_id = ids[-1]
+            self.stdout.write(f"   … {count} produits traités")
+
 
 # UTILISATION :
 # python manage.py fix_product_images --categorie=Femmes
 # python manage.py fix_product_images --categorie=Hommes
-# python manage.py fix_product_images --all
\ No newline at end of file
+# python manage.py fix_product_images --all
+# python manage.py fix_product_images --all --dry-run
+# python manage.py fix_product_images --all --batch-size=5000
+# python manage.py fix_product_images --categorie=Femmes --set-image=image/upload/v1/parfums/products/femmes.jpg
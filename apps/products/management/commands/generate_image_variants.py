@@ -0,0 +1,106 @@
+# apps/products/management/commands/generate_image_variants.py
+
+from collections import deque
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core.caching import invalidate
+from apps.products.cache import invalidate_category_image_urls
+from apps.products.models import CategoryImage, Product, current_variants
+from apps.products.variants import make_pool, render_variants, save_variants, variant_settings
+
+
+class Command(BaseCommand):
+    help = 'Génère les miniatures WebP/AVIF (srcset) des produits et des images de catégorie'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Nombre de processus Pillow',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Régénérer même les variantes déjà à jour',
+        )
+        parser.add_argument(
+            '--categories-only',
+            action='store_true',
+            help='Ne traiter que les images de catégorie',
+        )
+
+    def handle(self, *args, **options):
+        self.options = variant_settings()
+        if not self.options['formats']:
+            self.stdout.write(self.style.ERROR('Aucun format supporté par Pillow (IMAGE_VARIANT_FORMATS)'))
+            return
+
+        self.stdout.write(self.style.WARNING(
+            f"🖼️  Formats : {', '.join(self.options['formats'])} — "
+            f"largeurs : {', '.join(map(str, self.options['widths']))}"
+        ))
+        self.force = options['force']
+        self.done = 0
+        self.errors = 0
+
+        with make_pool(options['workers']) as pool:
+            # Fenêtre bornée : au plus 2 images en vol par processus
+            self.window = max(1, options['workers']) * 2
+            self.process(pool, CategoryImage.objects.order_by('pk'), 'categories', self.save_category_image)
+            category_done = self.done
+            if not options['categories_only']:
+                products = Product.objects.filter(image__isnull=False).exclude(image='').order_by('pk')
+                self.process(pool, products.only('pk', 'image', 'image_variants'), 'products', self.save_product)
+
+        if category_done:
+            invalidate_category_image_urls()
+        if self.done:
+            invalidate('products')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ TERMINÉ - {self.done} images traitées, {self.errors} erreurs"
+        ))
+
+    def process(self, pool, queryset, prefix, save):
+        pending = deque()
+        for obj in queryset.iterator(chunk_size=500):
+            if not obj.image or (not self.force and current_variants(obj.image, obj.image_variants)):
+                continue
+            future = pool.submit(
+                render_variants, obj.image.url, self.options['widths'],
+                self.options['formats'], self.options['quality'],
+            )
+            pending.append((obj, future))
+            if len(pending) >= self.window:
+                self.collect(pending.popleft(), prefix, save)
+        while pending:
+            self.collect(pending.popleft(), prefix, save)
+
+    def collect(self, item, prefix, save):
+        obj, future = item
+        try:
+            variants = save_variants(future.result(), f'{prefix}/{obj.pk}', obj.image)
+            save(obj, variants)
+        except Exception as e:
+            self.errors += 1
+            self.stdout.write(self.style.ERROR(f"✗ {prefix} {obj.pk} : {e}"))
+            return
+        self.done += 1
+        if self.done % 100 == 0:
+            self.stdout.write(f"   … {self.done} images traitées")
+
+    def save_category_image(self, category_image, variants):
+        CategoryImage.objects.filter(pk=category_image.pk).update(image_variants=variants)
+
+    def save_product(self, product, variants):
+        # update() plutôt que save() : pas de signaux par produit, updated_at avancé pour la synchro
+        Product.objects.filter(pk=product.pk).update(image_variants=variants, updated_at=timezone.now())
+
+
+# UTILISATION :
+# python manage.py generate_image_variants
+# python manage.py generate_image_variants --workers=4
+# python manage.py generate_image_variants --categories-only --force
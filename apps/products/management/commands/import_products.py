@@ -0,0 +1,251 @@
+# apps/products/management/commands/import_products.py
+
+import csv
+import json
+import math
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.core.caching import invalidate
+from apps.products.models import Product
+from apps.products.stock import MAX_STOCK
+from apps.products.suggest import suggest_index
+
+REQUIRED_FIELDS = ['code', 'nom_parfum', 'nom_etiquette', 'categorie', 'prix']
+OPTIONAL_FIELDS = ['description', 'stock']
+CATEGORIES = {value for value, _ in Product.CATEGORY_CHOICES}
+# Longueurs lues sur le modèle : une valeur trop longue ferait échouer tout le lot (DataError)
+MAX_LENGTHS = {
+    field: Product._meta.get_field(field).max_length
+    for field in ('code', 'nom_parfum', 'nom_etiquette')
+}
+
+
+def parse_stock(value):
+    """Entier ('12', 12, 12.0) ; lève ValueError pour une valeur non entière (12.5)"""
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, int):
+        return value
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(value)
+    return int(number)
+
+
+# Les lecteurs produisent (position, enregistrement) : position réelle dans le
+# fichier ("ligne 12" : première ligne de l'enregistrement CSV, champs sur
+# plusieurs lignes compris ; "élément 3" dans un tableau JSON)
+
+def read_csv(path, delimiter):
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        reader = csv.DictReader(handle, delimiter=delimiter)
+        start = 2  # ligne 1 : en-tête
+        for record in reader:
+            yield f'ligne {start}', record
+            start = reader.line_num + 1
+
+
+def read_ndjson(path):
+    with open(path, encoding='utf-8') as handle:
+        for number, line in enumerate(handle, start=1):
+            if line.strip():
+                yield f'ligne {number}', json.loads(line)
+
+
+def read_json(path, chunk_size=1 << 16):
+    """Lit un tableau JSON d'objets au fil de l'eau, sans le charger en entier"""
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as handle:
+        buffer = handle.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise CommandError(f'{path} : un tableau JSON est attendu')
+        buffer = buffer[1:]
+        eof = False
+        index = 0
+
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise CommandError(f'{path} : JSON invalide ou tronqué')
+                chunk = handle.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            index += 1
+            yield f'élément {index}', record
+            buffer = buffer[end:]
+
+
+def clean_record(record):
+    """Retourne (valeurs, None) ou (None, message d'erreur)"""
+    if not isinstance(record, dict):
+        return None, f'objet attendu, reçu {type(record).__name__}'
+    nested = [
+        field for field in REQUIRED_FIELDS + OPTIONAL_FIELDS
+        if isinstance(record.get(field), (dict, list))
+    ]
+    if nested:
+        return None, f"valeurs non scalaires : {', '.join(nested)}"
+
+    missing = [field for field in REQUIRED_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        return None, f"champs manquants : {', '.join(missing)}"
+
+    values = {field: record[field] for field in REQUIRED_FIELDS + OPTIONAL_FIELDS if field in record}
+    for field, max_length in MAX_LENGTHS.items():
+        values[field] = str(values[field]).strip()
+        if not values[field]:
+            return None, f"champs manquants : {field}"
+        if len(values[field]) > max_length:
+            return None, f"{field} trop long ({len(values[field])} > {max_length}) : {values[field][:30]}"
+    if values['categorie'] not in CATEGORIES:
+        return None, f"catégorie inconnue : {values['categorie']}"
+
+    try:
+        values['prix'] = float(values['prix'])
+    except (TypeError, ValueError):
+        return None, 'prix non numérique'
+    if not math.isfinite(values['prix']):
+        return None, f"prix invalide : {values['prix']}"
+
+    if values.get('stock') in (None, ''):
+        values.pop('stock', None)
+    else:
+        try:
+            values['stock'] = parse_stock(values['stock'])
+        except (TypeError, ValueError, OverflowError):
+            return None, f"stock non entier : {values['stock']}"
+        if values['stock'] > MAX_STOCK:
+            return None, f"stock trop grand : {values['stock']}"
+    if values['prix'] < 0 or values.get('stock', 0) < 0:
+        return None, 'prix et stock doivent être positifs'
+
+    if values.get('description') == '':
+        values['description'] = None
+    return values, None
+
+
+class Command(BaseCommand):
+    help = 'Importe des produits depuis des fichiers CSV / JSON / NDJSON (upsert par lots sur le code)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='+',
+            help='Fichiers à importer (.csv, .json, .ndjson)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Nombre de produits par lot (une transaction par lot)',
+        )
+        parser.add_argument(
+            '--delimiter',
+            type=str,
+            default=',',
+            help='Séparateur CSV',
+        )
+
+    def read_records(self, path, delimiter):
+        suffix = Path(path).suffix.lower()
+        if suffix == '.csv':
+            return read_csv(path, delimiter)
+        if suffix in ('.ndjson', '.jsonl'):
+            return read_ndjson(path)
+        if suffix == '.json':
+            return read_json(path)
+        raise CommandError(f'Format non supporté : {path}')
+
+    def upsert(self, batch):
+        """Un INSERT ... ON CONFLICT (code) DO UPDATE par jeu de colonnes du lot"""
+        # Dernière occurrence d'un code dans le lot gagnante (ON CONFLICT refuse les doublons)
+        rows = {values['code']: values for values in batch}.values()
+
+        # Ne mettre à jour que les colonnes fournies : un stock absent n'écrase pas le stock existant
+        groups = {}
+        for values in rows:
+            groups.setdefault(frozenset(values), []).append(values)
+
+        with transaction.atomic():
+            for columns, group in groups.items():
+                Product.objects.bulk_create(
+                    [Product(**values) for values in group],
+                    update_conflicts=True,
+                    unique_fields=['code'],
+                    update_fields=sorted(columns - {'code'}) + ['updated_at'],
+                )
+        return len(rows)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size doit être positif')
+
+        self.stdout.write(self.style.WARNING('🚀 Import des produits...'))
+        started = time.perf_counter()
+        total_imported = 0
+        total_errors = 0
+        batch_number = 0
+
+        try:
+            for path in options['files']:
+                self.stdout.write(f"\n📦 Fichier : {path}")
+                batch = []
+                records = self.read_records(path, options['delimiter'])
+
+                for position, record in records:
+                    values, error = clean_record(record)
+                    if error:
+                        total_errors += 1
+                        self.stdout.write(self.style.ERROR(f"✗ {position.capitalize()} : {error}"))
+                        continue
+                    batch.append(values)
+
+                    if len(batch) >= batch_size:
+                        batch_number += 1
+                        total_imported += self.write_batch(batch_number, batch)
+                        batch = []
+
+                if batch:
+                    batch_number += 1
+                    total_imported += self.write_batch(batch_number, batch)
+        except OSError as e:
+            raise CommandError(f'Lecture impossible : {e}')
+        finally:
+            # bulk_create n'envoie pas de signaux : invalider les caches à la main
+            if total_imported:
+                invalidate('products')
+                suggest_index.invalidate()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        self.stdout.write(self.style.SUCCESS('✅ Import terminé'))
+        self.stdout.write(f'   • Produits importés (créés ou mis à jour) : {total_imported}')
+        self.stdout.write(f'   • Enregistrements rejetés : {total_errors}')
+        self.stdout.write(f'   • Durée : {elapsed:.2f} s ({total_imported / elapsed if elapsed else 0:.0f} produits/s)')
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+
+    def write_batch(self, number, batch):
+        started = time.perf_counter()
+        count = self.upsert(batch)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"   Lot {number} : {count} produits en {elapsed:.2f} s ({count / elapsed if elapsed else 0:.0f}/s)"
+        )
+        return count
+
+
+# UTILISATION :
+# python manage.py import_products catalogue.csv
+# python manage.py import_products produits.json autres.ndjson --batch-size=10000
+# python manage.py import_products export.csv --delimiter=";"
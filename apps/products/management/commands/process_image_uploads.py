@@ -0,0 +1,93 @@
+# apps/products/management/commands/process_image_uploads.py
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from apps.products.models import ImageUpload
+from apps.products.uploads import process_upload
+
+class Command(BaseCommand):
+    help = "Traite les envois d'images en attente (reprise après redémarrage ou échec)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Relancer aussi les envois en échec',
+        )
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=30,
+            help='Relancer les envois bloqués "en cours" depuis plus de N minutes',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourner en continu (processus dédié à côté de gunicorn, IMAGE_UPLOAD_QUEUE=worker)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Attente en secondes entre deux passes sans envoi en attente (avec --loop)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.process_pending(options)
+            return
+        if options['retry_failed']:
+            # Un envoi en échec permanent serait relancé sans fin
+            raise CommandError('--retry-failed ne peut pas être combiné avec --loop')
+
+        self.stdout.write(self.style.WARNING("🔁 Traitement continu des envois d'images..."))
+        while True:
+            close_old_connections()
+            try:
+                processed = self.process_pending(options, quiet=True)
+            except Exception as e:
+                # Base indisponible, etc. : réessayer à la passe suivante
+                self.stderr.write(self.style.ERROR(f"✗ Passe interrompue : {e}"))
+                processed = 0
+            if not processed:
+                time.sleep(options['interval'])
+
+    def process_pending(self, options, quiet=False):
+        """Une passe sur les envois en attente ; retourne le nombre d'envois traités"""
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        reset = ImageUpload.objects.filter(
+            status=ImageUpload.STATUS_PROCESSING, updated_at__lt=stale_before
+        ).update(status=ImageUpload.STATUS_PENDING)
+        if options['retry_failed']:
+            reset += ImageUpload.objects.filter(status=ImageUpload.STATUS_FAILED).update(
+                status=ImageUpload.STATUS_PENDING
+            )
+        if reset:
+            self.stdout.write(self.style.WARNING(f"↺ {reset} envois remis en attente"))
+
+        done = 0
+        failed = 0
+        pending = ImageUpload.objects.filter(status=ImageUpload.STATUS_PENDING).order_by('created_at')
+        for upload_id in pending.values_list('pk', flat=True):
+            if process_upload(upload_id):
+                done += 1
+                self.stdout.write(self.style.SUCCESS(f"✓ Envoi {upload_id}"))
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"✗ Envoi {upload_id}"))
+
+        if not quiet or done or failed:
+            self.stdout.write(self.style.SUCCESS(
+                f"\n✅ TERMINÉ - {done} envoyés, {failed} en échec"
+            ))
+        return done + failed
+
+
+# UTILISATION :
+# python manage.py process_image_uploads
+# python manage.py process_image_uploads --retry-failed
+# python manage.py process_image_uploads --loop --interval=2
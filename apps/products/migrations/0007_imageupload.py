@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_product_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('temp_file', models.CharField(help_text='Fichier temporaire local (IMAGE_UPLOAD_TEMP_DIR)', max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('processing', 'En cours'), ('done', 'Terminé'), ('failed', 'Échec')], db_index=True, default='pending', max_length=20)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_uploads', to='products.product')),
+            ],
+            options={
+                'verbose_name': "Envoi d'image",
+                'verbose_name_plural': "Envois d'images",
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageupload',
+            name='data',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='imageupload',
+            name='temp_file',
+            field=models.CharField(help_text="Nom du fichier reçu (extension conservée pour l'envoi)", max_length=255),
+        ),
+    ]
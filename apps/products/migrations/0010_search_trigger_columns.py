@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+# Le vecteur ne dépend que de ces colonnes : un UPDATE du stock ou du prix
+# (adjust_stock, bulk_update...) ne recalcule plus to_tsvector
+TRIGGER_COLUMNS_SQL = """
+DROP TRIGGER IF EXISTS products_product_search_vector_trigger ON products_product;
+CREATE TRIGGER products_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF code, nom_parfum, nom_etiquette, description ON products_product
+    FOR EACH ROW EXECUTE FUNCTION products_product_search_vector_update();
+"""
+
+TRIGGER_ALL_COLUMNS_SQL = """
+DROP TRIGGER IF EXISTS products_product_search_vector_trigger ON products_product;
+CREATE TRIGGER products_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON products_product
+    FOR EACH ROW EXECUTE FUNCTION products_product_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_imageupload_data'),
+    ]
+
+    operations = [
+        # Le code est cherché par préfixe (index btree varchar_pattern_ops du champ unique)
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_code_trgm_idx',
+        ),
+        migrations.RunSQL(TRIGGER_COLUMNS_SQL, TRIGGER_ALL_COLUMNS_SQL),
+    ]
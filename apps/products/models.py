@@ -1,6 +1,9 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.core.validators import MinValueValidator
 from cloudinary.models import CloudinaryField
+from .cache import cloudinary_url, get_category_image_urls, get_category_image_variants, is_cloudinary_image
 
 class CategoryImage(models.Model):
     """Images par défaut pour chaque catégorie"""
@@ -24,6 +27,8 @@ class CategoryImage(models.Model):
         },
         help_text="Image par défaut pour tous les produits de cette catégorie"
     )
+    # Miniatures WebP/AVIF générées localement (voir apps/products/variants.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -38,9 +43,89 @@ class CategoryImage(models.Model):
     def image_url(self):
         """Retourne l'URL complète de l'image"""
         if self.image:
-            return self.image.url
+            return cloudinary_url(self.image)
         return None
 
+    @classmethod
+    def image_maps(cls):
+        """
+        Retourne {'urls': {catégorie: url}, 'variants': {catégorie: variantes}}
+        des images par défaut, en une seule requête
+        """
+        urls = {}
+        variants = {}
+        for category_image in cls.objects.all():
+            try:
+                if is_cloudinary_image(category_image.image):
+                    urls[category_image.categorie] = cloudinary_url(category_image.image)
+                    variants[category_image.categorie] = current_variants(
+                        category_image.image, category_image.image_variants
+                    )
+            except Exception:
+                pass
+        return {'urls': urls, 'variants': variants}
+
+
+def current_variants(image, image_variants):
+    """
+    Variantes {format: {largeur: url}} si elles correspondent encore à l'image
+    actuelle (elles sont ignorées dès que l'image change, sans requête)
+    """
+    if not image or not image_variants:
+        return {}
+    source = image.get_prep_value() if hasattr(image, 'get_prep_value') else str(image)
+    if image_variants.get('source') != source:
+        return {}
+    return image_variants.get('formats', {})
+
+
+def resolve_image_variants(image, image_variants, categorie, category_image_variants=None):
+    """Variantes de l'image du produit, ou à défaut de l'image de sa catégorie"""
+    if image:
+        return current_variants(image, image_variants)
+    if category_image_variants is None:
+        category_image_variants = get_category_image_variants()
+    return category_image_variants.get(categorie, {})
+
+
+def absolute_variants(variants, request=None):
+    """
+    URLs des variantes rendues absolues pour la requête : les stockages
+    locaux renvoient des chemins (/media/variants/...), Cloudinary des URLs
+    complètes laissées telles quelles.
+    """
+    if request is None or not variants:
+        return variants
+    return {
+        fmt: {
+            width: url if url.startswith(('http://', 'https://')) else request.build_absolute_uri(url)
+            for width, url in sizes.items()
+        }
+        for fmt, sizes in variants.items()
+    }
+
+
+def resolve_image(image, categorie, category_image_urls=None):
+    """
+    Résout (url, source) à partir de la valeur brute du champ image et de la
+    catégorie ; utilisable aussi sur des lignes `.values()`.
+    """
+    try:
+        # Si le produit a une image spécifique, l'utiliser
+        if is_cloudinary_image(image):
+            return cloudinary_url(image), "Produit"
+    except Exception:
+        pass
+
+    # Sinon, chercher l'image par défaut de la catégorie
+    if category_image_urls is None:
+        category_image_urls = get_category_image_urls()
+    url = category_image_urls.get(categorie)
+    if url:
+        return url, "Catégorie"
+
+    return None, "Aucune"
+
 
 class Product(models.Model):
     CATEGORY_CHOICES = [
@@ -69,6 +154,12 @@ class Product(models.Model):
         help_text="Image spécifique à ce produit (laissez vide pour utiliser l'image par défaut de la catégorie)"
     )
     
+    # Miniatures WebP/AVIF générées localement (voir apps/products/variants.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    
+    # Recherche plein texte (config 'french'), maintenu par un trigger Postgres
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -76,46 +167,76 @@ class Product(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Produit'
         verbose_name_plural = 'Produits'
+        indexes = [
+            # Pagination par curseur (-created_at, id)
+            models.Index(fields=['-created_at', 'id'], name='product_keyset_idx'),
+            # Synchronisation incrémentale (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='product_updated_idx'),
+            # Recherche : plein texte et trigrammes (pg_trgm) ; le code est cherché par
+            # préfixe, servi par l'index varchar_pattern_ops de son contrainte unique
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            GinIndex(fields=['nom_parfum'], opclasses=['gin_trgm_ops'], name='product_nom_parfum_trgm_idx'),
+            GinIndex(fields=['nom_etiquette'], opclasses=['gin_trgm_ops'], name='product_nom_etiq_trgm_idx'),
+        ]
     
     def __str__(self):
         return f"{self.code} - {self.nom_parfum}"
     
+    def resolve_image(self, category_image_urls=None):
+        """
+        Retourne le couple (url, source) de l'image du produit.
+        Si le produit n'a pas d'image spécifique, utilise l'image par défaut de sa catégorie.
+        `category_image_urls` ({catégorie: url}) permet de résoudre toute une page
+        de produits sans requête supplémentaire.
+        """
+        return resolve_image(self.image, self.categorie, category_image_urls)
+
     @property
     def image_url(self):
         """
         Retourne l'URL de l'image du produit.
         Si le produit n'a pas d'image spécifique, retourne l'image par défaut de sa catégorie.
         """
-        try:
-            # Si le produit a une image spécifique, l'utiliser
-            if self.image and hasattr(self.image, 'url'):
-                return self.image.url
-        except Exception:
-            pass
-        
-        # Sinon, chercher l'image par défaut de la catégorie
-        try:
-            category_image = CategoryImage.objects.get(categorie=self.categorie)
-            if category_image.image and hasattr(category_image.image, 'url'):
-                return category_image.image.url
-        except (CategoryImage.DoesNotExist, Exception):
-            pass
-        
-        return None
+        return self.resolve_image()[0]
     
     def get_image_source(self):
         """Indique si l'image vient du produit ou de la catégorie"""
-        try:
-            if self.image and hasattr(self.image, 'url'):
-                return "Produit"
-        except Exception:
-            pass
-        
-        try:
-            category_image = CategoryImage.objects.get(categorie=self.categorie)
-            if category_image.image and hasattr(category_image.image, 'url'):
-                return "Catégorie"
-        except (CategoryImage.DoesNotExist, Exception):
-            pass
-        
-        return "Aucune"
\ No newline at end of file
+        return self.resolve_image()[1]
+
+    def get_image_variants(self, category_image_variants=None, request=None):
+        """Miniatures {format: {largeur: url}} de l'image affichée (URLs absolues si `request`)"""
+        return absolute_variants(
+            resolve_image_variants(self.image, self.image_variants, self.categorie, category_image_variants),
+            request,
+        )
+
+
+class ImageUpload(models.Model):
+    """Image reçue par l'API, en attente d'envoi vers le stockage par le worker d'arrière-plan"""
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En attente'),
+        (STATUS_PROCESSING, 'En cours'),
+        (STATUS_DONE, 'Terminé'),
+        (STATUS_FAILED, 'Échec'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='image_uploads')
+    temp_file = models.CharField(max_length=255, help_text="Nom du fichier reçu (extension conservée pour l'envoi)")
+    # Octets reçus, en base : lisibles par le worker d'un autre conteneur ; vidés une fois l'envoi terminé
+    data = models.BinaryField(null=True, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Envoi d'image"
+        verbose_name_plural = "Envois d'images"
+
+    def __str__(self):
+        return f"{self.product.code} - {self.get_status_display()}"
@@ -0,0 +1,7 @@
+# ==================== apps/products/pagination.py ====================
+from apps.core.pagination import CatalogPagination
+
+
+class ProductPagination(CatalogPagination):
+    # Index composite products_product(created_at DESC, id)
+    keyset_ordering = ('-created_at', 'id')
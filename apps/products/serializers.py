@@ -1,10 +1,14 @@
 # ==================== apps/products/serializers.py ====================
 from rest_framework import serializers
-from .models import Product
+from apps.core.sparse import SparseFieldsetSerializerMixin
+from .cache import get_category_image_urls, get_category_image_variants
+from .models import Product, ImageUpload
+from .stock import MAX_STOCK
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
     image_source = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -20,16 +24,35 @@ class ProductSerializer(serializers.ModelSerializer):
             'image',
             'image_url',
             'image_source',
+            'image_variants',
             'created_at',
             'updated_at',
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    # Colonnes lues par les champs calculés (?fields= restreint le SELECT)
+    field_sources = {
+        'image_url': ('image', 'categorie'),
+        'image_source': ('image', 'categorie'),
+        'image_variants': ('image', 'image_variants', 'categorie'),
+    }
+
+    def _category_image_urls(self):
+        """
+        Images par défaut des catégories, lues une seule fois par sérialisation
+        depuis le cache process (partagées entre les lignes via le contexte).
+        """
+        urls = self.context.get('category_image_urls')
+        if urls is None:
+            urls = get_category_image_urls()
+            self.context['category_image_urls'] = urls
+        return urls
+
     def get_image_url(self, obj):
         """
         Retourne l'image du produit ou celle de la catégorie (fallback)
         """
-        url = obj.image_url
+        url, _ = obj.resolve_image(self._category_image_urls())
         request = self.context.get('request')
 
         if url and request:
@@ -41,7 +64,18 @@ class ProductSerializer(serializers.ModelSerializer):
         """
         Indique la source de l'image : Produit / Catégorie / Aucune
         """
-        return obj.get_image_source()
+        _, source = obj.resolve_image(self._category_image_urls())
+        return source
+
+    def get_image_variants(self, obj):
+        """
+        Miniatures WebP/AVIF {format: {largeur: url}} pour srcset ; vide si non générées
+        """
+        variants = self.context.get('category_image_variants')
+        if variants is None:
+            variants = get_category_image_variants()
+            self.context['category_image_variants'] = variants
+        return obj.get_image_variants(variants, self.context.get('request'))
 
     def validate_code(self, value):
         queryset = Product.objects.filter(code=value)
@@ -67,4 +101,32 @@ class ProductUpdateSerializer(serializers.ModelSerializer):
                   'description', 'prix', 'stock', 'image']
         
 class ImageUploadSerializer(serializers.Serializer):
-    image = serializers.ImageField()
\ No newline at end of file
+    image = serializers.ImageField()
+
+
+class ImageUploadStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'product', 'status', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(
+        min_value=-MAX_STOCK,
+        max_value=MAX_STOCK,
+        help_text="Quantité retirée du stock (négative pour une entrée en stock)"
+    )
+
+    def validate_quantity(self, value):
+        if value == 0:
+            raise serializers.ValidationError("La quantité doit être non nulle.")
+        return value
+
+
+class StockLineSerializer(StockAdjustmentSerializer):
+    product = serializers.IntegerField(help_text="Id du produit")
+
+
+class StockBatchSerializer(serializers.Serializer):
+    lines = StockLineSerializer(many=True, allow_empty=False, max_length=500)
@@ -0,0 +1,40 @@
+# ==================== apps/products/signals.py ====================
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.bulk import in_bulk_operation
+from apps.core.caching import invalidate
+from apps.core.models import Tombstone
+from .cache import invalidate_category_image_urls
+from .models import CategoryImage, Product
+from .suggest import SUGGEST_FIELDS, suggest_index
+
+
+@receiver(post_save, sender=CategoryImage)
+@receiver(post_delete, sender=CategoryImage)
+def category_image_changed(sender, instance, **kwargs):
+    """Invalide le cache des images de catégorie (et à nouveau après le commit)"""
+    invalidate_category_image_urls()
+    transaction.on_commit(invalidate_category_image_urls)
+    invalidate('products')
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """Met à jour l'index de suggestions (après commit) et invalide les réponses en cache"""
+    row = {field: getattr(instance, field) for field in SUGGEST_FIELDS}
+    transaction.on_commit(lambda: suggest_index.update(row))
+    invalidate('products')
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    """Garde une trace de la suppression pour la synchronisation des clients"""
+    if in_bulk_operation():
+        # Suppression en masse : traces et invalidation faites une fois par BulkMixin
+        return
+    Tombstone.record(instance)
+    pk = instance.pk
+    transaction.on_commit(lambda: suggest_index.remove(pk))
+    invalidate('products')
@@ -0,0 +1,108 @@
+# ==================== apps/products/stock.py ====================
+"""
+Mouvements de stock atomiques (ventes concurrentes).
+
+Un mouvement simple est un seul `UPDATE ... SET stock = stock - n WHERE
+stock >= n` : pas de lecture préalable, donc pas de mise à jour perdue, et le
+verrou de ligne ne dure que le temps de l'UPDATE. Une commande multi-lignes
+verrouille ses produits avec `select_for_update` dans l'ordre des ids (deux
+commandes ne peuvent pas s'interbloquer), vérifie tout, puis applique un seul
+UPDATE : tout ou rien.
+
+`quantity` > 0 retire du stock (vente), `quantity` < 0 en ajoute (retour,
+réassort) sans jamais dépasser MAX_STOCK (colonne integer).
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from apps.core.caching import invalidate
+from .models import Product
+
+
+MAX_STOCK = 2 ** 31 - 1  # IntegerField (integer Postgres)
+
+
+class InsufficientStock(Exception):
+    """`lines` : [{'id', 'code', 'stock', 'quantity'}] des produits en rupture"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        super().__init__('Stock insuffisant')
+
+
+class StockOverflow(Exception):
+    """`lines` : [{'id', 'code', 'stock', 'quantity'}] des produits dont le stock dépasserait MAX_STOCK"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        super().__init__('Stock maximal dépassé')
+
+
+def adjust_stock(product_id, quantity):
+    """Retire `quantity` du stock d'un produit ; retourne le nouveau stock"""
+    # Vente : stock suffisant ; entrée en stock : pas de dépassement de la colonne
+    bound = {'stock__gte': quantity} if quantity >= 0 else {'stock__lte': MAX_STOCK + quantity}
+    with transaction.atomic():
+        updated = Product.objects.filter(pk=product_id, **bound).update(
+            stock=F('stock') - quantity, updated_at=timezone.now()
+        )
+        # Ligne verrouillée par l'UPDATE jusqu'au commit : la relecture est exacte
+        row = Product.objects.filter(pk=product_id).values('id', 'code', 'stock').first()
+
+    if row is None:
+        raise Product.DoesNotExist
+    if not updated:
+        line = dict(row, quantity=quantity)
+        raise InsufficientStock([line]) if quantity >= 0 else StockOverflow([line])
+
+    # QuerySet.update n'envoie pas de signaux
+    invalidate('products')
+    return row['stock']
+
+
+def adjust_stock_batch(lines):
+    """
+    Applique [(product_id, quantity), ...] en tout ou rien ; retourne
+    {product_id: nouveau stock}. Les lignes d'un même produit sont cumulées.
+    """
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    with transaction.atomic():
+        # Verrous pris dans l'ordre des ids : pas d'interblocage entre commandes
+        rows = list(
+            Product.objects.select_for_update()
+            .filter(pk__in=quantities)
+            .order_by('pk')
+            .values('id', 'code', 'stock')
+        )
+        found = {row['id'] for row in rows}
+        missing = [product_id for product_id in quantities if product_id not in found]
+        if missing:
+            raise Product.DoesNotExist(missing)
+
+        insufficient = [
+            dict(row, quantity=quantities[row['id']])
+            for row in rows if row['stock'] < quantities[row['id']]
+        ]
+        if insufficient:
+            raise InsufficientStock(insufficient)
+        overflow = [
+            dict(row, quantity=quantities[row['id']])
+            for row in rows if row['stock'] - quantities[row['id']] > MAX_STOCK
+        ]
+        if overflow:
+            raise StockOverflow(overflow)
+
+        Product.objects.filter(pk__in=quantities).update(
+            stock=Case(
+                *[When(pk=product_id, then=F('stock') - Value(quantity)) for product_id, quantity in quantities.items()],
+                output_field=IntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    invalidate('products')
+    return {row['id']: row['stock'] - quantities[row['id']] for row in rows}
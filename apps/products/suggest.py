@@ -0,0 +1,260 @@
+# ==================== apps/products/suggest.py ====================
+"""
+Index de suggestions (typeahead) en mémoire, un par worker.
+
+Chaque mot de `nom_parfum`, `nom_etiquette` ("B. Chnl", "Blk. Opm") et `code`
+est indexé par tous ses préfixes (normalisés : minuscules, sans accents).
+Une suggestion est une intersection d'ensembles en mémoire, sans requête SQL.
+L'index est chargé au premier appel et mis à jour par les signaux de Product
+du worker courant. Les modifications faites par les autres workers sont
+rattrapées par delta (lignes modifiées depuis le dernier rattrapage et
+traces de suppression, comme /sync/) dès que la version 'products' du cache
+partagé change, et au plus tard toutes les PRODUCT_SUGGEST_SYNC_INTERVAL
+secondes. L'index complet est reconstruit après PRODUCT_SUGGEST_INDEX_TIMEOUT,
+ou dans tous les workers quand `invalidate()` incrémente la version partagée
+'products-suggest' (ex: import_products, exécuté dans un autre processus).
+
+Les chargements et rattrapages lisent la base hors du verrou de l'index :
+pendant une reconstruction, les recherches continuent sur l'ancien index.
+Les préfixes d'une ou deux lettres désignent des milliers de produits : leurs
+meilleurs résultats sont classés une fois et mémorisés jusqu'à la prochaine
+modification d'un produit concerné.
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.caching import bump_versions, get_versions
+
+SUGGEST_FIELDS = ('id', 'code', 'nom_parfum', 'nom_etiquette', 'categorie')
+# Version partagée : son incrément force une reconstruction complète dans tous les workers
+REBUILD_NAMESPACE = 'products-suggest'
+
+_TOKEN_RE = re.compile(r'[0-9a-z]+')
+
+
+def normalize(text):
+    """Minuscules sans accents : 'Hermès' -> 'hermes'"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+class _Index:
+    """Structures d'un index chargé (modifiées sous le verrou de SuggestIndex)"""
+
+    def __init__(self, max_prefix_length, ranked_prefix_length):
+        self.max_prefix_length = max_prefix_length
+        self.ranked_prefix_length = ranked_prefix_length
+        self.entries = {}
+        self.keys = {}
+        self.tokens = {}
+        self.prefixes = {}
+        self.ranked = {}
+
+    def _token_prefixes(self, token):
+        return (token[:end] for end in range(1, min(len(token), self.max_prefix_length) + 1))
+
+    def _forget_ranked(self, tokens):
+        for token in tokens:
+            for end in range(1, min(len(token), self.ranked_prefix_length) + 1):
+                self.ranked.pop(token[:end], None)
+
+    def add(self, row):
+        pk = row['id']
+        keys = (normalize(row['code']), normalize(row['nom_parfum']), normalize(row['nom_etiquette']))
+        tokens = set(tokenize(row['code'])) | set(tokenize(row['nom_parfum'])) | set(tokenize(row['nom_etiquette']))
+
+        self.entries[pk] = row
+        self.keys[pk] = keys
+        self.tokens[pk] = tokens
+        for token in tokens:
+            for prefix in self._token_prefixes(token):
+                self.prefixes.setdefault(prefix, set()).add(pk)
+        self._forget_ranked(tokens)
+
+    def remove(self, pk):
+        self.entries.pop(pk, None)
+        self.keys.pop(pk, None)
+        tokens = self.tokens.pop(pk, ())
+        for token in tokens:
+            for prefix in self._token_prefixes(token):
+                ids = self.prefixes.get(prefix)
+                if ids is not None:
+                    ids.discard(pk)
+                    if not ids:
+                        del self.prefixes[prefix]
+        self._forget_ranked(tokens)
+
+    def best(self, ids, needle, limit):
+        """Code exact, puis nom ou étiquette commençant par la saisie, puis noms courts"""
+        def rank(pk):
+            code, nom, etiquette = self.keys[pk]
+            return (
+                code != needle,
+                not (nom.startswith(needle) or etiquette.startswith(needle)),
+                len(nom),
+                nom,
+            )
+
+        return heapq.nsmallest(limit, ids, key=rank)
+
+    def search(self, tokens, limit, max_limit):
+        matches = []
+        for token in tokens:
+            ids = self.prefixes.get(token[:self.max_prefix_length])
+            if not ids:
+                return []
+            if len(token) > self.max_prefix_length:
+                ids = {pk for pk in ids if any(t.startswith(token) for t in self.tokens[pk])}
+            matches.append(ids)
+
+        needle = ' '.join(tokens)
+        if len(tokens) == 1 and len(needle) <= self.ranked_prefix_length:
+            # Préfixe court : classement mémorisé (aucune copie de l'ensemble des ids)
+            ranked = self.ranked.get(needle)
+            if ranked is None:
+                ranked = self.ranked[needle] = self.best(matches[0], needle, max_limit)
+            found = ranked[:limit]
+        else:
+            # Intersection à partir du plus petit ensemble : la copie est bornée par celui-ci
+            matches.sort(key=len)
+            candidates = matches[0].intersection(*matches[1:]) if len(matches) > 1 else matches[0]
+            found = self.best(candidates, needle, limit)
+        return [dict(self.entries[pk]) for pk in found]
+
+
+class SuggestIndex:
+    max_prefix_length = 20
+    ranked_prefix_length = 2
+    max_limit = 50
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Un seul chargement / rattrapage à la fois, hors du verrou des recherches
+        self._load_lock = threading.Lock()
+        self._index = None
+        self._expires_at = 0.0
+        self._versions = None
+        self._synced_at = None
+        self._next_sync = 0.0
+
+    def _timeout(self):
+        return getattr(settings, 'PRODUCT_SUGGEST_INDEX_TIMEOUT', 900)
+
+    def _sync_interval(self):
+        return getattr(settings, 'PRODUCT_SUGGEST_SYNC_INTERVAL', 30)
+
+    def _sync_point(self):
+        # Marge pour les transactions validées après leur updated_at (voir apps/core/sync.py)
+        return timezone.now() - timedelta(seconds=getattr(settings, 'SYNC_SAFETY_MARGIN', 5))
+
+    def _is_fresh(self, versions):
+        now = time.monotonic()
+        return (
+            self._index is not None and now < self._expires_at
+            and versions == self._versions and now < self._next_sync
+        )
+
+    def _ensure_loaded(self):
+        versions = get_versions(('products', REBUILD_NAMESPACE))
+        if self._is_fresh(versions):
+            return
+        # Index déjà chargé : si un autre thread le met à jour, chercher dans l'état courant
+        if not self._load_lock.acquire(blocking=self._index is None):
+            return
+        try:
+            if self._is_fresh(versions):
+                return
+            if (self._index is None or time.monotonic() >= self._expires_at
+                    or versions[1] != self._versions[1]):
+                self._rebuild(versions)
+            else:
+                self._catch_up(versions)
+        finally:
+            self._load_lock.release()
+
+    def _load_rows(self):
+        from .models import Product
+
+        return Product.objects.values(*SUGGEST_FIELDS).iterator(chunk_size=5000)
+
+    def _rebuild(self, versions):
+        synced_at = self._sync_point()
+        index = _Index(self.max_prefix_length, self.ranked_prefix_length)
+        for row in self._load_rows():
+            index.add(row)
+        with self._lock:
+            self._index = index
+            self._expires_at = time.monotonic() + self._timeout()
+            self._mark_synced(versions, synced_at)
+
+    def _catch_up(self, versions):
+        """Applique les modifications et suppressions faites depuis le dernier rattrapage"""
+        from apps.core.models import Tombstone
+        from .models import Product
+
+        synced_at = self._sync_point()
+        rows = list(Product.objects.filter(updated_at__gt=self._synced_at).values(*SUGGEST_FIELDS))
+        deleted = list(Tombstone.objects.filter(
+            model=Product._meta.label_lower, deleted_at__gt=self._synced_at
+        ).values_list('object_id', flat=True))
+        with self._lock:
+            for row in rows:
+                self._index.remove(row['id'])
+                self._index.add(row)
+            for pk in deleted:
+                self._index.remove(pk)
+            self._mark_synced(versions, synced_at)
+
+    def _mark_synced(self, versions, synced_at):
+        self._versions = versions
+        self._synced_at = synced_at
+        self._next_sync = time.monotonic() + self._sync_interval()
+
+    def update(self, row):
+        """Ajoute ou remplace un produit (dict avec SUGGEST_FIELDS)"""
+        with self._lock:
+            if self._index is None:
+                return
+            self._index.remove(row['id'])
+            self._index.add(row)
+
+    def remove(self, pk):
+        with self._lock:
+            if self._index is not None:
+                self._index.remove(pk)
+
+    def invalidate(self):
+        """Force une reconstruction complète au prochain appel, dans tous les workers (version partagée)"""
+        bump_versions(REBUILD_NAMESPACE)
+        with self._lock:
+            self._expires_at = 0.0
+
+    def mark_stale(self):
+        """Force un rattrapage par delta au prochain appel (écritures sans signaux)"""
+        with self._lock:
+            self._next_sync = 0.0
+
+    def search(self, query, limit=10):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        self._ensure_loaded()
+        with self._lock:
+            if self._index is None:
+                return []
+            return self._index.search(tokens, min(limit, self.max_limit), self.max_limit)
+
+
+suggest_index = SuggestIndex()
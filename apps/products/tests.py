@@ -1,3 +1,1155 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from apps.core.columnar import msgpack
+from apps.core.models import Tombstone
+from apps.core.testing import FastReadComparisonMixin, walk_cursor
+from .cache import (
+    CACHE_KEY, VERSION_KEY, _build_cloudinary_url, cloudinary_url, get_category_image_urls, get_category_image_variants, invalidate_category_image_urls,
+)
+from .models import CategoryImage, ImageUpload, Product
+from .variants import variant_storage
+from .stock import MAX_STOCK, InsufficientStock, adjust_stock
+from .suggest import SUGGEST_FIELDS, SuggestIndex
+from .uploads import process_upload
+
+
+def make_products(count, **overrides):
+    return Product.objects.bulk_create([
+        Product(
+            code=f'T{i:04d}',
+            nom_parfum=f'Parfum {i}',
+            nom_etiquette=f'Etiq {i % 7}',
+            categorie=['Hommes', 'Femmes'][i % 2],
+            prix=1000 + (i % 5) * 500,
+            stock=i % 4,
+            **overrides,
+        )
+        for i in range(count)
+    ])
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductListQueryCountTests(TestCase):
+    """Nombre de requêtes de la liste indépendant du nombre de produits (pas de N+1 sur les images)"""
+
+    def setUp(self):
+        invalidate_category_image_urls()
+        self.addCleanup(invalidate_category_image_urls)
+
+    def count_queries(self, url):
+        invalidate_category_image_urls()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url, add_rows):
+        add_rows(1)
+        single = self.count_queries(url)
+        add_rows(24)
+        invalidate_category_image_urls()
+        with self.assertNumQueries(single):
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(len(response.json()['results']), 25)
+
+    def add_products(self, count, with_images=False):
+        start = Product.objects.count()
+        Product.objects.bulk_create([
+            Product(
+                code=f'Q{start + i:04d}', nom_parfum='P', nom_etiquette='E',
+                categorie=['Hommes', 'Femmes'][i % 2], prix=1000,
+                image=f'parfums/products/q{start + i}' if with_images and i % 2 else None,
+            )
+            for i in range(count)
+        ])
+
+    def test_without_images_or_category_images(self):
+        self.assertConstantQueries('/api/products/', self.add_products)
+
+    def test_with_product_and_category_images(self):
+        CategoryImage.objects.create(categorie='Hommes', image='parfums/categories/hommes')
+        CategoryImage.objects.create(categorie='Femmes', image='parfums/categories/femmes')
+        self.assertConstantQueries('/api/products/', lambda count: self.add_products(count, with_images=True))
+
+    def test_cursor_and_sparse_modes(self):
+        CategoryImage.objects.create(categorie='Hommes', image='parfums/categories/hommes')
+        for url in ('/api/products/?cursor=', '/api/products/?fields=code,image_url,image_variants'):
+            with self.subTest(url=url):
+                Product.objects.all().delete()
+                self.assertConstantQueries(url, lambda count: self.add_products(count, with_images=True))
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductCursorPaginationTests(TestCase):
+    """Parcours complet par curseur : chaque produit une seule fois, égalités comprises"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_products(53)
+        # Égalités sur created_at : seul l'id départage les lignes
+        now = timezone.now()
+        Product.objects.filter(pk__in=Product.objects.order_by('pk').values('pk')[:30]).update(created_at=now)
+
+    def test_walk_returns_every_row_once_in_order(self):
+        rows = walk_cursor(self.client, '/api/products/?cursor=&page_size=7')
+        ids = [row['id'] for row in rows]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(ids, list(Product.objects.order_by('-created_at', 'id').values_list('id', flat=True)))
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/products/?cursor=pas-un-curseur', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductFastReadTests(FastReadComparisonMixin, TestCase):
+    """Le chemin rapide (.values() + orjson) rend exactement les octets du serializer"""
+    fast_read_basename = 'product'
+
+    urls = [
+        '/api/products/',
+        '/api/products/?page=1',
+        '/api/products/?fields=code,prix,image_url,image_source',
+        '/api/products/?omit=description,image_variants',
+        '/api/products/?fields=image_variants,categorie',
+        '/api/products/?cursor=&page_size=4',
+        '/api/products/?categorie=Femmes&ordering=-prix,created_at',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        products = make_products(12, description='Notes boisées « été »\u2028')
+        now = timezone.now()
+        for index, product in enumerate(products):
+            # Dates distinctes : ordre de page déterministe
+            Product.objects.filter(pk=product.pk).update(
+                created_at=now - timedelta(minutes=index),
+                image='parfums/products/p%d' % index if index % 3 == 0 else None,
+                image_variants={'source': 'x', 'formats': {'webp': {'80': 'https://cdn/x.webp'}}} if index % 4 == 0 else {},
+            )
+
+    def test_image_variant_urls_are_absolute(self):
+        product = Product.objects.order_by('pk').first()
+        # Variantes d'un stockage local : chemin relatif en base
+        Product.objects.filter(pk=product.pk).update(
+            image='parfums/products/local', created_at=timezone.now() + timedelta(days=1),
+        )
+        source = Product.objects.get(pk=product.pk).image.get_prep_value()
+        Product.objects.filter(pk=product.pk).update(
+            image_variants={'source': source, 'formats': {'webp': {
+                '80': '/media/variants/products/local-80w.webp', '160': 'https://cdn/local-160w.webp',
+            }}},
+        )
+        expected = {'webp': {
+            '80': 'http://localhost/media/variants/products/local-80w.webp', '160': 'https://cdn/local-160w.webp',
+        }}
+        for fast in (True, False):
+            with self.subTest(fast=fast):
+                row = json.loads(self.get('/api/products/?fields=id,image_variants', fast=fast))['results'][0]
+                self.assertEqual(row, {'id': product.pk, 'image_variants': expected})
+
+    @override_settings(IMAGE_VARIANT_STORAGE=None)
+    def test_variants_default_to_cloudinary_storage(self):
+        # Jamais le disque local du conteneur : URL Cloudinary absolue
+        url = variant_storage().url('variants/products/1/p-80w.webp')
+        self.assertTrue(url.startswith('https://res.cloudinary.com/'), url)
+
+    def test_category_images_resolved_once_per_request(self):
+        for fast in (True, False):
+            with self.subTest(fast=fast), \
+                    mock.patch('apps.products.views.get_category_image_urls', wraps=get_category_image_urls) as urls, \
+                    mock.patch('apps.products.views.get_category_image_variants', wraps=get_category_image_variants) as variants:
+                self.get('/api/products/', fast=fast)
+                self.assertEqual((urls.call_count, variants.call_count), (1, 1))
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductExportTests(TestCase):
+    """Export en flux : une ligne par produit, images de catégorie lues une seule fois"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_products(25)
+
+    def test_category_images_read_once_for_the_whole_export(self):
+        with mock.patch('apps.products.views.get_category_image_urls', wraps=get_category_image_urls) as urls:
+            response = self.client.get('/api/products/export/?output=ndjson', HTTP_HOST='localhost')
+            lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(urls.call_count, 1)
+
+    def test_export_catalog_command_writes_every_row(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'produits.csv')
+            call_command('export_catalog', 'products', '--file', path, stdout=io.StringIO())
+            with open(path, encoding='utf-8') as handle:
+                rows = list(csv.DictReader(handle))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual({row['image_source'] for row in rows}, {'Aucune'})
+
+
+class ProductResponseCacheTests(TestCase):
+    """Cache des réponses : désactivé sans backend partagé, invalidé par les écritures sinon"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = make_products(3)[0]
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_disabled_cache_does_not_touch_the_backend(self):
+        # Cache local au processus sans API_CACHE_ALLOW_LOCAL : ni version ni réponse lues
+        with mock.patch('apps.core.caching.get_versions') as versions, \
+                mock.patch.object(caches['default'], 'get') as cache_get:
+            self.assertNotIn('X-Cache', self.get('/api/products/'))
+            self.assertNotIn('X-Cache', self.get(f'/api/products/{self.product.pk}/'))
+        versions.assert_not_called()
+        cache_get.assert_not_called()
+
+    @override_settings(API_CACHE_ALLOW_LOCAL=True)
+    def test_hit_then_invalidated_by_a_write(self):
+        self.assertEqual(self.get('/api/products/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get('/api/products/')['X-Cache'], 'HIT')
+        self.client.patch(
+            f'/api/products/{self.product.pk}/', {'prix': 1234}, content_type='application/json', HTTP_HOST='localhost'
+        )
+        response = self.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn(1234.0, [row['prix'] for row in response.json()['results']])
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductSearchTests(TestCase):
+    """Recherche Postgres : vecteur maintenu par trigger sur les seules colonnes textuelles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            code='A102', nom_parfum='Black Opium', nom_etiquette='YSL', categorie='Femmes',
+            prix=3000, description='Notes de café et de vanille',
+        )
+        Product.objects.create(code='B201', nom_parfum='Bleu', nom_etiquette='Chanel', categorie='Hommes', prix=4000)
+
+    def search(self, text):
+        response = self.client.get('/api/products/', {'search': text}, HTTP_HOST='localhost')
+        return [row['code'] for row in response.json()['results']]
+
+    def search_vector(self):
+        return Product.objects.values_list('search_vector', flat=True).get(pk=self.product.pk)
+
+    def test_search_by_text_label_and_code_prefix(self):
+        self.assertEqual(self.search('vanille'), ['A102'])
+        self.assertEqual(self.search('blak opium'), ['A102'])
+        self.assertEqual(self.search('B2'), ['B201'])
+        # Préfixe seulement : '02' n'est pas le début d'un code
+        self.assertEqual(self.search('02'), [])
+
+    def test_stock_and_price_updates_do_not_recompute_the_vector(self):
+        Product.objects.filter(pk=self.product.pk).update(search_vector=None)
+        adjust_stock(self.product.pk, -5)
+        Product.objects.filter(pk=self.product.pk).update(prix=3500)
+        self.assertIsNone(self.search_vector())
+
+        Product.objects.filter(pk=self.product.pk).update(description='Ambre')
+        self.assertIn("'ambre'", self.search_vector())
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductFacetTests(TestCase):
+    """Compteurs de facettes : une seule requête, mêmes filtres que la liste"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # prix 1000..3000 par pas de 500, stock 0..3, catégorie alternée
+        make_products(20)
+
+    def facets(self, query=''):
+        response = self.client.get(f'/api/products/facets/{query}', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def expected(self, queryset, bounds):
+        edges = [0] + bounds + [None]
+        return {
+            'count': queryset.count(),
+            'categorie': [queryset.filter(categorie=value).count() for value, _ in Product.CATEGORY_CHOICES],
+            'prix': [
+                queryset.filter(prix__gte=low, **({} if high is None else {'prix__lt': high})).count()
+                for low, high in zip(edges, edges[1:])
+            ],
+            'in_stock': queryset.filter(stock__gt=0).count(),
+        }
+
+    def summary(self, facets):
+        return {
+            'count': facets['count'],
+            'categorie': [entry['count'] for entry in facets['categorie']],
+            'prix': [entry['count'] for entry in facets['prix']],
+            'in_stock': facets['stock']['in_stock'],
+        }
+
+    def test_all_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            facets = self.facets('?price_bounds=1500,2500')
+        self.assertEqual(self.summary(facets), self.expected(Product.objects.all(), [1500, 2500]))
+        self.assertEqual(facets['stock']['out_of_stock'], Product.objects.filter(stock=0).count())
+
+    def test_counts_respect_list_filters(self):
+        with self.assertNumQueries(1):
+            facets = self.facets('?categorie=Femmes&price_bounds=2000')
+        self.assertEqual(self.summary(facets), self.expected(Product.objects.filter(categorie='Femmes'), [2000]))
+        self.assertEqual(facets['categorie'][0]['count'], 0)
+
+        facets = self.facets('?code=T0003')
+        self.assertEqual(facets['count'], 1)
+
+    def test_invalid_price_bounds_are_rejected(self):
+        for query in ('?price_bounds=abc', '?price_bounds=-5', '?price_bounds=nan'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/products/facets/{query}', HTTP_HOST='localhost')
+                self.assertEqual(response.status_code, 400)
+
+
+def png_file(name='photo.png', size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class FailingBackend:
+    """Backend de stockage indisponible"""
+
+    def store(self, path):
+        raise ConnectionError('stockage indisponible')
+
+
+class ImageUploadTests(TestCase):
+    """Envoi asynchrone : 202 immédiat, ligne 'pending' traitée par le worker, échecs et reprises"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.local_dir = os.path.join(directory, 'stored')
+        settings_override = override_settings(
+            IMAGE_UPLOAD_BACKEND='apps.products.uploads.LocalFileSystemBackend',
+            IMAGE_UPLOAD_LOCAL_DIR=self.local_dir,
+            IMAGE_UPLOAD_TEMP_DIR=os.path.join(directory, 'tmp'),
+            IMAGE_UPLOAD_QUEUE='worker',
+            IMAGE_VARIANT_FORMATS=[],
+            API_CACHE_TIMEOUT=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.product = make_products(1)[0]
+
+    def upload(self, product=None):
+        product = product or self.product
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f'/api/products/{product.pk}/upload_image/', {'image': png_file()}, HTTP_HOST='localhost'
+            )
+
+    def status(self):
+        return self.client.get(f'/api/products/{self.product.pk}/upload_status/', HTTP_HOST='localhost')
+
+    def run_worker(self, *args):
+        call_command('process_image_uploads', *args, stdout=io.StringIO())
+
+    def test_upload_is_accepted_and_left_for_the_worker(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'pending')
+        # IMAGE_UPLOAD_QUEUE='worker' : rien n'est traité dans le processus web
+        upload = ImageUpload.objects.get()
+        self.assertEqual(upload.status, ImageUpload.STATUS_PENDING)
+        self.assertTrue(bytes(upload.data).startswith(b'\x89PNG'))
+        self.assertEqual(self.status().json()['status'], 'pending')
+
+    def test_worker_stores_image_and_releases_data(self):
+        self.upload()
+        self.run_worker()
+
+        upload = ImageUpload.objects.get()
+        self.assertEqual(upload.status, ImageUpload.STATUS_DONE)
+        self.assertIsNone(upload.data)
+        self.product.refresh_from_db()
+        self.assertEqual(os.path.basename(self.product.image.public_id), os.path.splitext(upload.temp_file)[0])
+        self.assertEqual(os.listdir(self.local_dir), [upload.temp_file])
+        self.assertEqual(self.status().json()['status'], 'done')
+
+    def test_claim_is_atomic(self):
+        self.upload()
+        upload = ImageUpload.objects.get()
+        ImageUpload.objects.filter(pk=upload.pk).update(status=ImageUpload.STATUS_PROCESSING)
+        # Déjà réservé par un autre worker : ignoré
+        self.assertFalse(process_upload(upload.pk))
+        ImageUpload.objects.filter(pk=upload.pk).update(status=ImageUpload.STATUS_PENDING)
+        self.assertTrue(process_upload(upload.pk))
+        self.assertFalse(process_upload(upload.pk))
+        self.assertEqual(len(os.listdir(self.local_dir)), 1)
+
+    def test_failure_is_recorded_and_retried(self):
+        self.upload()
+        with override_settings(IMAGE_UPLOAD_BACKEND='apps.products.tests.FailingBackend'), \
+                self.assertLogs('apps.products.uploads', 'ERROR'):
+            self.run_worker()
+        upload = ImageUpload.objects.get()
+        self.assertEqual(upload.status, ImageUpload.STATUS_FAILED)
+        self.assertIn('stockage indisponible', upload.error)
+        self.assertIsNotNone(upload.data)
+        self.assertEqual(self.status().json()['status'], 'failed')
+
+        # Sans --retry-failed, un échec reste en échec
+        self.run_worker()
+        self.assertEqual(ImageUpload.objects.get().status, ImageUpload.STATUS_FAILED)
+        self.run_worker('--retry-failed')
+        upload = ImageUpload.objects.get()
+        self.assertEqual((upload.status, upload.error), (ImageUpload.STATUS_DONE, ''))
+
+    def test_stale_processing_upload_is_resumed(self):
+        self.upload()
+        ImageUpload.objects.update(
+            status=ImageUpload.STATUS_PROCESSING, updated_at=timezone.now() - timedelta(hours=1)
+        )
+        self.run_worker()
+        self.assertEqual(ImageUpload.objects.get().status, ImageUpload.STATUS_DONE)
+
+    def test_synchronous_mode_processes_before_responding(self):
+        with override_settings(IMAGE_UPLOAD_ASYNC=False):
+            self.assertEqual(self.upload().status_code, 202)
+        self.assertEqual(ImageUpload.objects.get().status, ImageUpload.STATUS_DONE)
+
+    def test_invalid_file_and_missing_upload(self):
+        self.assertEqual(self.status().status_code, 404)
+        response = self.client.post(
+            f'/api/products/{self.product.pk}/upload_image/',
+            {'image': SimpleUploadedFile('x.png', b'pas une image')}, HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_loop_refuses_retry_failed(self):
+        with self.assertRaises(CommandError):
+            self.run_worker('--loop', '--retry-failed')
+
+
+class StockAdjustmentTests(TestCase):
+    """Mouvements de stock : UPDATE conditionnel, 409 en rupture, commandes en tout ou rien"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b, cls.c = make_products(3)
+        Product.objects.filter(pk=cls.a.pk).update(stock=10)
+        Product.objects.filter(pk=cls.b.pk).update(stock=2)
+        Product.objects.filter(pk=cls.c.pk).update(stock=0)
+
+    def post(self, url, data):
+        return self.client.post(url, data, content_type='application/json', HTTP_HOST='localhost')
+
+    def stocks(self):
+        return dict(Product.objects.filter(pk__in=[self.a.pk, self.b.pk, self.c.pk]).values_list('pk', 'stock'))
+
+    def test_decrement_is_a_single_conditional_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(adjust_stock(self.a.pk, 3), 7)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        # stock = stock - n côté base, garde stock >= n : pas de lecture préalable
+        self.assertIn('"stock" = ("products_product"."stock" - 3)', updates[0])
+        self.assertIn('"stock" >= 3', updates[0])
+
+    def test_decrement_from_stale_instance_does_not_lose_updates(self):
+        stale = Product.objects.get(pk=self.a.pk)
+        adjust_stock(self.a.pk, 4)
+        adjust_stock(stale.pk, 4)
+        self.assertEqual(self.stocks()[self.a.pk], 2)
+
+    def test_endpoint_adjusts_and_restocks(self):
+        response = self.post(f'/api/products/{self.a.pk}/adjust_stock/', {'quantity': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'id': self.a.pk, 'stock': 6})
+        response = self.post(f'/api/products/{self.c.pk}/adjust_stock/', {'quantity': -5})
+        self.assertEqual(response.json()['stock'], 5)
+
+    def test_insufficient_stock_returns_409_and_leaves_stock(self):
+        response = self.post(f'/api/products/{self.b.pk}/adjust_stock/', {'quantity': 3})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['insufficient'][0]['stock'], 2)
+        self.assertEqual(self.stocks()[self.b.pk], 2)
+        with self.assertRaises(InsufficientStock):
+            adjust_stock(self.b.pk, 3)
+
+    def test_unknown_product_returns_404(self):
+        response = self.post('/api/products/999999/adjust_stock/', {'quantity': 1})
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch_applies_all_lines(self):
+        response = self.post('/api/products/adjust_stock/', {'lines': [
+            {'product': self.a.pk, 'quantity': 3},
+            {'product': self.b.pk, 'quantity': 2},
+            {'product': self.a.pk, 'quantity': 1},  # lignes d'un même produit cumulées
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stocks(), {self.a.pk: 6, self.b.pk: 0, self.c.pk: 0})
+
+    def test_batch_with_one_insufficient_line_is_rejected_entirely(self):
+        before = self.stocks()
+        response = self.post('/api/products/adjust_stock/', {'lines': [
+            {'product': self.a.pk, 'quantity': 3},
+            {'product': self.b.pk, 'quantity': 5},
+            {'product': self.c.pk, 'quantity': -4},
+        ]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([line['id'] for line in response.json()['insufficient']], [self.b.pk])
+        self.assertEqual(self.stocks(), before)
+
+    def test_batch_with_unknown_product_is_rejected_entirely(self):
+        before = self.stocks()
+        response = self.post('/api/products/adjust_stock/', {'lines': [
+            {'product': self.a.pk, 'quantity': 1},
+            {'product': 999999, 'quantity': 1},
+        ]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['missing'], [999999])
+        self.assertEqual(self.stocks(), before)
+
+
+    def test_out_of_range_quantities_are_rejected(self):
+        for quantity in (-2 ** 31, 2 ** 31, 2 ** 40):
+            with self.subTest(quantity=quantity):
+                response = self.post(f'/api/products/{self.a.pk}/adjust_stock/', {'quantity': quantity})
+                self.assertEqual(response.status_code, 400)
+                response = self.post('/api/products/adjust_stock/', {'lines': [
+                    {'product': self.a.pk, 'quantity': quantity},
+                ]})
+                self.assertEqual(response.status_code, 400)
+
+    def test_restock_beyond_column_range_returns_409(self):
+        Product.objects.filter(pk=self.a.pk).update(stock=MAX_STOCK - 1)
+        response = self.post(f'/api/products/{self.a.pk}/adjust_stock/', {'quantity': -2})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['overflow'][0]['stock'], MAX_STOCK - 1)
+        # Lignes cumulées : chacune dans les bornes, leur somme non
+        response = self.post('/api/products/adjust_stock/', {'lines': [
+            {'product': self.b.pk, 'quantity': -MAX_STOCK},
+            {'product': self.b.pk, 'quantity': -1},
+        ]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.stocks(), {self.a.pk: MAX_STOCK - 1, self.b.pk: 2, self.c.pk: 0})
+        self.assertEqual(self.post(f'/api/products/{self.a.pk}/adjust_stock/', {'quantity': -1}).json()['stock'], MAX_STOCK)
+
+
+class ConcurrentStockTests(TransactionTestCase):
+    """Ventes simultanées sur un même produit : jamais de stock négatif ni de vente perdue"""
+
+    def test_concurrent_sales_never_oversell(self):
+        product = make_products(1)[0]
+        Product.objects.filter(pk=product.pk).update(stock=5)
+        results = []
+        barrier = threading.Barrier(10)
+
+        def sell():
+            try:
+                barrier.wait()
+                try:
+                    adjust_stock(product.pk, 1)
+                    results.append(True)
+                except InsufficientStock:
+                    results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=sell) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(Product.objects.get(pk=product.pk).stock, 0)
+
+
+@override_settings(CATEGORY_IMAGE_CACHE_ALIAS='default', CATEGORY_IMAGE_VERSION_CHECK_INTERVAL=0)
+class CategoryImageCacheTests(TestCase):
+    """Images de catégorie : invalidation vue par les autres workers via la version partagée"""
+
+    def setUp(self):
+        caches['default'].clear()
+        invalidate_category_image_urls()
+        self.addCleanup(invalidate_category_image_urls)
+        self.image = CategoryImage.objects.create(categorie='Hommes', image='parfums/categories/hommes-v1')
+
+    def simulate_other_worker_change(self, image):
+        # Autre worker : base modifiée puis version partagée incrémentée, copie locale intacte
+        CategoryImage.objects.filter(pk=self.image.pk).update(image=image)
+        shared = caches['default']
+        shared.incr(VERSION_KEY)
+        shared.delete(CACHE_KEY)
+
+    def test_invalidation_from_another_worker_is_seen(self):
+        self.assertIn('hommes-v1', get_category_image_urls()['Hommes'])
+        self.simulate_other_worker_change('parfums/categories/hommes-v2')
+        self.assertIn('hommes-v2', get_category_image_urls()['Hommes'])
+
+    def test_local_save_invalidates_immediately(self):
+        get_category_image_urls()
+        self.image.image = 'parfums/categories/hommes-v3'
+        self.image.save()
+        self.assertIn('hommes-v3', get_category_image_urls()['Hommes'])
+
+    @override_settings(CATEGORY_IMAGE_VERSION_CHECK_INTERVAL=60)
+    def test_shared_version_read_at_most_once_per_interval(self):
+        get_category_image_urls()
+        shared = caches['default']
+        with mock.patch.object(shared, 'get', wraps=shared.get) as shared_get:
+            for _ in range(100):
+                get_category_image_urls()
+        self.assertEqual(shared_get.call_count, 0)
+        # Pendant l'intervalle, la copie locale est servie ; ensuite la nouvelle version est lue
+        self.simulate_other_worker_change('parfums/categories/hommes-v4')
+        self.assertIn('hommes-v1', get_category_image_urls()['Hommes'])
+        with mock.patch('apps.products.cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIn('hommes-v4', get_category_image_urls()['Hommes'])
+
+
+
+class ImportProductsTests(TestCase):
+    """import_products : upsert sur le code, colonnes partielles, doublons, erreurs par enregistrement"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def run_import(self, *paths, **options):
+        out = io.StringIO()
+        call_command('import_products', *paths, stdout=out, **options)
+        return out.getvalue()
+
+    def test_upsert_updates_existing_and_creates_new(self):
+        make_products(1)
+        path = self.write('products.csv', (
+            'code,nom_parfum,nom_etiquette,categorie,prix,stock\n'
+            'T0000,Renommé,Etiq,Femmes,2500,9\n'
+            'N0001,Nouveau,Etiq,Hommes,1200,3\n'
+        ))
+        self.run_import(path)
+        self.assertEqual(Product.objects.count(), 2)
+        updated = Product.objects.get(code='T0000')
+        self.assertEqual((updated.nom_parfum, updated.categorie, updated.prix, updated.stock),
+                         ('Renommé', 'Femmes', 2500, 9))
+        self.assertEqual(Product.objects.get(code='N0001').stock, 3)
+
+    def test_missing_columns_keep_existing_values(self):
+        Product.objects.create(code='P1', nom_parfum='A', nom_etiquette='E', categorie='Hommes',
+                               prix=1000, stock=7, description='Gardée')
+        path = self.write('products.ndjson', json.dumps(
+            {'code': 'P1', 'nom_parfum': 'B', 'nom_etiquette': 'E', 'categorie': 'Hommes', 'prix': 1500}
+        ) + '\n')
+        self.run_import(path)
+        product = Product.objects.get(code='P1')
+        self.assertEqual((product.nom_parfum, product.prix, product.stock, product.description),
+                         ('B', 1500, 7, 'Gardée'))
+
+    def test_duplicate_codes_last_occurrence_wins(self):
+        rows = [
+            {'code': 'D1', 'nom_parfum': f'Version {i}', 'nom_etiquette': 'E', 'categorie': 'Femmes', 'prix': 1000 + i}
+            for i in range(5)
+        ]
+        path = self.write('products.json', json.dumps(rows))
+        # Doublons dans un même lot puis répartis sur plusieurs lots
+        for batch_size in (5000, 2):
+            with self.subTest(batch_size=batch_size):
+                self.run_import(path, batch_size=batch_size)
+                self.assertEqual(Product.objects.filter(code='D1').count(), 1)
+                self.assertEqual(Product.objects.get(code='D1').nom_parfum, 'Version 4')
+
+    def test_invalid_records_rejected_with_position(self):
+        valid = {'code': 'V1', 'nom_parfum': 'A', 'nom_etiquette': 'E', 'categorie': 'Hommes', 'prix': 1000}
+        path = self.write('products.json', json.dumps([
+            valid,
+            ['pas', 'un', 'objet'],
+            dict(valid, code='V2', categorie=['Hommes']),
+            dict(valid, code='V3', prix={'montant': 1}),
+        ]))
+        output = self.run_import(path)
+        self.assertEqual(list(Product.objects.values_list('code', flat=True)), ['V1'])
+        self.assertIn('Élément 2 : objet attendu', output)
+        self.assertIn('Élément 3 : valeurs non scalaires : categorie', output)
+        self.assertIn('Élément 4 : valeurs non scalaires : prix', output)
+
+    def test_csv_errors_report_file_lines(self):
+        # Champ multi-ligne entre guillemets : la ligne rapportée est celle du fichier
+        path = self.write('products.csv', (
+            'code,nom_parfum,nom_etiquette,categorie,prix,description\n'
+            'C1,A,E,Hommes,1000,"sur\ndeux lignes"\n'
+            'C2,B,E,Inconnue,1000,\n'
+        ))
+        output = self.run_import(path)
+        self.assertIn('Ligne 4 : catégorie inconnue', output)
+        self.assertEqual(Product.objects.get(code='C1').description, 'sur\ndeux lignes')
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductBulkTests(TestCase):
+    """Endpoints /bulk/ : nombre de requêtes constant, unicité toujours vérifiée, ids stricts"""
+
+    def setUp(self):
+        # Images de catégorie chargées d'avance : hors du décompte des requêtes
+        invalidate_category_image_urls()
+        self.addCleanup(invalidate_category_image_urls)
+        get_category_image_urls()
+
+    def request(self, method, payload):
+        return getattr(self.client, method)(
+            '/api/products/bulk/', payload, content_type='application/json', HTTP_HOST='localhost'
+        )
+
+    def count_queries(self, method, payload):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.request(method, payload)
+        self.assertLess(response.status_code, 300, response.content)
+        return len(queries)
+
+    def items(self, prefix, count):
+        return [
+            {'code': f'{prefix}{i:04d}', 'nom_parfum': f'P{i}', 'nom_etiquette': 'E',
+             'categorie': 'Hommes', 'prix': 1000}
+            for i in range(count)
+        ]
+
+    def test_bulk_create_query_count_is_constant(self):
+        self.assertEqual(self.count_queries('post', self.items('A', 5)),
+                         self.count_queries('post', self.items('B', 200)))
+
+    def test_bulk_update_query_count_is_constant(self):
+        products = make_products(200)
+        small = [{'id': p.pk, 'prix': 2000} for p in products[:5]]
+        large = [{'id': p.pk, 'stock': 9} for p in products[5:]]
+        self.assertEqual(self.count_queries('patch', small), self.count_queries('patch', large))
+        self.assertEqual(Product.objects.filter(stock=9).count(), 195)
+
+    def test_bulk_delete_query_count_is_constant(self):
+        products = make_products(300)
+        for product in products[:20]:
+            ImageUpload.objects.create(product=product, temp_file='x.png')
+        small = self.count_queries('delete', {'ids': [p.pk for p in products[:5]]})
+        large = self.count_queries('delete', {'ids': [p.pk for p in products[5:]]})
+        self.assertEqual(small, large)
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertEqual(Tombstone.objects.filter(model='products.product').count(), 300)
+
+    def test_uniqueness_checked_even_with_field_errors(self):
+        make_products(1)
+        items = self.items('C', 3)
+        items[0]['prix'] = 'abc'
+        items[1]['code'] = 'T0000'
+        items[2]['code'] = items[0]['code']
+        response = self.request('post', items)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertIn('prix', errors[0])
+        self.assertEqual(errors[0]['code'], ['Valeur en double dans la requête.'])
+        self.assertEqual(errors[1]['code'], ['Cette valeur existe déjà.'])
+        self.assertEqual(errors[2]['code'], ['Valeur en double dans la requête.'])
+        self.assertEqual(Product.objects.count(), 1)
+
+    def test_boolean_ids_rejected(self):
+        make_products(2)
+        self.assertEqual(self.request('patch', [{'id': True, 'prix': 5}]).status_code, 400)
+        self.assertEqual(self.request('delete', {'ids': [True, False]}).status_code, 400)
+        self.assertEqual(Product.objects.count(), 2)
+
+
+class SuggestIndexTests(TestCase):
+    """Index de suggestions : classement, préfixes courts mémorisés, reconstruction partagée"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.index = SuggestIndex()
+        Product.objects.bulk_create([
+            Product(code='BC01', nom_parfum='Bleu de Chanel', nom_etiquette='B. Chnl', categorie='Hommes', prix=1000),
+            Product(code='BO02', nom_parfum='Black Opium', nom_etiquette='Blk. Opm', categorie='Femmes', prix=1000),
+            Product(code='HT03', nom_parfum='Terre d\'Hermès', nom_etiquette='Hrm. Tr', categorie='Hommes', prix=1000),
+        ])
+
+    def codes(self, query, **kwargs):
+        return [row['code'] for row in self.index.search(query, **kwargs)]
+
+    def test_prefixes_accents_and_ranking(self):
+        self.assertEqual(self.codes('blk op'), ['BO02'])
+        self.assertEqual(self.codes('herm'), ['HT03'])
+        self.assertEqual(self.codes('bc01'), ['BC01'])
+        # Noms commençant par la saisie, les plus courts d'abord
+        self.assertEqual(self.codes('bl')[:2], ['BO02', 'BC01'])
+        self.assertEqual(self.codes('zz'), [])
+
+    def test_short_prefix_ranking_is_memoized_and_refreshed(self):
+        make_products(60)
+        self.index.invalidate()
+        first = self.codes('p', limit=50)
+        self.assertEqual(len(first), 50)
+        self.assertIn('p', self.index._index.ranked)
+        self.assertEqual(self.codes('p', limit=5), first[:5])
+
+        # Un produit concerné modifié : classement recalculé
+        self.index.update({'id': 0, 'code': 'P', 'nom_parfum': 'P', 'nom_etiquette': 'P', 'categorie': 'Hommes'})
+        self.assertNotIn('p', self.index._index.ranked)
+        self.assertEqual(self.codes('p', limit=1), ['P'])
+
+    def test_invalidate_from_another_process_rebuilds_every_worker(self):
+        self.codes('bl')
+        other = SuggestIndex()
+        with mock.patch.object(self.index, '_rebuild', wraps=self.index._rebuild) as rebuild:
+            self.codes('bl')
+            self.assertEqual(rebuild.call_count, 0)
+            other.invalidate()
+            self.codes('bl')
+            self.assertEqual(rebuild.call_count, 1)
+
+    def test_search_serves_previous_index_during_rebuild(self):
+        self.assertEqual(self.codes('blk'), ['BO02'])
+        loading, release = threading.Event(), threading.Event()
+        rows = list(Product.objects.values(*SUGGEST_FIELDS))
+
+        def slow_rows():
+            loading.set()
+            release.wait(5)
+            return rows
+
+        self.index.invalidate()
+        with mock.patch.object(self.index, '_load_rows', slow_rows):
+            worker = threading.Thread(target=self.codes, args=('bl',))
+            worker.start()
+            self.assertTrue(loading.wait(5))
+            # Reconstruction en cours dans l'autre thread : réponse immédiate avec l'ancien index
+            self.assertEqual(self.codes('blk'), ['BO02'])
+            release.set()
+            worker.join(5)
+        self.assertFalse(worker.is_alive())
+
+
+@override_settings(API_CACHE_TIMEOUT=0, SYNC_SAFETY_MARGIN=0)
+class ProductSyncTests(TestCase):
+    """/sync/ : aller-retour avec next_updated_since recopié tel quel, suppressions comprises"""
+
+    def sync(self, query=''):
+        response = self.client.get(f'/api/products/sync/{query}', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_round_trip_with_updates_and_tombstones(self):
+        products = make_products(3)
+        first = self.sync()
+        self.assertEqual(len(first['updated']), 3)
+        since = first['next_updated_since']
+        self.assertTrue(since.endswith('Z'))
+
+        kept, deleted = products[0], products[1]
+        deleted_pk = deleted.pk
+        kept.prix = 9999
+        kept.save()
+        deleted.delete()
+
+        # Valeur non encodée dans l'URL, comme la recopient la plupart des clients
+        second = self.sync(f'?updated_since={since}')
+        self.assertEqual([row['code'] for row in second['updated']], [kept.code])
+        self.assertEqual(second['deleted'], [deleted_pk])
+
+        third = self.sync(f"?updated_since={second['next_updated_since']}")
+        self.assertEqual((third['updated'], third['deleted']), ([], []))
+
+    def test_offset_with_decoded_plus_is_accepted(self):
+        make_products(1)
+        since = (timezone.now() - timedelta(hours=1)).isoformat()
+        self.assertIn('+00:00', since)
+        self.assertEqual(len(self.sync(f'?updated_since={since}')['updated']), 1)
+
+    def test_invalid_date_is_rejected(self):
+        for value in ('hier', '2026-13-45T10:00:00Z'):
+            with self.subTest(value=value):
+                response = self.client.get(f'/api/products/sync/?updated_since={value}', HTTP_HOST='localhost')
+                self.assertEqual(response.status_code, 400)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductSparseFieldsetTests(TestCase):
+    """?fields= / ?omit= : champs rendus et colonnes lues, curseurs compris"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_products(12, description='Longue description')
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200, response.content)
+        selects = [query['sql'] for query in queries if 'FROM "products_product"' in query['sql']]
+        return response.json(), selects
+
+    def test_fields_limits_keys_and_select(self):
+        payload, selects = self.get('/api/products/?fields=code,prix')
+        self.assertEqual(set(payload['results'][0]), {'code', 'prix'})
+        self.assertFalse([sql for sql in selects if '"description"' in sql])
+
+    def test_omit_removes_fields(self):
+        payload, _ = self.get('/api/products/?omit=description,image_variants')
+        row = payload['results'][0]
+        self.assertNotIn('description', row)
+        self.assertNotIn('image_variants', row)
+        self.assertIn('image_url', row)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/products/?fields=code,secret', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_cursor_keys_loaded_for_list_and_sync(self):
+        # Clés du curseur absentes de ?fields= : chargées quand même, sans requête par ligne
+        rows = walk_cursor(self.client, '/api/products/?cursor=&page_size=5&fields=code')
+        self.assertEqual(len(rows), 12)
+        payload, selects = self.get('/api/products/sync/?fields=code&page_size=5')
+        self.assertEqual(len(selects), 1)
+        self.assertEqual(set(payload['updated'][0]), {'code'})
+        self.assertIsNotNone(payload['next'])
+
+    def test_write_methods_ignore_sparse_parameters(self):
+        product = Product.objects.first()
+        response = self.client.patch(
+            f'/api/products/{product.pk}/?fields=code', {'prix': 10},
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIn('prix', response.json())
+
+
+class FixProductImagesTests(TestCase):
+    """fix_product_images : UPDATE ensemblistes par catégorie, simulation et lots"""
+
+    def setUp(self):
+        self.products = make_products(10, image='image/upload/v1/parfums/products/old.jpg')
+        Product.objects.filter(pk=self.products[0].pk).update(image=None)
+
+    def run_command(self, *args):
+        out = io.StringIO()
+        call_command('fix_product_images', *args, stdout=out)
+        return out.getvalue()
+
+    def images(self, categorie):
+        return list(Product.objects.filter(categorie=categorie).order_by('pk').values_list('image', flat=True))
+
+    def test_dry_run_counts_without_writing(self):
+        output = self.run_command('--all', '--dry-run')
+        self.assertIn('Hommes : 4 produits concernés sur 5', output)
+        self.assertIn('Femmes : 5 produits concernés sur 5', output)
+        self.assertEqual(Product.objects.filter(image__isnull=False).count(), 9)
+
+    def test_clears_one_category_and_invalidates_cache(self):
+        before = Product.objects.get(pk=self.products[1].pk).updated_at
+        with mock.patch('apps.products.management.commands.fix_product_images.invalidate') as invalidate:
+            self.run_command('--categorie=Femmes')
+        invalidate.assert_called_once_with('products')
+        self.assertEqual(self.images('Femmes'), [None] * 5)
+        self.assertEqual(Product.objects.filter(categorie='Hommes', image__isnull=False).count(), 4)
+        self.assertGreater(Product.objects.get(pk=self.products[1].pk).updated_at, before)
+
+    def test_set_image_reaches_empty_images_and_skips_unchanged(self):
+        new_image = 'image/upload/v1/parfums/products/hommes.jpg'
+        Product.objects.filter(pk=self.products[2].pk).update(image=new_image)
+        output = self.run_command('--categorie=Hommes', f'--set-image={new_image}')
+        self.assertIn('Images réassignées : 4', output)
+        self.assertEqual(Product.objects.filter(categorie='Hommes', image=new_image).count(), 5)
+
+    def test_batches_give_the_same_result(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.run_command('--all', '--batch-size=2')
+        self.assertFalse(Product.objects.filter(image__isnull=False).exists())
+        updates = [query for query in queries if query['sql'].startswith('UPDATE')]
+        # Hommes : 4 produits -> 2 lots ; Femmes : 5 produits -> 3 lots
+        self.assertEqual(len(updates), 5)
+
+    def test_requires_a_category(self):
+        self.assertIn('--categorie=Femmes ou --all', self.run_command())
+        self.assertIn('Catégorie inconnue', self.run_command('--categorie=Enfants'))
+        self.assertEqual(Product.objects.filter(image__isnull=False).count(), 9)
+
+
+class CloudinaryUrlCacheTests(TestCase):
+    """URLs Cloudinary construites une fois par version d'image, identiques à celles du SDK"""
+
+    def setUp(self):
+        _build_cloudinary_url.cache_clear()
+        make_products(3, image='image/upload/v1700000000/parfums/products/a.jpg')
+
+    def test_url_matches_sdk_and_is_built_once(self):
+        products = list(Product.objects.all())
+        expected = Product.objects.first().image.url
+        for product in products:
+            self.assertEqual(cloudinary_url(product.image), expected)
+            self.assertEqual(cloudinary_url(product.image), expected)
+        info = _build_cloudinary_url.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+
+    def test_new_version_gives_new_url(self):
+        old = cloudinary_url(Product.objects.first().image)
+        Product.objects.update(image='image/upload/v1800000000/parfums/products/a.jpg')
+        new = cloudinary_url(Product.objects.first().image)
+        self.assertNotEqual(old, new)
+        self.assertIn('v1800000000', new)
+
+    def test_list_serializes_without_rebuilding_urls(self):
+        self.client.get('/api/products/', HTTP_HOST='localhost')
+        with mock.patch('cloudinary.CloudinaryResource.build_url') as build_url:
+            response = self.client.get('/api/products/?fields=image_url', HTTP_HOST='localhost')
+        build_url.assert_not_called()
+        self.assertTrue(all('a.jpg' in row['image_url'] for row in response.json()['results']))
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductColumnarTests(TestCase):
+    """?format=columnar : mêmes données que le JSON ligne à ligne, une clé par colonne"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_products(8)
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def decode(self, results):
+        columns = {
+            name: [column['dictionary'][code] for code in column['codes']] if isinstance(column, dict) else column
+            for name, column in results['columns'].items()
+        }
+        return [
+            {name: values[index] for name, values in columns.items()}
+            for index in range(results['rows'])
+        ]
+
+    def test_columnar_decodes_to_row_payload(self):
+        for query in ('', 'fields=code,categorie,prix&', 'cursor=&page_size=3&'):
+            with self.subTest(query=query):
+                rows = self.get(f'/api/products/?{query}').json()
+                response = self.get(f'/api/products/?{query}format=columnar')
+                self.assertEqual(response['Content-Type'], 'application/vnd.perfum.columnar+json')
+                columnar = response.json()
+                self.assertEqual(self.decode(columnar['results']), rows['results'])
+                # Pagination inchangée (le lien suivant garde le format)
+                self.assertEqual(set(columnar) - {'results'}, set(rows) - {'results'})
+
+    def test_repetitive_columns_are_dictionary_encoded(self):
+        columns = self.get('/api/products/?format=columnar').json()['results']['columns']
+        self.assertEqual(sorted(columns['categorie']['dictionary']), ['Femmes', 'Hommes'])
+        self.assertEqual(len(columns['categorie']['codes']), 8)
+        self.assertIsInstance(columns['code'], list)
+
+    def test_errors_and_other_actions_unchanged(self):
+        response = self.client.get('/api/products/?fields=secret&format=columnar', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+        product = Product.objects.first()
+        response = self.client.get(f'/api/products/{product.pk}/?format=columnar', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 404)
+
+    @skipUnless(msgpack, 'msgpack non installé')
+    def test_msgpack_matches_columnar_json(self):
+        response = self.get('/api/products/?format=msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.get('/api/products/?format=columnar').json())
+
+    @skipIf(msgpack, 'msgpack installé')
+    def test_msgpack_not_offered_without_package(self):
+        response = self.client.get('/api/products/?format=msgpack', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class ProductBatchTests(TestCase):
+    """/batch/ : plusieurs produits par code en une requête, ordre de la demande conservé"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_products(30)
+
+    def setUp(self):
+        invalidate_category_image_urls()
+        self.addCleanup(invalidate_category_image_urls)
+        get_category_image_urls()
+
+    def test_get_and_post_return_requested_codes_in_order(self):
+        expected = ['T0005', 'T0001', 'T0020']
+        responses = [
+            self.client.get('/api/products/batch/?codes=T0005,T0001,NOPE,T0005,T0020', HTTP_HOST='localhost'),
+            self.client.post('/api/products/batch/', {'codes': ['T0005', 'T0001', 'NOPE', ' T0020 ']},
+                             content_type='application/json', HTTP_HOST='localhost'),
+        ]
+        for response in responses:
+            self.assertEqual(response.status_code, 200, response.content)
+            payload = response.json()
+            self.assertEqual(list(payload['results']), expected)
+            self.assertEqual(payload['results']['T0001']['nom_parfum'], 'Parfum 1')
+            self.assertEqual(payload['missing'], ['NOPE'])
+
+    def test_single_query_whatever_the_number_of_codes(self):
+        for count in (2, 25):
+            codes = ','.join(f'T{i:04d}' for i in range(count))
+            with self.subTest(count=count), self.assertNumQueries(1):
+                response = self.client.get(f'/api/products/batch/?codes={codes}', HTTP_HOST='localhost')
+            self.assertEqual(len(response.json()['results']), count)
+
+    def test_sparse_fields_keep_code_keys(self):
+        response = self.client.get('/api/products/batch/?codes=T0002,T0003&fields=prix', HTTP_HOST='localhost')
+        results = response.json()['results']
+        self.assertEqual(list(results), ['T0002', 'T0003'])
+        self.assertEqual(set(results['T0002']), {'prix'})
+
+    def test_invalid_requests(self):
+        too_many = ','.join(f'C{i}' for i in range(501))
+        for method, payload in (
+            ('get', {}),
+            ('get', {'codes': ' , '}),
+            ('get', {'codes': too_many}),
+            ('post', {'codes': [1, 2]}),
+            ('post', {'codes': {'T0001': 1}}),
+        ):
+            with self.subTest(method=method, payload=str(payload)[:40]):
+                if method == 'get':
+                    response = self.client.get('/api/products/batch/', payload, HTTP_HOST='localhost')
+                else:
+                    response = self.client.post('/api/products/batch/', payload,
+                                                content_type='application/json', HTTP_HOST='localhost')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
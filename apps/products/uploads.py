@@ -0,0 +1,179 @@
+# ==================== apps/products/uploads.py ====================
+"""
+Envoi asynchrone des images produits.
+
+`upload_image` enregistre le fichier reçu dans ImageUpload.data (en base),
+crée un ImageUpload 'pending' et répond immédiatement (202). Le fichier est
+ensuite envoyé vers le backend de stockage (IMAGE_UPLOAD_BACKEND :
+Cloudinary par défaut, système de fichiers local pour les tests), les
+miniatures sont générées, puis Product.image est mis à jour.
+
+IMAGE_UPLOAD_QUEUE choisit qui traite les envois :
+- 'worker' (défaut) : le processus dédié `process_image_uploads --loop`
+  (service worker Render, service `worker` de docker-compose) ; rien ne
+  tourne dans les workers web, et un envoi survit à leur redémarrage. Les
+  octets étant en base, le worker n'a pas besoin du disque du service web
+- 'thread' : un pool de threads du worker web (développement) ; les envois
+  interrompus sont repris par le processus dédié ou la commande
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class CloudinaryBackend:
+    """Envoie le fichier sur Cloudinary avec les options du champ Product.image"""
+
+    def store(self, path):
+        from cloudinary import uploader
+        from .models import Product
+
+        field = Product._meta.get_field('image')
+        options = {'type': field.type, 'resource_type': field.resource_type}
+        options.update(field.options)
+        return uploader.upload_resource(path, **options)
+
+
+class LocalFileSystemBackend:
+    """Copie le fichier dans IMAGE_UPLOAD_LOCAL_DIR (tests, développement)"""
+
+    def store(self, path):
+        location = getattr(settings, 'IMAGE_UPLOAD_LOCAL_DIR', os.path.join(settings.MEDIA_ROOT, 'products'))
+        os.makedirs(location, exist_ok=True)
+        name = os.path.basename(path)
+        shutil.copyfile(path, os.path.join(location, name))
+        return f'parfums/products/{name}'
+
+
+def get_backend():
+    return import_string(settings.IMAGE_UPLOAD_BACKEND)()
+
+
+def temp_storage():
+    return FileSystemStorage(location=settings.IMAGE_UPLOAD_TEMP_DIR)
+
+
+def accept_upload(product, uploaded_file):
+    """Stocke le fichier en base et planifie son envoi ; retourne l'ImageUpload"""
+    from .models import ImageUpload
+
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    upload = ImageUpload.objects.create(
+        product=product,
+        temp_file=f'{product.pk}-{uuid.uuid4().hex}{extension}',
+        data=b''.join(uploaded_file.chunks()),
+    )
+    transaction.on_commit(lambda: enqueue(upload.pk))
+    return upload
+
+
+@contextmanager
+def staged_file(upload):
+    """
+    Chemin local du fichier reçu, le temps de l'envoi : écrit depuis
+    ImageUpload.data dans IMAGE_UPLOAD_TEMP_DIR puis supprimé (envois
+    antérieurs sans `data` : fichier déjà présent dans ce dossier)
+    """
+    if upload.data is None:
+        yield temp_storage().path(upload.temp_file)
+        return
+
+    os.makedirs(settings.IMAGE_UPLOAD_TEMP_DIR, exist_ok=True)
+    directory = tempfile.mkdtemp(dir=settings.IMAGE_UPLOAD_TEMP_DIR)
+    path = os.path.join(directory, upload.temp_file)
+    try:
+        with open(path, 'wb') as handle:
+            handle.write(upload.data)
+        yield path
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_UPLOAD_WORKERS', 2),
+                thread_name_prefix='image-upload',
+            )
+        return _executor
+
+
+def enqueue(upload_id):
+    if not getattr(settings, 'IMAGE_UPLOAD_ASYNC', True):
+        process_upload(upload_id)
+        return
+    if getattr(settings, 'IMAGE_UPLOAD_QUEUE', 'worker') == 'thread':
+        _get_executor().submit(_run_in_thread, upload_id)
+    # 'worker' : la ligne 'pending' est prise par process_image_uploads --loop
+
+
+def _run_in_thread(upload_id):
+    try:
+        process_upload(upload_id)
+    finally:
+        # Connexions propres au thread : ne pas les laisser ouvertes
+        connections.close_all()
+
+
+def _variants_from_local_file(path, product):
+    """Miniatures générées depuis le fichier temporaire (pas de re-téléchargement)"""
+    from .variants import build_variants
+
+    try:
+        return build_variants(path, f'products/{product.pk}', product.image)
+    except Exception:
+        logger.exception("Échec de la génération des miniatures du produit %s", product.pk)
+        return {}
+
+
+def process_upload(upload_id):
+    """Envoie un ImageUpload 'pending' vers le backend ; retourne True si terminé"""
+    from .models import ImageUpload, Product
+
+    # Réservation atomique : un seul worker traite un envoi donné
+    claimed = ImageUpload.objects.filter(pk=upload_id, status=ImageUpload.STATUS_PENDING).update(
+        status=ImageUpload.STATUS_PROCESSING, updated_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    upload = ImageUpload.objects.select_related('product').get(pk=upload_id)
+    try:
+        product = upload.product
+        with staged_file(upload) as path:
+            # Ressource Cloudinary (et non chaîne) : même clé source qu'après relecture en base
+            product.image = Product._meta.get_field('image').to_python(get_backend().store(path))
+            product.image_variants = _variants_from_local_file(path, product)
+        product.save(update_fields=['image', 'image_variants', 'updated_at'])
+    except Exception as e:
+        logger.exception("Échec de l'envoi de l'image %s", upload_id)
+        ImageUpload.objects.filter(pk=upload_id).update(
+            status=ImageUpload.STATUS_FAILED, error=str(e), updated_at=timezone.now()
+        )
+        return False
+
+    # Octets conservés en cas d'échec (--retry-failed), libérés une fois l'envoi terminé
+    ImageUpload.objects.filter(pk=upload_id).update(
+        status=ImageUpload.STATUS_DONE, error='', data=None, updated_at=timezone.now()
+    )
+    if upload.data is None:
+        temp_storage().delete(upload.temp_file)
+    return True
@@ -0,0 +1,132 @@
+# ==================== apps/products/variants.py ====================
+"""
+Miniatures et variantes responsives (WebP / AVIF) des images produits et
+catégories, générées localement avec Pillow.
+
+Le redimensionnement et l'encodage (CPU) tournent dans un ProcessPoolExecutor
+démarré en mode 'spawn' : `render_variants` n'utilise ni Django ni la base,
+il reçoit un chemin ou une URL et renvoie les octets encodés. Le processus
+appelant enregistre les fichiers dans le stockage et met à jour
+`image_variants` = {'source': <image>, 'formats': {format: {largeur: url}}}.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (80, 160, 320, 640)
+DEFAULT_FORMATS = ('webp', 'avif')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def render_variants(source, widths, formats, quality=75):
+    """
+    Exécuté dans un processus du pool : lit l'image (chemin local ou URL) et
+    retourne {format: {largeur: octets}}, sans jamais agrandir l'original.
+    """
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source, timeout=30) as response:
+            image = Image.open(io.BytesIO(response.read()))
+    else:
+        image = Image.open(source)
+
+    with image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+
+        targets = sorted({min(width, image.width) for width in widths}, reverse=True)
+        results = {fmt: {} for fmt in formats}
+        current = image
+        # Du plus grand au plus petit : chaque réduction part de la précédente
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            current = current.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            for fmt in formats:
+                buffer = io.BytesIO()
+                current.save(buffer, fmt.upper(), quality=quality)
+                results[fmt][width] = buffer.getvalue()
+        return results
+
+
+def supported_formats(formats):
+    return [fmt for fmt in formats if features.check(fmt)]
+
+
+def variant_settings():
+    from django.conf import settings
+
+    return {
+        'widths': list(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_WIDTHS)),
+        'formats': supported_formats(getattr(settings, 'IMAGE_VARIANT_FORMATS', DEFAULT_FORMATS)),
+        'quality': getattr(settings, 'IMAGE_VARIANT_QUALITY', 75),
+    }
+
+
+def variant_storage():
+    """
+    IMAGE_VARIANT_STORAGE, sinon le stockage par défaut (STORAGES['default'] :
+    Cloudinary) ; jamais le disque du conteneur, éphémère et non servi en production
+    """
+    from django.conf import settings
+    from django.core.files.storage import default_storage
+    from django.utils.module_loading import import_string
+
+    storage_path = getattr(settings, 'IMAGE_VARIANT_STORAGE', None)
+    return import_string(storage_path)() if storage_path else default_storage
+
+
+def make_pool(processes):
+    # 'spawn' : les processus fils n'héritent ni des sockets Postgres ni des threads du worker
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+
+def get_pool():
+    """Pool partagé du worker web, créé au premier envoi d'image"""
+    from django.conf import settings
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = make_pool(getattr(settings, 'IMAGE_VARIANT_PROCESSES', 1))
+        return _pool
+
+
+def source_key(image):
+    return image.get_prep_value() if hasattr(image, 'get_prep_value') else str(image)
+
+
+def save_variants(rendered, prefix, image):
+    """Enregistre les octets produits par `render_variants` et retourne `image_variants`"""
+    from django.core.files.base import ContentFile
+
+    storage = variant_storage()
+    stem = os.path.splitext(os.path.basename(source_key(image)))[0]
+    formats = {}
+    for fmt, sizes in rendered.items():
+        for width, data in sizes.items():
+            name = f'variants/{prefix}/{stem}-{width}w.{fmt}'
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(data))
+            formats.setdefault(fmt, {})[str(width)] = storage.url(name)
+    return {'source': source_key(image), 'formats': formats}
+
+
+def build_variants(source, prefix, image, pool=None):
+    """Génère et enregistre les variantes d'une image ; retourne `image_variants`"""
+    options = variant_settings()
+    if not options['formats']:
+        return {}
+    future = (pool or get_pool()).submit(
+        render_variants, source, options['widths'], options['formats'], options['quality']
+    )
+    return save_variants(future.result(), prefix, image)
@@ -6,15 +6,34 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Product
+from apps.core.bulk import BulkMixin
+from apps.core.caching import CachedResponseMixin
+from apps.core.columnar import ColumnarMixin
+from apps.core.conditional import ConditionalGetMixin
+from apps.core.export import ExportMixin
+from apps.core.fastread import FastReadMixin
+from apps.core.sparse import SparseFieldsetMixin
+from apps.core.sync import SyncMixin
+from .cache import get_category_image_urls, get_category_image_variants
+from .facets import facet_counts, price_bounds
+from .filters import ProductSearchFilter
+from .models import Product, absolute_variants, resolve_image, resolve_image_variants
+from .pagination import ProductPagination
 from .serializers import (
     ProductSerializer, 
     ProductCreateSerializer, 
     ProductUpdateSerializer,
-    ImageUploadSerializer
+    ImageUploadSerializer,
+    ImageUploadStatusSerializer,
+    StockAdjustmentSerializer,
+    StockBatchSerializer
 )
+from .stock import InsufficientStock, StockOverflow, adjust_stock, adjust_stock_batch
+from .suggest import suggest_index
+from .uploads import accept_upload
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(BulkMixin, ExportMixin, SyncMixin, SparseFieldsetMixin, ConditionalGetMixin,
+                     CachedResponseMixin, ColumnarMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les produits
     
@@ -24,14 +43,36 @@ class ProductViewSet(viewsets.ModelViewSet):
     update: Mettre à jour un produit
     partial_update: Mise à jour partielle d'un produit
     destroy: Supprimer un produit
-    upload_image: Télécharger une image pour un produit
+    upload_image: Télécharger une image pour un produit (envoi en arrière-plan)
+    upload_status: Suivre l'envoi de la dernière image
+    suggest: Suggestions de recherche (nom, étiquette, code)
+    batch: Plusieurs produits par code en un appel
+    facets: Compteurs par catégorie, tranche de prix et stock (mêmes filtres que list)
+    adjust_stock: Mouvement de stock atomique (un produit)
+    adjust_stock_batch: Mouvements de stock d'une commande multi-lignes (tout ou rien)
+    bulk: Création / modification / suppression en masse
+    sync: Modifications et suppressions depuis une date
+    export: Export CSV / NDJSON en flux
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
     filterset_fields = ['categorie', 'code']
     search_fields = ['nom_parfum', 'nom_etiquette', 'code', 'description']
     ordering_fields = ['prix', 'stock', 'created_at']
+    columnar_dictionary_fields = ('categorie', 'image_url', 'image_source')
+    pagination_class = ProductPagination
+    cache_namespaces = ('products',)
+    sparse_actions = ('list', 'retrieve', 'sync', 'batch')
+    batch_max_codes = 500
+    facet_max_price_bounds = 20
+    bulk_create_serializer_class = ProductCreateSerializer
+    bulk_update_serializer_class = ProductUpdateSerializer
+    bulk_unique_fields = ('code',)
+    export_fields = ['id', 'code', 'nom_parfum', 'nom_etiquette', 'categorie', 'description',
+                     'prix', 'stock', 'image', 'created_at', 'updated_at']
+    export_columns = ['id', 'code', 'nom_parfum', 'nom_etiquette', 'categorie', 'description',
+                      'prix', 'stock', 'image', 'image_url', 'image_source', 'created_at', 'updated_at']
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -40,8 +81,53 @@ class ProductViewSet(viewsets.ModelViewSet):
             return ProductUpdateSerializer
         if self.action == 'upload_image':
             return ImageUploadSerializer
+        if self.action == 'adjust_stock':
+            return StockAdjustmentSerializer
+        if self.action == 'adjust_stock_batch':
+            return StockBatchSerializer
         return ProductSerializer
     
+    def get_export_context(self):
+        return {'category_image_urls': self.get_category_images()[0]}
+    
+    def transform_export_row(self, row, context):
+        image = row['image']
+        row['image_url'], row['image_source'] = resolve_image(image, row['categorie'], context['category_image_urls'])
+        row['image'] = image.get_prep_value() if image else None
+        return row
+    
+    def bulk_changed(self, ids=None, snapshot=None):
+        super().bulk_changed(ids, snapshot)
+        # Écritures sans signaux : lignes modifiées et traces de suppression rattrapées au prochain appel
+        suggest_index.mark_stale()
+    
+    def get_category_images(self):
+        """({catégorie: url}, {catégorie: variantes}) lus une seule fois par requête"""
+        if not hasattr(self, '_category_images'):
+            self._category_images = (get_category_image_urls(), get_category_image_variants())
+        return self._category_images
+    
+    def get_serializer_context(self):
+        # Partagées par toutes les lignes (serializer et chemin rapide)
+        context = super().get_serializer_context()
+        context['category_image_urls'], context['category_image_variants'] = self.get_category_images()
+        return context
+    
+    def transform_fast_row(self, row, fields, context):
+        # Mêmes valeurs que ProductSerializer.get_image_url / get_image_source / get_image_variants
+        if 'image_url' in fields or 'image_source' in fields:
+            url, row['image_source'] = resolve_image(row['image'], row['categorie'], context['category_image_urls'])
+            row['image_url'] = self.request.build_absolute_uri(url) if url else url
+        if 'image_variants' in fields:
+            row['image_variants'] = absolute_variants(resolve_image_variants(
+                row['image'], row['image_variants'], row['categorie'], context['category_image_variants']
+            ), self.request)
+        return row
+    
+    def get_etag_extra(self):
+        # Les images par défaut des catégories entrent dans image_url / image_variants
+        return [sorted(images.items()) for images in self.get_category_images()]
+    
     @swagger_auto_schema(
         operation_description="Récupérer la liste des produits avec filtres optionnels",
         manual_parameters=[
@@ -49,7 +135,16 @@ class ProductViewSet(viewsets.ModelViewSet):
                             description="Filtrer par catégorie (Hommes/Femmes)", 
                             type=openapi.TYPE_STRING),
             openapi.Parameter('search', openapi.IN_QUERY, 
-                            description="Rechercher dans nom, code, description", 
+                            description="Rechercher dans nom, étiquette, code, description (trié par pertinence)", 
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, 
+                            description="Pagination par curseur (vide pour la première page, sans total ni tri personnalisé)", 
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('fields', openapi.IN_QUERY, 
+                            description="Champs à renvoyer, séparés par des virgules (ex: code,nom_parfum,prix,image_url)", 
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('omit', openapi.IN_QUERY, 
+                            description="Champs à exclure, séparés par des virgules", 
                             type=openapi.TYPE_STRING),
         ]
     )
@@ -70,7 +165,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         )
     
     @swagger_auto_schema(
-        operation_description="Télécharger une image pour un produit",
+        operation_description="Télécharger une image pour un produit (réponse immédiate, envoi vers le stockage en arrière-plan)",
         manual_parameters=[
             openapi.Parameter(
                 'image',
@@ -80,7 +175,7 @@ class ProductViewSet(viewsets.ModelViewSet):
                 required=True
             )
         ],
-        responses={200: ProductSerializer}
+        responses={202: ImageUploadStatusSerializer}
     )
     @action(detail=True, methods=['post'], parser_classes=[MultiPartParser, FormParser])
     def upload_image(self, request, pk=None):
@@ -89,10 +184,205 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = ImageUploadSerializer(data=request.data)
         
         if serializer.is_valid():
-            product.image = serializer.validated_data['image']
-            product.save()
+            upload = accept_upload(product, serializer.validated_data['image'])
+            return Response(
+                ImageUploadStatusSerializer(upload).data,
+                status=status.HTTP_202_ACCEPTED
+            )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @swagger_auto_schema(
+        operation_description="Statut du dernier envoi d'image du produit (pending, processing, done, failed)",
+        responses={200: ImageUploadStatusSerializer}
+    )
+    @action(detail=True, methods=['get'])
+    def upload_status(self, request, pk=None):
+        """Suivre l'envoi de la dernière image d'un produit"""
+        product = self.get_object()
+        upload = product.image_uploads.defer('data').order_by('-created_at').first()
+        if upload is None:
+            return Response(
+                {'error': "Aucun envoi d'image pour ce produit"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(ImageUploadStatusSerializer(upload).data)
+    
+    @swagger_auto_schema(
+        operation_description="Suggestions instantanées sur le nom, l'étiquette et le code (index en mémoire)",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, 
+                            description="Début de saisie (ex: 'blk op', 'b. ch', '02')", 
+                            type=openapi.TYPE_STRING,
+                            required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, 
+                            description="Nombre maximum de suggestions (10 par défaut, 50 max)", 
+                            type=openapi.TYPE_INTEGER),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Suggestions de produits pendant la saisie"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        return Response(suggest_index.search(request.query_params.get('q', ''), limit=limit))
+    
+    def get_sparse_required_columns(self):
+        columns = super().get_sparse_required_columns()
+        # batch : résultats indexés par code, même si ?fields= ne le demande pas
+        return columns + ['code'] if self.action == 'batch' else columns
+    
+    @swagger_auto_schema(
+        methods=['get'],
+        operation_description="Récupérer plusieurs produits par code en une requête (résultats indexés par code)",
+        manual_parameters=[
+            openapi.Parameter('codes', openapi.IN_QUERY, 
+                            description="Codes séparés par des virgules (ex: 001,022,111)", 
+                            type=openapi.TYPE_STRING,
+                            required=True),
+            openapi.Parameter('fields', openapi.IN_QUERY, 
+                            description="Champs à renvoyer, séparés par des virgules", 
+                            type=openapi.TYPE_STRING),
+        ]
+    )
+    @swagger_auto_schema(
+        methods=['post'],
+        operation_description="Variante POST pour les longues listes de codes",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['codes'],
+            properties={
+                'codes': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+            }
+        )
+    )
+    @action(detail=False, methods=['get', 'post'])
+    def batch(self, request):
+        """Plusieurs produits par code : une seule requête `code__in`"""
+        if request.method == 'POST':
+            codes = request.data.get('codes')
+        else:
+            codes = request.query_params.get('codes')
+        if isinstance(codes, str):
+            codes = codes.split(',')
+        if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+            return Response(
+                {'error': 'Le paramètre codes est requis (liste de codes)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        codes = list(dict.fromkeys(code.strip() for code in codes if code.strip()))
+        if not codes or len(codes) > self.batch_max_codes:
+            return Response(
+                {'error': f'Entre 1 et {self.batch_max_codes} codes sont attendus'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if request.method == 'GET':
+            return self.cached_response(request, self.batch_response, codes)
+        return self.batch_response(request, codes)
+    
+    def batch_response(self, request, codes):
+        products = {
+            product.code: product
+            for product in self.get_queryset().filter(code__in=codes)
+        }
+        found = [products[code] for code in codes if code in products]
+        # Un seul serializer : images par défaut des catégories lues une fois pour tout le lot
+        serializer = self.get_serializer(found, many=True)
+        return Response({
+            'results': dict(zip((product.code for product in found), serializer.data)),
+            'missing': [code for code in codes if code not in products],
+        })
+    
+    @swagger_auto_schema(
+        operation_description="Compteurs de facettes (catégorie, tranches de prix, en stock / rupture) en une requête, avec les filtres de la liste",
+        manual_parameters=[
+            openapi.Parameter('categorie', openapi.IN_QUERY, 
+                            description="Filtrer par catégorie (Hommes/Femmes)", 
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('search', openapi.IN_QUERY, 
+                            description="Rechercher dans nom, étiquette, code, description", 
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('price_bounds', openapi.IN_QUERY, 
+                            description="Bornes des tranches de prix séparées par des virgules (ex: 2000,3500,5000)", 
+                            type=openapi.TYPE_STRING),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Compteurs de la barre latérale du catalogue"""
+        try:
+            bounds = price_bounds(request.query_params.get('price_bounds'))
+        except ValueError:
+            return Response(
+                {'error': 'Le paramètre price_bounds doit être une liste de prix positifs'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(bounds) > self.facet_max_price_bounds:
+            return Response(
+                {'error': f'Au plus {self.facet_max_price_bounds} bornes de prix'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Même cache que la liste : invalidé avec elle à chaque modification de produit
+        return self.cached_response(request, self.facets_response, bounds)
+    
+    def facets_response(self, request, bounds):
+        return Response(facet_counts(self.filter_queryset(self.get_queryset()), bounds))
+    
+    @swagger_auto_schema(
+        operation_description="Retirer (ou ajouter si négatif) une quantité du stock, sans mise à jour perdue ; 409 si stock insuffisant ou maximal dépassé",
+        request_body=StockAdjustmentSerializer
+    )
+    @action(detail=True, methods=['post'])
+    def adjust_stock(self, request, pk=None):
+        """Mouvement de stock atomique : UPDATE stock = stock - n WHERE stock >= n"""
+        serializer = StockAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            stock = adjust_stock(pk, serializer.validated_data['quantity'])
+        except (Product.DoesNotExist, ValueError):
+            return Response({'error': 'Produit introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        except InsufficientStock as e:
+            return Response(
+                {'error': 'Stock insuffisant', 'insufficient': e.lines},
+                status=status.HTTP_409_CONFLICT
+            )
+        except StockOverflow as e:
+            return Response(
+                {'error': 'Stock maximal dépassé', 'overflow': e.lines},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'id': int(pk), 'stock': stock})
+    
+    @swagger_auto_schema(
+        operation_description="Mouvements de stock d'une commande multi-lignes, appliqués en tout ou rien ; 409 si une ligne est en rupture",
+        request_body=StockBatchSerializer
+    )
+    @action(detail=False, methods=['post'], url_path='adjust_stock', url_name='adjust-stock-batch')
+    def adjust_stock_batch(self, request):
+        """Commande multi-lignes : verrous pris dans l'ordre des ids, un seul UPDATE"""
+        serializer = StockBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lines = [(line['product'], line['quantity']) for line in serializer.validated_data['lines']]
+        
+        try:
+            stocks = adjust_stock_batch(lines)
+        except Product.DoesNotExist as e:
+            return Response(
+                {'error': 'Produits introuvables', 'missing': e.args[0] if e.args else []},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except InsufficientStock as e:
+            return Response(
+                {'error': 'Stock insuffisant', 'insufficient': e.lines},
+                status=status.HTTP_409_CONFLICT
+            )
+        except StockOverflow as e:
             return Response(
-                ProductSerializer(product, context={'request': request}).data,
-                status=status.HTTP_200_OK
+                {'error': 'Stock maximal dépassé', 'overflow': e.lines},
+                status=status.HTTP_409_CONFLICT
             )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response({'results': [{'id': product_id, 'stock': stock} for product_id, stock in stocks.items()]})
@@ -1,6 +1,6 @@
 # ==================== apps/suppliers/admin.py ====================
 from django.contrib import admin
-from .models import Supplier
+from .models import ExchangeRate, Supplier
 
 @admin.register(Supplier)
 class SupplierAdmin(admin.ModelAdmin):
@@ -8,4 +8,11 @@ class SupplierAdmin(admin.ModelAdmin):
     list_filter = ['country', 'city', 'devise', 'is_active', 'created_at']
     search_fields = ['name', 'country', 'city', 'whatsapp']
     readonly_fields = ['created_at', 'updated_at']
-    ordering = ['country', 'city', 'name']
\ No newline at end of file
+    ordering = ['country', 'city', 'name']
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    # Taux flottants initialisés à des valeurs indicatives (migration 0011) : à mettre à jour ici
+    list_display = ['devise', 'taux', 'updated_at']
+    list_editable = ['taux']
+    readonly_fields = ['updated_at']
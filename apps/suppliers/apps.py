@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class SuppliersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.suppliers'
-    verbose_name = 'Fournisseurs'
\ No newline at end of file
+    verbose_name = 'Fournisseurs'
+    # Jeux de données de la commande export_catalog (apps/core)
+    exporters = {'suppliers': 'apps.suppliers.views.SupplierViewSet'}
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,119 @@
+# ==================== apps/suppliers/directory.py ====================
+"""
+Annuaire pays → villes → localisations des fournisseurs, en mémoire.
+
+Construit en une requête GROUP BY (nombre de fournisseurs, dont actifs, par
+pays / ville / localisation), dans l'ordre de tri de la base. Les signaux de
+Supplier le vident localement. Avec un cache partagé (CACHE_URL), les autres
+workers voient la version 'suppliers' changer (apps/core/caching.py) et le
+reconstruisent au prochain appel ; sans cache partagé, les versions sont
+propres à chaque processus et l'annuaire est reconstruit au plus tard après
+SUPPLIER_DIRECTORY_TIMEOUT secondes. Les endpoints countries / cities /
+directory ne font donc plus de DISTINCT à chaque appel.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from apps.core.caching import get_versions
+
+NAMESPACE = 'suppliers'
+
+
+def format_city(city, localisation):
+    """Libellé historique de l'endpoint cities : 'ville - localisation'"""
+    return f"{city} - {localisation}" if localisation else city
+
+
+class SupplierDirectory:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None  # (version, expiration, arbre)
+
+    def _timeout(self):
+        return getattr(settings, 'SUPPLIER_DIRECTORY_TIMEOUT', 60)
+
+    def _build(self):
+        from .models import Supplier
+
+        rows = (
+            Supplier.objects
+            .values('country', 'city', 'localisation')
+            .annotate(count=Count('*'), active=Count('is_active', filter=Q(is_active=True)))
+            .order_by('country', 'city', 'localisation')
+        )
+        tree = {}
+        for row in rows:
+            country = tree.setdefault(row['country'], {'count': 0, 'active': 0, 'cities': {}})
+            city = country['cities'].setdefault(row['city'], {'count': 0, 'active': 0, 'localisations': {}})
+            city['localisations'][row['localisation']] = {'count': row['count'], 'active': row['active']}
+            for node in (country, city):
+                node['count'] += row['count']
+                node['active'] += row['active']
+        return tree
+
+    def _is_current(self, state, version):
+        return state is not None and state[0] == version and time.monotonic() < state[1]
+
+    def _get_tree(self):
+        version = get_versions((NAMESPACE,))
+        state = self._state
+        if self._is_current(state, version):
+            return state[2]
+        with self._lock:
+            if not self._is_current(self._state, version):
+                self._state = (version, time.monotonic() + self._timeout(), self._build())
+            return self._state[2]
+
+    def invalidate(self):
+        self._state = None
+
+    def countries(self):
+        return list(self._get_tree())
+
+    def country_counts(self):
+        return [
+            {'country': country, 'count': node['count'], 'active': node['active']}
+            for country, node in self._get_tree().items()
+        ]
+
+    def cities(self, country):
+        """Libellés 'ville' / 'ville - localisation' d'un pays"""
+        node = self._get_tree().get(country)
+        if node is None:
+            return []
+        return [
+            format_city(city, localisation)
+            for city, city_node in node['cities'].items()
+            for localisation in city_node['localisations']
+        ]
+
+    def tree(self, country=None):
+        """Arbre complet (ou d'un pays) avec les effectifs à chaque niveau"""
+        return [
+            {
+                'country': name,
+                'count': node['count'],
+                'active': node['active'],
+                'cities': [
+                    {
+                        'city': city,
+                        'count': city_node['count'],
+                        'active': city_node['active'],
+                        'localisations': [
+                            {'localisation': localisation, **counts}
+                            for localisation, counts in city_node['localisations'].items()
+                        ],
+                    }
+                    for city, city_node in node['cities'].items()
+                ],
+            }
+            for name, node in self._get_tree().items()
+            if country is None or name == country
+        ]
+
+
+supplier_directory = SupplierDirectory()
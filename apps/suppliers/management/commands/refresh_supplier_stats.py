@@ -0,0 +1,17 @@
+# apps/suppliers/management/commands/refresh_supplier_stats.py
+
+from django.core.management.base import BaseCommand
+from apps.core.caching import invalidate
+from apps.suppliers.stats import rebuild_stats
+
+class Command(BaseCommand):
+    help = "Reconstruit les statistiques de prix des fournisseurs (après import SQL, restauration...)"
+
+    def handle(self, *args, **options):
+        groups = rebuild_stats()
+        invalidate('suppliers')
+        self.stdout.write(self.style.SUCCESS(f"\n✅ TERMINÉ - {groups} groupes de statistiques"))
+
+
+# UTILISATION :
+# python manage.py refresh_supplier_stats
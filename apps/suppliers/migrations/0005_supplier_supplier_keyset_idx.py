@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0004_alter_supplier_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['country', 'city', 'name', 'id'], name='supplier_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0005_supplier_supplier_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['updated_at', 'id'], name='supplier_updated_idx'),
+        ),
+    ]
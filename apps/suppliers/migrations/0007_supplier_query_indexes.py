@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0006_supplier_supplier_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='supplier',
+            name='country',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['country', 'city', 'name', 'id'], name='supplier_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['country', 'city', 'localisation'], include=('is_active',), name='supplier_location_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:19
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Parités fixes du franc CFA (BCEAO / BEAC) : valables quelle que soit la date
+FIXED_EUR_RATES = {'FCFA': 655.957, 'XAF': 655.957}
+
+
+def seed_fixed_rates(apps, schema_editor):
+    if getattr(settings, 'SUPPLIER_BASE_CURRENCY', 'EUR') != 'EUR':
+        return
+    ExchangeRate = apps.get_model('suppliers', 'ExchangeRate')
+    for devise, taux in FIXED_EUR_RATES.items():
+        ExchangeRate.objects.get_or_create(devise=devise, defaults={'taux': taux})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0007_supplier_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('devise', models.CharField(choices=[('FCFA', 'FCFA'), ('MAD', 'MAD'), ('EUR', 'EUR'), ('USD', 'USD'), ('MRU', 'MRU'), ('GNF', 'GNF'), ('GHS', 'GHS'), ('XAF', 'XAF'), ('CDF', 'CDF')], max_length=10, unique=True)),
+                ('taux', models.FloatField(help_text='Ex: 655.957 pour FCFA si la devise de référence est EUR', validators=[django.core.validators.MinValueValidator(1e-06)])),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Taux de change',
+                'verbose_name_plural': 'Taux de change',
+                'ordering': ['devise'],
+            },
+        ),
+        migrations.RunPython(seed_fixed_rates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0008_exchange_rates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierPriceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country', models.CharField(max_length=100)),
+                ('city', models.CharField(blank=True, max_length=100, null=True)),
+                ('devise', models.CharField(blank=True, choices=[('FCFA', 'FCFA'), ('MAD', 'MAD'), ('EUR', 'EUR'), ('USD', 'USD'), ('MRU', 'MRU'), ('GNF', 'GNF'), ('GHS', 'GHS'), ('XAF', 'XAF'), ('CDF', 'CDF')], max_length=10, null=True)),
+                ('is_active', models.BooleanField(null=True)),
+                ('count', models.PositiveIntegerField()),
+                ('prix_min', models.FloatField()),
+                ('prix_median', models.FloatField()),
+                ('prix_max', models.FloatField()),
+                ('prix_moyen', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Statistiques de prix',
+                'verbose_name_plural': 'Statistiques de prix',
+                'ordering': ['country', 'city', 'devise'],
+                'constraints': [models.UniqueConstraint(fields=('country', 'city', 'devise', 'is_active'), name='supplier_price_stats_key', nulls_distinct=False)],
+            },
+        ),
+    ]
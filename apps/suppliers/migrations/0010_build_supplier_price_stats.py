@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def build_stats(apps, schema_editor):
+    from apps.suppliers.stats import rebuild_stats
+
+    rebuild_stats(apps.get_model('suppliers', 'Supplier'), apps.get_model('suppliers', 'SupplierPriceStats'))
+
+
+class Migration(migrations.Migration):
+    # Migration séparée : la contrainte unique (cible des upserts) est créée à la fin de 0009
+
+    dependencies = [
+        ('suppliers', '0009_supplier_price_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# Taux indicatifs pour 1 EUR (octobre 2026) des devises flottantes : sans
+# taux, les fournisseurs de ces devises n'ont pas de prix_normalise et
+# ?currency=<devise> répond 400. À tenir à jour dans l'admin (Taux de change) ;
+# un taux déjà saisi n'est jamais écrasé.
+INDICATIVE_EUR_RATES = {
+    'USD': 1.16,
+    'MAD': 10.7,
+    'MRU': 46.3,
+    'GNF': 10100.0,
+    'GHS': 12.6,
+    'CDF': 3320.0,
+}
+
+
+def seed_indicative_rates(apps, schema_editor):
+    if getattr(settings, 'SUPPLIER_BASE_CURRENCY', 'EUR') != 'EUR':
+        return
+    ExchangeRate = apps.get_model('suppliers', 'ExchangeRate')
+    for devise, taux in INDICATIVE_EUR_RATES.items():
+        ExchangeRate.objects.get_or_create(devise=devise, defaults={'taux': taux})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0010_build_supplier_price_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_indicative_rates, migrations.RunPython.noop),
+    ]
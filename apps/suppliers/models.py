@@ -40,7 +40,8 @@ class Supplier(models.Model):
         help_text="Nom du fournisseur (optionnel)"
     )
 
-    country = models.CharField(max_length=100, db_index=True)
+    # Pas d'index simple : préfixe des index composites (country, ...)
+    country = models.CharField(max_length=100)
     city = models.CharField(max_length=100, db_index=True)
 
     localisation = models.CharField(
@@ -73,6 +74,39 @@ class Supplier(models.Model):
         ordering = ['country', 'city', 'name']
         verbose_name = 'Fournisseur'
         verbose_name_plural = 'Fournisseurs'
+        indexes = [
+            # Ordre par défaut (country, city, name) et pagination par curseur (+ id)
+            models.Index(fields=['country', 'city', 'name', 'id'], name='supplier_keyset_idx'),
+            # Synchronisation incrémentale (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='supplier_updated_idx'),
+            # Listes filtrées sur is_active, dans l'ordre par défaut (country, city, name)
+            models.Index(
+                fields=['country', 'city', 'name', 'id'],
+                condition=models.Q(is_active=True),
+                name='supplier_active_idx',
+            ),
+            # Annuaire pays / villes / localisations : parcours d'index seul (is_active inclus)
+            models.Index(
+                fields=['country', 'city', 'localisation'],
+                include=['is_active'],
+                name='supplier_location_idx',
+            ),
+        ]
+    
+    # Champs des statistiques de prix (apps/suppliers/stats.py) et périmètre recalculé
+    STATS_FIELDS = ('country', 'city', 'devise', 'is_active', 'prix')
+    STATS_SCOPE_FIELDS = ('country', 'devise')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Périmètre lu en base : un changement de pays / devise recalcule aussi l'ancien, sans requête
+        if not instance.get_deferred_fields().intersection(cls.STATS_SCOPE_FIELDS):
+            instance._loaded_scope = instance.stats_scope()
+        return instance
+    
+    def stats_scope(self):
+        return (self.country, self.devise)
     
     def __str__(self):
         loc = f", {self.localisation}" if self.localisation else ""
@@ -80,7 +114,67 @@ class Supplier(models.Model):
         return f"{name_display} - {self.city}{loc}, {self.country}"
     
     # Auto-devise selon pays
-    def save(self, *args, **kwargs):
+    def set_default_devise(self):
         if not self.devise and self.country in self.COUNTRY_CURRENCY:
             self.devise = self.COUNTRY_CURRENCY[self.country]
+
+    def save(self, *args, **kwargs):
+        self.set_default_devise()
         super().save(*args, **kwargs)
+
+
+class ExchangeRate(models.Model):
+    """
+    Taux de change local : nombre d'unités de `devise` pour 1 unité de la
+    devise de référence (SUPPLIER_BASE_CURRENCY). Les prix normalisés sont
+    calculés à la requête : modifier un taux ne réécrit aucun fournisseur.
+    """
+    devise = models.CharField(max_length=10, choices=Supplier.DEVISE_CHOICES, unique=True)
+    taux = models.FloatField(
+        validators=[MinValueValidator(0.000001)],
+        help_text="Ex: 655.957 pour FCFA si la devise de référence est EUR"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['devise']
+        verbose_name = 'Taux de change'
+        verbose_name_plural = 'Taux de change'
+
+    def __str__(self):
+        return f"1 (référence) = {self.taux} {self.devise}"
+
+
+class SupplierPriceStats(models.Model):
+    """
+    Statistiques de prix par pays / ville / devise, tenues à jour par
+    apps/suppliers/stats.py. `city` NULL : tout le pays ; `is_active` NULL :
+    actifs et inactifs confondus.
+    """
+    country = models.CharField(max_length=100)
+    city = models.CharField(max_length=100, null=True, blank=True)
+    devise = models.CharField(max_length=10, choices=Supplier.DEVISE_CHOICES, null=True, blank=True)
+    is_active = models.BooleanField(null=True)
+
+    count = models.PositiveIntegerField()
+    prix_min = models.FloatField()
+    prix_median = models.FloatField()
+    prix_max = models.FloatField()
+    prix_moyen = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['country', 'city', 'devise']
+        verbose_name = 'Statistiques de prix'
+        verbose_name_plural = 'Statistiques de prix'
+        constraints = [
+            # Une ligne par groupe, NULL compris (cible des upserts)
+            models.UniqueConstraint(
+                fields=['country', 'city', 'devise', 'is_active'],
+                name='supplier_price_stats_key',
+                nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.country} / {self.city or '*'} ({self.devise}) : {self.count}"
@@ -0,0 +1,7 @@
+# ==================== apps/suppliers/pagination.py ====================
+from apps.core.pagination import CatalogPagination
+
+
+class SupplierPagination(CatalogPagination):
+    # Index composite suppliers_supplier(country, city, name, id)
+    keyset_ordering = ('country', 'city', 'name', 'id')
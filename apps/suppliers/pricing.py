@@ -0,0 +1,59 @@
+# ==================== apps/suppliers/pricing.py ====================
+"""
+Comparaison des prix fournisseurs entre devises.
+
+`prix_normalise` = prix / taux(devise) × taux(devise cible), calculé en SQL
+(sous-requête indexée sur ExchangeRate.devise) : triable et filtrable par
+Postgres, et toujours à jour après une modification de taux. Les taux (une
+dizaine de lignes) sont relus en base à chaque requête qui en a besoin
+(devise cible, ETag des listes) : jamais de montant calculé avec un taux
+périmé, quel que soit le worker qui a enregistré la modification.
+"""
+from django.conf import settings
+from django.db.models import Case, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Value, When
+
+
+def base_currency():
+    return getattr(settings, 'SUPPLIER_BASE_CURRENCY', 'EUR')
+
+
+def get_rates():
+    """{devise: taux} lus en base (une requête), la devise de référence valant toujours 1"""
+    from .models import ExchangeRate
+
+    rates = dict(ExchangeRate.objects.values_list('devise', 'taux'))
+    rates[base_currency()] = 1.0
+    return rates
+
+
+def get_rate(currency):
+    """Taux d'une devise (une requête) ; lève KeyError si elle n'a pas de taux"""
+    from .models import ExchangeRate
+
+    if currency == base_currency():
+        return 1.0
+    rate = ExchangeRate.objects.filter(devise=currency).values_list('taux', flat=True).first()
+    if rate is None:
+        raise KeyError(currency)
+    return rate
+
+
+def annotate_normalized_price(queryset, currency=None):
+    """
+    Ajoute `prix_normalise` (None si la devise du fournisseur n'a pas de taux).
+    Lève KeyError si `currency` n'a pas de taux.
+    """
+    from .models import ExchangeRate
+
+    target_rate = get_rate(currency) if currency else None
+    rate = Case(
+        When(devise=base_currency(), then=Value(1.0)),
+        default=Subquery(
+            ExchangeRate.objects.filter(devise=OuterRef('devise')).order_by().values('taux')[:1]
+        ),
+        output_field=FloatField(),
+    )
+    price = F('prix') / rate
+    if target_rate is not None:
+        price = price * Value(target_rate)
+    return queryset.annotate(prix_normalise=ExpressionWrapper(price, output_field=FloatField()))
@@ -1,13 +1,21 @@
 # ==================== apps/suppliers/serializers.py ====================
 from rest_framework import serializers
+from apps.core.sparse import SparseFieldsetSerializerMixin
 from .models import Supplier
 
-class SupplierSerializer(serializers.ModelSerializer):
+class SupplierSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    # Annoté par la vue (apps/suppliers/pricing.py) : prix dans la devise de référence ou ?currency=
+    prix_normalise = serializers.FloatField(read_only=True, default=None)
+
+    field_sources = {
+        'prix_normalise': ('prix', 'devise'),
+    }
+
     class Meta:
         model = Supplier
         fields = [
             'id', 'name', 'country', 'city', 'localisation', 'whatsapp',
-            'prix', 'devise', 'is_active', 'created_at', 'updated_at'
+            'prix', 'devise', 'prix_normalise', 'is_active', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
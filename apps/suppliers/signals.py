@@ -0,0 +1,75 @@
+# ==================== apps/suppliers/signals.py ====================
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from apps.core.bulk import in_bulk_operation
+from apps.core.caching import invalidate
+from apps.core.models import Tombstone
+from .directory import supplier_directory
+from .models import ExchangeRate, Supplier
+from .stats import schedule_refresh
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def supplier_changed(sender, instance, **kwargs):
+    """Invalide les réponses fournisseurs en cache et l'annuaire pays / villes"""
+    if in_bulk_operation():
+        return
+    invalidate('suppliers')
+    supplier_directory.invalidate()
+
+
+@receiver(post_delete, sender=Supplier)
+def supplier_deleted(sender, instance, **kwargs):
+    """Garde une trace de la suppression pour la synchronisation des clients"""
+    if in_bulk_operation():
+        return
+    Tombstone.record(instance)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def exchange_rate_changed(sender, instance, **kwargs):
+    """Les prix normalisés changent : réponses en cache invalidées"""
+    invalidate('suppliers')
+
+
+def touches_stats(update_fields):
+    return update_fields is None or not set(update_fields).isdisjoint(Supplier.STATS_FIELDS)
+
+
+@receiver(pre_save, sender=Supplier)
+def supplier_stats_scope(sender, instance, update_fields=None, **kwargs):
+    """
+    Périmètre (pays, devise) d'origine : mémorisé au chargement
+    (Supplier.from_db), relu en base seulement pour une instance construite
+    sans chargement
+    """
+    if instance.pk is None or getattr(instance, '_loaded_scope', None) is not None or not touches_stats(update_fields):
+        return
+    instance._loaded_scope = (
+        Supplier.objects.filter(pk=instance.pk).values_list(*Supplier.STATS_SCOPE_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Supplier)
+def supplier_stats_saved(sender, instance, update_fields=None, **kwargs):
+    """Recalcule les statistiques du périmètre (pays, devise), sauf si update_fields exclut leurs champs"""
+    if in_bulk_operation() or not touches_stats(update_fields):
+        return
+    previous = getattr(instance, '_loaded_scope', None)
+    current = instance.stats_scope()
+    instance._loaded_scope = current
+    schedule_refresh(*current)
+    # Changement de pays ou de devise : l'ancien périmètre perd une ligne
+    if previous is not None and previous != current:
+        schedule_refresh(*previous)
+
+
+@receiver(post_delete, sender=Supplier)
+def supplier_stats_deleted(sender, instance, **kwargs):
+    """Recalcule les statistiques du périmètre de la ligne supprimée"""
+    if in_bulk_operation():
+        return
+    schedule_refresh(*(getattr(instance, '_loaded_scope', None) or instance.stats_scope()))
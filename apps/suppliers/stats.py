@@ -0,0 +1,121 @@
+# ==================== apps/suppliers/stats.py ====================
+"""
+Statistiques de prix fournisseurs (min / médiane / max / moyenne) par pays,
+ville et devise, stockées dans SupplierPriceStats.
+
+Chaque groupe existe en quatre variantes : ville ou pays entier (`city`
+NULL), actifs / inactifs ou tous (`is_active` NULL). Un enregistrement ou
+une suppression de fournisseur recalcule seulement le périmètre touché
+(pays, devise) : une seule requête agrège ce périmètre dans Postgres (aucune
+ligne fournisseur remontée en Python) et met la table à jour. Les
+recalculs sont faits après le commit et une seule fois par périmètre et par
+transaction ; les opérations en masse recalculent les périmètres de leurs
+lignes, avant et après écriture (`refresh_scopes`) ; `rebuild_stats()`
+reconstruit toute la table (commande refresh_supplier_stats). L'endpoint /stats/ ne lit donc
+que des lignes déjà agrégées, quel que soit le nombre de fournisseurs.
+
+Les devises ne sont jamais mélangées : une médiane n'a de sens que dans une
+seule devise (voir prix_normalise, apps/suppliers/pricing.py, pour comparer).
+"""
+import threading
+
+from django.db import connection, transaction
+
+from apps.core.caching import invalidate
+
+STAT_FIELDS = ('count', 'prix_min', 'prix_median', 'prix_max', 'prix_moyen')
+KEY_FIELDS = ('country', 'city', 'devise', 'is_active')
+
+_pending = threading.local()
+
+# Agrégats calculés par Postgres (une passe, médiane comprise), upsert des
+# groupes obtenus et suppression des groupes disparus : une seule requête.
+# Les deux variantes (ville / pays entier, actifs-inactifs / tous) sont des
+# GROUPING SETS ; city et is_active ne sont jamais NULL dans la table des
+# fournisseurs, un NULL de regroupement ne se confond donc avec aucune ville.
+REFRESH_SQL = """
+WITH computed AS (
+    SELECT country, city, devise, is_active,
+           COUNT(*), MIN(prix), percentile_cont(0.5) WITHIN GROUP (ORDER BY prix), MAX(prix), AVG(prix)
+    FROM {suppliers}
+    WHERE {scope}
+    GROUP BY country, devise, GROUPING SETS ((city, is_active), (city), (is_active), ())
+), upserted AS (
+    INSERT INTO {stats} (country, city, devise, is_active, "count", prix_min, prix_median, prix_max, prix_moyen, updated_at)
+    SELECT computed.*, NOW() FROM computed
+    ON CONFLICT ON CONSTRAINT supplier_price_stats_key DO UPDATE SET
+        "count" = EXCLUDED."count", prix_min = EXCLUDED.prix_min, prix_median = EXCLUDED.prix_median,
+        prix_max = EXCLUDED.prix_max, prix_moyen = EXCLUDED.prix_moyen, updated_at = EXCLUDED.updated_at
+    RETURNING id
+)
+DELETE FROM {stats} WHERE {scope} AND id NOT IN (SELECT id FROM upserted)
+"""
+SCOPE_SQL = 'country = %s AND devise IS NOT DISTINCT FROM %s'
+
+
+def refresh_sql(supplier_model, stats_model, scope):
+    quote = connection.ops.quote_name
+    return REFRESH_SQL.format(
+        suppliers=quote(supplier_model._meta.db_table),
+        stats=quote(stats_model._meta.db_table),
+        scope=scope,
+    )
+
+
+def stats_scopes(queryset):
+    """Périmètres (pays, devise) des fournisseurs du queryset, en une requête"""
+    return set(queryset.order_by().values_list('country', 'devise').distinct())
+
+
+def refresh_scopes(scopes):
+    """
+    Recalcule chaque périmètre (pays, devise) ; une seule invalidation du cache.
+    Un verrou consultatif par périmètre sérialise les recalculs concurrents :
+    le second attend le premier puis relit les données à jour, un instantané
+    plus ancien ne peut pas écraser un plus récent.
+    """
+    from .models import Supplier, SupplierPriceStats
+
+    sql = refresh_sql(Supplier, SupplierPriceStats, SCOPE_SQL)
+    for country, devise in sorted(scopes, key=lambda scope: (scope[0], scope[1] or '')):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))',
+                [f'supplier_stats:{country}:{devise}'],
+            )
+            cursor.execute(sql, [country, devise, country, devise])
+    if scopes:
+        invalidate('suppliers')
+
+
+def refresh_scope(country, devise):
+    """Recalcule les statistiques d'un pays dans une devise"""
+    refresh_scopes({(country, devise)})
+
+
+def rebuild_stats(supplier_model=None, stats_model=None):
+    """Reconstruit toute la table (modèles passés par les migrations) ; retourne le nombre de groupes"""
+    if supplier_model is None:
+        from .models import Supplier as supplier_model, SupplierPriceStats as stats_model
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(refresh_sql(supplier_model, stats_model, 'TRUE'))
+    return stats_model.objects.count()
+
+
+def schedule_refresh(country, devise):
+    """
+    Recalcul du périmètre après le commit (immédiat hors transaction). Les
+    suppressions en masse envoient un signal par ligne : un seul recalcul
+    par périmètre est exécuté, les rappels suivants sont ignorés.
+    """
+    pending = _pending.__dict__.setdefault('scopes', set())
+    scope = (country, devise)
+    pending.add(scope)
+
+    def run():
+        if scope in pending:
+            pending.discard(scope)
+            refresh_scope(country, devise)
+
+    transaction.on_commit(run)
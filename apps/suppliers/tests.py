@@ -1,3 +1,451 @@
-from django.test import TestCase
+import statistics
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.core.pagination import KeysetPagination
+from apps.core.testing import FastReadComparisonMixin, walk_cursor
+from .directory import SupplierDirectory, supplier_directory
+from .models import ExchangeRate, Supplier, SupplierPriceStats
+from .pricing import annotate_normalized_price, get_rates
+from .stats import KEY_FIELDS, STAT_FIELDS, rebuild_stats, refresh_scope
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN spécifique à PostgreSQL')
+class SupplierIndexTests(TestCase):
+    """Le planificateur doit utiliser les index prévus pour les requêtes réelles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Supplier.objects.bulk_create([
+            Supplier(
+                name=f'F{i}',
+                country=['Maroc', 'Mali', 'Togo', 'Ghana'][i % 4],
+                city=f'Ville {i % 20}',
+                localisation=['Centre', 'Port', None][i % 3],
+                whatsapp='0',
+                prix=i,
+                devise='FCFA',
+                is_active=i % 5 != 0,
+            )
+            for i in range(2000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE suppliers_supplier')
+
+    def explain(self, queryset, *disabled):
+        # Table de test minuscule : écarter les plans qui ne passent pas par un index
+        with connection.cursor() as cursor:
+            for setting in ('enable_seqscan',) + disabled:
+                cursor.execute(f'SET LOCAL {setting} = off')
+        return queryset.explain()
+
+    def test_default_ordering_uses_composite_index(self):
+        plan = self.explain(Supplier.objects.filter(country='Mali')[:100])
+        self.assertIn('supplier_keyset_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_active_list_uses_partial_index(self):
+        plan = self.explain(Supplier.objects.filter(is_active=True).order_by('country', 'city', 'name', 'id')[:100])
+        self.assertIn('supplier_active_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_location_directory_is_index_only(self):
+        queryset = (
+            Supplier.objects
+            .values('country', 'city', 'localisation')
+            .annotate(count=Count('*'), active=Count('is_active', filter=Q(is_active=True)))
+            .order_by('country', 'city', 'localisation')
+        )
+        # Agrégat par groupes dans l'ordre de l'index (sans tri ni table de hachage)
+        plan = self.explain(queryset, 'enable_hashagg', 'enable_sort')
+        self.assertIn('supplier_location_idx', plan)
+        self.assertIn('Index Only Scan', plan)
+
+    def test_cities_lookup_uses_location_index(self):
+        plan = self.explain(
+            Supplier.objects.filter(country='Mali').values_list('city', 'localisation').distinct().order_by()
+        )
+        self.assertIn('supplier_location_idx', plan)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class SupplierCursorPaginationTests(TestCase):
+    """Parcours complet par curseur avec égalités et noms NULL"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Supplier.objects.bulk_create([
+            Supplier(
+                # Beaucoup d'égalités (pays, ville, nom) et de noms NULL
+                name=None if i % 3 == 0 else f'F{i % 4}',
+                country=['Mali', 'Togo'][i % 2],
+                city=f'Ville {i % 3}',
+                whatsapp='0',
+                prix=i,
+                devise='FCFA',
+            )
+            for i in range(61)
+        ])
+
+    def test_walk_returns_every_row_once_in_order(self):
+        rows = walk_cursor(self.client, '/api/suppliers/?cursor=&page_size=4')
+        ids = [row['id'] for row in rows]
+        self.assertEqual(len(ids), len(set(ids)))
+        expected = Supplier.objects.order_by(
+            'country', 'city', F('name').asc(nulls_last=True), 'id'
+        ).values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def walk_paginator(self, ordering, page_size=5):
+        """Parcours direct de KeysetPagination (clés décroissantes comprises)"""
+        factory = APIRequestFactory()
+        ids, cursor = [], None
+        while True:
+            paginator = KeysetPagination()
+            paginator.ordering = ordering
+            params = {'page_size': page_size}
+            if cursor:
+                params['cursor'] = cursor
+            rows = paginator.paginate_queryset(Supplier.objects.all(), Request(factory.get('/', params)))
+            ids.extend(row.pk for row in rows)
+            if paginator.next_position is None:
+                return ids
+            cursor = paginator.encode_cursor(paginator.next_position)
+
+    def test_nullable_keys_in_both_directions(self):
+        for ordering, name_order in (
+            (('name', 'id'), F('name').asc(nulls_last=True)),
+            (('-name', 'id'), F('name').desc(nulls_first=True)),
+            (('-name', '-id'), F('name').desc(nulls_first=True)),
+        ):
+            with self.subTest(ordering=ordering):
+                ids = self.walk_paginator(ordering)
+                self.assertEqual(len(ids), len(set(ids)))
+                id_order = '-id' if ordering[1] == '-id' else 'id'
+                expected = Supplier.objects.order_by(name_order, id_order).values_list('id', flat=True)
+                self.assertEqual(ids, list(expected))
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class SupplierFastReadTests(FastReadComparisonMixin, TestCase):
+    """Le chemin rapide (.values() + orjson) rend exactement les octets du serializer"""
+    fast_read_basename = 'supplier'
+
+    urls = [
+        '/api/suppliers/',
+        '/api/suppliers/?fields=name,prix,devise,prix_normalise',
+        '/api/suppliers/?omit=whatsapp,created_at',
+        '/api/suppliers/?cursor=&page_size=3',
+        '/api/suppliers/?currency=FCFA&ordering=prix_normalise,prix',
+        '/api/suppliers/?is_active=true&country=Mali',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        Supplier.objects.bulk_create([
+            Supplier(
+                name=f'Fournisseur {i}',
+                country=['Mali', 'Maroc'][i % 2],
+                city=f'Ville {i % 3}',
+                localisation=None if i % 2 else 'Centre',
+                whatsapp='00 11/22',
+                prix=1000 + i * 10.5,
+                devise=['FCFA', 'MAD', 'EUR'][i % 3],
+                is_active=i % 4 != 0,
+            )
+            for i in range(10)
+        ])
+
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class SupplierStatsTests(TestCase):
+    """Statistiques tenues à jour par périmètre (pays, devise), sans relecture à chaque enregistrement"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Supplier.objects.bulk_create([
+            Supplier(
+                name=f'F{i}',
+                country=['Maroc', 'Mali', 'Togo'][i % 3],
+                city=f'Ville {i % 4}',
+                whatsapp='0',
+                prix=100 + i * 10,
+                devise=['MAD', 'FCFA', 'FCFA'][i % 3],
+                is_active=i % 5 != 0,
+            )
+            for i in range(30)
+        ])
+        rebuild_stats()
+
+    def assertStatsUpToDate(self):
+        # Référence calculée en Python, toutes variantes (ville / pays, actifs / tous)
+        groups = {}
+        for country, city, devise, is_active, prix in Supplier.objects.values_list(*Supplier.STATS_FIELDS):
+            for group_city in (city, None):
+                for group_active in (is_active, None):
+                    groups.setdefault((country, group_city, devise, group_active), []).append(prix)
+        expected = {
+            key: (len(prices), min(prices), statistics.median(prices), max(prices), round(sum(prices) / len(prices), 6))
+            for key, prices in groups.items()
+        }
+        stored = {
+            tuple(row[:4]): (*row[4:-1], round(row[-1], 6))
+            for row in SupplierPriceStats.objects.values_list(*KEY_FIELDS, *STAT_FIELDS)
+        }
+        self.assertEqual(stored, expected)
+
+    def test_save_of_other_fields_reads_and_refreshes_nothing(self):
+        supplier = Supplier.objects.first()
+        supplier.whatsapp = '12'
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                supplier.save(update_fields=['whatsapp'])
+        # Un seul UPDATE : ni relecture des anciennes valeurs, ni recalcul des statistiques
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['UPDATE'])
+
+    def test_price_change_refreshes_scope_in_one_statement(self):
+        supplier = Supplier.objects.filter(country='Togo').first()
+        supplier.prix = 5000
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                supplier.save()
+        self.assertStatsUpToDate()
+        # UPDATE puis, après le commit : verrou du périmètre et recalcul (agrégat + upsert + purge) en SQL
+        self.assertEqual(sum('GROUPING SETS' in query['sql'] for query in queries), 1)
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT "suppliers_supplier"')])
+
+    def test_country_change_refreshes_old_and_new_scope(self):
+        supplier = Supplier.objects.filter(country='Maroc').first()
+        supplier.country = 'Mali'
+        supplier.devise = 'FCFA'
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                supplier.save()
+        # Anciennes valeurs connues depuis le chargement : pas de SELECT avant l'UPDATE
+        self.assertEqual(queries[0]['sql'].split()[0], 'UPDATE')
+        self.assertStatsUpToDate()
+
+    def test_bulk_update_and_delete_refresh_touched_scopes(self):
+        moved = list(Supplier.objects.filter(country='Maroc').values_list('pk', flat=True)[:3])
+        response = self.client.patch(
+            '/api/suppliers/bulk/',
+            [{'id': pk, 'country': 'Togo', 'devise': 'FCFA', 'prix': 5} for pk in moved],
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertStatsUpToDate()
+
+        deleted = list(Supplier.objects.filter(country='Mali').values_list('pk', flat=True))
+        response = self.client.delete(
+            '/api/suppliers/bulk/', {'ids': deleted},
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertStatsUpToDate()
+        self.assertFalse(SupplierPriceStats.objects.filter(country='Mali').exists())
+
+    def test_bulk_delete_query_count_independent_of_row_count(self):
+        maroc = list(Supplier.objects.filter(country='Maroc').values_list('pk', flat=True))
+        counts = []
+        # Le périmètre garde une ligne : même chemin de recalcul pour les deux lots
+        for ids in (maroc[:2], maroc[2:-1]):
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.delete(
+                        '/api/suppliers/bulk/', {'ids': ids},
+                        content_type='application/json', HTTP_HOST='localhost',
+                    )
+            self.assertEqual(response.status_code, 200, response.content)
+            counts.append(len(queries))
+        # Un DELETE pour tout le lot (pas de collecteur ni de signal par ligne)
+        self.assertEqual(counts[0], counts[1])
+        self.assertStatsUpToDate()
+
+
+@override_settings(API_CACHE_TIMEOUT=0)
+class SupplierConditionalGetTests(TestCase):
+    """ETag / Last-Modified : 304 en une seule requête de sonde, taux de change compris"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Supplier.objects.bulk_create([
+            Supplier(name=f'F{i}', country='Maroc', city='Rabat', whatsapp='0', prix=100 + i, devise='MAD')
+            for i in range(10)
+        ])
+        ExchangeRate.objects.update_or_create(devise='MAD', defaults={'taux': 10.8})
+
+    def get(self, url='/api/suppliers/', method='get', **headers):
+        return getattr(self.client, method)(url, HTTP_HOST='localhost', **headers)
+
+    def test_if_none_match_returns_304_with_one_query(self):
+        etag = self.get()['ETag']
+        for method in ('get', 'head'):
+            with self.subTest(method=method):
+                with self.assertNumQueries(1):
+                    response = self.get(method=method, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        last_modified = self.get()['Last-Modified']
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        supplier = Supplier.objects.first()
+        supplier.updated_at = timezone.now() + timedelta(seconds=5)
+        Supplier.objects.filter(pk=supplier.pk).update(updated_at=supplier.updated_at)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_deletion_is_seen_by_if_modified_since(self):
+        last_modified = self.get()['Last-Modified']
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(seconds=5)):
+            Supplier.objects.first().delete()
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_rate_change_changes_list_and_detail_etag(self):
+        pk = Supplier.objects.first().pk
+        urls = ['/api/suppliers/', f'/api/suppliers/{pk}/']
+        etags = [self.get(url)['ETag'] for url in urls]
+        ExchangeRate.objects.filter(devise='MAD').update(taux=11.0)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+
+class SupplierStatsConcurrencyTests(TransactionTestCase):
+    """Deux recalculs d'un même périmètre sont sérialisés : le second lit les données à jour"""
+
+    def test_waiting_refresh_reads_latest_data(self):
+        supplier = Supplier.objects.create(name='F', country='Maroc', city='Rabat', whatsapp='0', prix=100)
+
+        def refresh():
+            try:
+                refresh_scope('Maroc', 'MAD')
+            finally:
+                connection.close()
+
+        worker = threading.Thread(target=refresh)
+        with transaction.atomic():
+            # Recalcul concurrent en cours : il détient le verrou du périmètre
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))', ['supplier_stats:Maroc:MAD'])
+            worker.start()
+            worker.join(0.3)
+            self.assertTrue(worker.is_alive())
+            Supplier.objects.filter(pk=supplier.pk).update(prix=250)
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(
+            SupplierPriceStats.objects.get(country='Maroc', city=None, is_active=None).prix_max, 250
+        )
+
+
+class SupplierNormalizedPriceTests(TestCase):
+    """prix_normalise : toutes les devises ont un taux, tri entre devises, invalidation par les taux"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # 100 EUR dans chaque devise des pays connus, plus un prix plus bas en MAD
+        rates = get_rates()
+        Supplier.objects.bulk_create([
+            Supplier(name=country, country=country, city='Centre', whatsapp='0',
+                     devise=devise, prix=100 * rates[devise])
+            for country, devise in Supplier.COUNTRY_CURRENCY.items()
+        ] + [Supplier(name='Moins cher', country='Maroc', city='Rabat', whatsapp='0', devise='MAD', prix=500)])
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_every_country_currency_has_a_rate(self):
+        for devise in set(Supplier.COUNTRY_CURRENCY.values()):
+            with self.subTest(devise=devise):
+                self.get(f'/api/suppliers/?currency={devise}')
+        self.assertFalse(annotate_normalized_price(Supplier.objects.all()).filter(prix_normalise=None).exists())
+
+    @override_settings(API_CACHE_TIMEOUT=0)
+    def test_ordering_compares_prices_across_currencies(self):
+        rows = walk_cursor(self.client, '/api/suppliers/?ordering=prix_normalise')
+        self.assertEqual(rows[0]['name'], 'Moins cher')
+        self.assertAlmostEqual(rows[0]['prix_normalise'], 500 / get_rates()['MAD'])
+        prices = [row['prix_normalise'] for row in rows]
+        self.assertEqual(prices, sorted(prices))
+        for price in prices[1:]:
+            self.assertAlmostEqual(price, 100)
+
+    @override_settings(API_CACHE_ALLOW_LOCAL=True)
+    def test_rate_change_invalidates_cached_pages(self):
+        url = '/api/suppliers/?country=Maroc&ordering=prix_normalise'
+        self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+
+        rate = ExchangeRate.objects.get(devise='MAD')
+        rate.taux = rate.taux * 2
+        rate.save()
+        response = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertAlmostEqual(response.json()['results'][0]['prix_normalise'], 500 / rate.taux)
+
+        # Modification sans signal (.update()) : l'ETag de la sonde change quand même la clé
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+        ExchangeRate.objects.filter(devise='MAD').update(taux=rate.taux * 2)
+        self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+
+
+@override_settings(API_CACHE_TIMEOUT=0, SUPPLIER_DIRECTORY_TIMEOUT=3600)
+class SupplierDirectoryTests(TestCase):
+    """Annuaire en mémoire : créations et suppressions visibles avant l'expiration"""
+
+    def setUp(self):
+        caches['default'].clear()
+        supplier_directory.invalidate()
+        self.addCleanup(supplier_directory.invalidate)
+        self.supplier = Supplier.objects.create(name='A', country='Maroc', city='Rabat', whatsapp='0', prix=10)
+
+    def countries(self):
+        response = self.client.get('/api/suppliers/countries/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_create_and_delete_seen_within_ttl(self):
+        self.assertEqual(self.countries(), ['Maroc'])
+        response = self.client.post(
+            '/api/suppliers/', {'country': 'Togo', 'city': 'Lomé', 'whatsapp': '0', 'prix': 5},
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.countries(), ['Maroc', 'Togo'])
+
+        response = self.client.delete(f'/api/suppliers/{self.supplier.pk}/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.countries(), ['Togo'])
+
+    def test_bulk_create_seen_within_ttl(self):
+        self.countries()
+        response = self.client.post(
+            '/api/suppliers/bulk/', [{'country': 'Mali', 'city': 'Bamako', 'whatsapp': '0', 'prix': 5}],
+            content_type='application/json', HTTP_HOST='localhost',
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.countries(), ['Mali', 'Maroc'])
+
+    def test_other_worker_sees_change_through_shared_version(self):
+        other = SupplierDirectory()
+        self.assertEqual(other.countries(), ['Maroc'])
+        Supplier.objects.create(name='B', country='Ghana', city='Accra', whatsapp='0', prix=10)
+        self.assertEqual(other.countries(), ['Ghana', 'Maroc'])
@@ -1,18 +1,35 @@
 # ==================== apps/suppliers/views.py ====================
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Supplier
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+from apps.core.bulk import BulkMixin
+from apps.core.caching import CachedResponseMixin
+from apps.core.columnar import ColumnarMixin
+from apps.core.conditional import ConditionalGetMixin, scalar_subquery
+from apps.core.export import ExportMixin
+from apps.core.fastread import FastReadMixin
+from apps.core.sparse import SparseFieldsetMixin
+from apps.core.sync import SyncMixin
+from .directory import supplier_directory
+from .models import ExchangeRate, Supplier, SupplierPriceStats
+from .pagination import SupplierPagination
+from .pricing import annotate_normalized_price, base_currency, get_rates
+from .stats import refresh_scopes, stats_scopes
 from .serializers import (
     SupplierSerializer,
     SupplierCreateSerializer,
     SupplierUpdateSerializer
 )
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(BulkMixin, ExportMixin, SyncMixin, SparseFieldsetMixin, ConditionalGetMixin,
+                      CachedResponseMixin, ColumnarMixin, FastReadMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les fournisseurs
     
@@ -24,13 +41,27 @@ class SupplierViewSet(viewsets.ModelViewSet):
     destroy: Supprimer un fournisseur
     countries: Liste des pays disponibles
     cities: Liste des villes par pays
+    directory: Arbre pays / villes / localisations avec effectifs
+    rates: Taux de change des prix normalisés
+    stats: Prix min / médian / max / moyen par pays, ville et devise
+    sync: Modifications et suppressions depuis une date
+    export: Export CSV / NDJSON en flux
+    bulk: Création / modification / suppression en masse
     """
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['country', 'city', 'localisation', 'is_active', 'devise']
     search_fields = ['name', 'country', 'city', 'localisation', 'whatsapp']
-    ordering_fields = ['prix', 'created_at']
+    ordering_fields = ['prix', 'prix_normalise', 'created_at']
+    columnar_dictionary_fields = ('country', 'city', 'localisation', 'devise')
+    pagination_class = SupplierPagination
+    cache_namespaces = ('suppliers',)
+    bulk_create_serializer_class = SupplierCreateSerializer
+    bulk_update_serializer_class = SupplierUpdateSerializer
+    bulk_prepared_fields = ('devise',)
+    export_fields = ['id', 'name', 'country', 'city', 'localisation', 'whatsapp',
+                     'prix', 'devise', 'is_active', 'created_at', 'updated_at']
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -39,15 +70,76 @@ class SupplierViewSet(viewsets.ModelViewSet):
             return SupplierUpdateSerializer
         return SupplierSerializer
     
+    def prepare_bulk_instance(self, instance):
+        instance.set_default_devise()
+        return instance
+    
+    def bulk_snapshot(self, ids):
+        # Périmètres (pays, devise) d'origine : un fournisseur peut changer de pays
+        return stats_scopes(Supplier.objects.filter(pk__in=ids))
+    
+    def bulk_changed(self, ids=None, snapshot=None):
+        # bulk_create / bulk_update n'envoient pas de signaux : périmètres touchés recalculés
+        refresh_scopes(set(snapshot or ()) | stats_scopes(Supplier.objects.filter(pk__in=ids or [])))
+        super().bulk_changed(ids, snapshot)
+        supplier_directory.invalidate()
+    
     def get_queryset(self):
         queryset = super().get_queryset()
         is_active = self.request.query_params.get('is_active', None)
         if is_active is not None:
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
+        
+        # Prix comparables entre devises, calculés en SQL (triables / filtrables)
+        currency = self.request.query_params.get('currency')
+        try:
+            queryset = annotate_normalized_price(queryset, currency)
+        except KeyError:
+            raise ParseError({'error': f"Aucun taux de change pour la devise {currency}"})
+        
+        for param, lookup in (('prix_normalise_min', 'gte'), ('prix_normalise_max', 'lte')):
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                queryset = queryset.filter(**{f'prix_normalise__{lookup}': float(value)})
+            except ValueError:
+                raise ParseError({'error': f'Le paramètre {param} doit être un nombre'})
         return queryset
     
+    def get_probe_annotations(self):
+        # Les taux de change entrent dans prix_normalise : leur contenu fait partie de l'ETag
+        return {'rates': scalar_subquery(ExchangeRate.objects.all(), StringAgg(
+            Concat('devise', Value('='), Cast('taux', CharField())), ',', order_by='devise'
+        ))}
+    
+    @swagger_auto_schema(
+        operation_description="Liste des fournisseurs ; prix_normalise compare les prix entre devises",
+        manual_parameters=[
+            openapi.Parameter('currency', openapi.IN_QUERY,
+                            description="Devise de prix_normalise (défaut : devise de référence)",
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('prix_normalise_min', openapi.IN_QUERY,
+                            description="Prix normalisé minimum",
+                            type=openapi.TYPE_NUMBER),
+            openapi.Parameter('prix_normalise_max', openapi.IN_QUERY,
+                            description="Prix normalisé maximum",
+                            type=openapi.TYPE_NUMBER),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @swagger_auto_schema(
+        operation_description="Taux de change utilisés pour prix_normalise (unités de devise pour 1 unité de référence)"
+    )
+    @action(detail=False, methods=['get'])
+    def rates(self, request):
+        """Taux de change connus"""
+        return Response({'base': base_currency(), 'rates': get_rates()})
+    
     @swagger_auto_schema(
-        operation_description="Récupérer la liste des pays disponibles",
+        operation_description="Récupérer la liste des pays disponibles (?counts=true : avec le nombre de fournisseurs)",
         responses={200: openapi.Response('Liste des pays', schema=openapi.Schema(
             type=openapi.TYPE_ARRAY,
             items=openapi.Schema(type=openapi.TYPE_STRING)
@@ -55,9 +147,10 @@ class SupplierViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=['get'])
     def countries(self, request):
-        """Récupérer la liste des pays uniques"""
-        countries = Supplier.objects.values_list('country', flat=True).distinct().order_by('country')
-        return Response(list(countries))
+        """Récupérer la liste des pays uniques (annuaire en mémoire)"""
+        if request.query_params.get('counts', '').lower() == 'true':
+            return Response(supplier_directory.country_counts())
+        return Response(supplier_directory.countries())
     
     @swagger_auto_schema(
         operation_description="Récupérer les villes d'un pays spécifique",
@@ -81,11 +174,56 @@ class SupplierViewSet(viewsets.ModelViewSet):
                 {'error': 'Le paramètre country est requis'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        # Inclut la localisation dans la récupération des villes
-        cities = Supplier.objects.filter(country=country).values_list('city', 'localisation').distinct()
         # Formatage : "ville - localisation" si localisation existante
-        formatted_cities = [
-            f"{city} - {localisation}" if localisation else city
-            for city, localisation in cities
+        return Response(supplier_directory.cities(country))
+    
+    @swagger_auto_schema(
+        operation_description="Arbre pays → villes → localisations avec le nombre de fournisseurs (total et actifs)",
+        manual_parameters=[
+            openapi.Parameter('country', openapi.IN_QUERY, 
+                            description="Limiter l'arbre à un pays", 
+                            type=openapi.TYPE_STRING)
         ]
-        return Response(formatted_cities)
+    )
+    @action(detail=False, methods=['get'])
+    def directory(self, request):
+        """Annuaire complet des emplacements en un appel"""
+        return Response(supplier_directory.tree(request.query_params.get('country')))
+    
+    @swagger_auto_schema(
+        operation_description=(
+            "Prix min / médian / max / moyen par pays et ville (city=null : tout le pays), "
+            "une ligne par devise. Lu dans la table de statistiques tenue à jour."
+        ),
+        manual_parameters=[
+            openapi.Parameter('country', openapi.IN_QUERY,
+                            description="Limiter à un pays",
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('city', openapi.IN_QUERY,
+                            description="Limiter à une ville",
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('devise', openapi.IN_QUERY,
+                            description="Limiter à une devise",
+                            type=openapi.TYPE_STRING),
+            openapi.Parameter('is_active', openapi.IN_QUERY,
+                            description="true / false (défaut : tous les fournisseurs)",
+                            type=openapi.TYPE_BOOLEAN),
+        ]
+    )
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Statistiques de prix pré-agrégées"""
+        return self.cached_response(request, self.stats_response)
+    
+    def stats_response(self, request):
+        params = request.query_params
+        is_active = params.get('is_active')
+        queryset = SupplierPriceStats.objects.filter(
+            is_active=None if is_active is None else is_active.lower() == 'true'
+        )
+        for field in ('country', 'city', 'devise'):
+            if params.get(field):
+                queryset = queryset.filter(**{field: params[field]})
+        return Response(list(queryset.values(
+            'country', 'city', 'devise', 'count', 'prix_min', 'prix_median', 'prix_max', 'prix_moyen'
+        )))
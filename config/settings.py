@@ -46,6 +46,23 @@ cloudinary.config(
     secure=True
 )
 
+# Cache des images par défaut des catégories (par worker, partageable via CACHES)
+CATEGORY_IMAGE_CACHE_TIMEOUT = env.int('CATEGORY_IMAGE_CACHE_TIMEOUT', default=300)
+CATEGORY_IMAGE_CACHE_ALIAS = env('CATEGORY_IMAGE_CACHE_ALIAS', default=None)
+# Relecture de la version partagée au plus une fois par intervalle (s) et par worker
+CATEGORY_IMAGE_VERSION_CHECK_INTERVAL = env.int('CATEGORY_IMAGE_VERSION_CHECK_INTERVAL', default=2)
+
+# Nombre d'URLs Cloudinary mémorisées par worker (une entrée par version d'image)
+CLOUDINARY_URL_CACHE_SIZE = env.int('CLOUDINARY_URL_CACHE_SIZE', default=50000)
+
+# Index de suggestions produits en mémoire (reconstruit après ce délai, en secondes)
+PRODUCT_SUGGEST_INDEX_TIMEOUT = env.int('PRODUCT_SUGGEST_INDEX_TIMEOUT', default=900)
+# Rattrapage des modifications des autres workers (immédiat avec un cache partagé)
+PRODUCT_SUGGEST_SYNC_INTERVAL = env.int('PRODUCT_SUGGEST_SYNC_INTERVAL', default=30)
+
+# Bornes des tranches de prix de /api/products/facets/ (surchargeables par ?price_bounds=)
+PRODUCT_FACET_PRICE_BOUNDS = env.list('PRODUCT_FACET_PRICE_BOUNDS', cast=float, default=[2000, 3500, 5000])
+
 # En développement, ajouter http
 if DEBUG:
     CSRF_TRUSTED_ORIGINS.extend([
@@ -116,6 +133,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party
     'rest_framework',
@@ -125,6 +143,7 @@ INSTALLED_APPS = [
     'cloudinary_storage',
     
     # Local apps
+    'apps.core',
     'apps.products',
     'apps.suppliers',
 ]
@@ -175,6 +194,20 @@ else:
         'default': env.db('DATABASE_URL', default='postgresql://parfum_user:parfum_pass@db:5432/parfum_db')
     }
 
+# Cache (CACHE_URL partagé entre workers en production, ex: redis://...)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Cache des réponses GET de l'API (clés versionnées, invalidées par signaux)
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = env.int('API_CACHE_TIMEOUT', default=300)
+# Cache local au processus accepté (un seul worker) ; sinon cache désactivé sans CACHE_URL partagé
+API_CACHE_ALLOW_LOCAL = env.bool('API_CACHE_ALLOW_LOCAL', default=False)
+
+# Synchronisation incrémentale : marge (s) pour les transactions lentes
+SYNC_SAFETY_MARGIN = env.int('SYNC_SAFETY_MARGIN', default=5)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -192,16 +225,43 @@ USE_TZ = True
 # Static files
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Envoi des images produits en arrière-plan (fichier reçu en base, processus dédié ;
+# IMAGE_UPLOAD_TEMP_DIR : copie locale le temps de l'envoi)
+IMAGE_UPLOAD_ASYNC = env.bool('IMAGE_UPLOAD_ASYNC', default=True)
+# 'worker' : processus dédié (process_image_uploads --loop) ; 'thread' : pool dans le worker web
+IMAGE_UPLOAD_QUEUE = env('IMAGE_UPLOAD_QUEUE', default='worker')
+IMAGE_UPLOAD_WORKERS = env.int('IMAGE_UPLOAD_WORKERS', default=2)
+IMAGE_UPLOAD_BACKEND = env('IMAGE_UPLOAD_BACKEND', default='apps.products.uploads.CloudinaryBackend')
+IMAGE_UPLOAD_TEMP_DIR = env('IMAGE_UPLOAD_TEMP_DIR', default=str(MEDIA_ROOT / 'uploads'))
+
+# Miniatures responsives générées avec Pillow (processus dédiés)
+IMAGE_VARIANT_WIDTHS = env.list('IMAGE_VARIANT_WIDTHS', cast=int, default=[80, 160, 320, 640])
+IMAGE_VARIANT_FORMATS = env.list('IMAGE_VARIANT_FORMATS', default=['webp', 'avif'])
+IMAGE_VARIANT_QUALITY = env.int('IMAGE_VARIANT_QUALITY', default=75)
+IMAGE_VARIANT_PROCESSES = env.int('IMAGE_VARIANT_PROCESSES', default=1)
+# Stockage des miniatures (défaut : STORAGES['default'], Cloudinary)
+IMAGE_VARIANT_STORAGE = env('IMAGE_VARIANT_STORAGE', default=None)
+
+# Annuaire pays / villes des fournisseurs en mémoire : reconstruit au plus tard après ce délai (s)
+SUPPLIER_DIRECTORY_TIMEOUT = env.int('SUPPLIER_DIRECTORY_TIMEOUT', default=60)
+
+# Devise de référence des prix fournisseurs normalisés (taux dans ExchangeRate)
+SUPPLIER_BASE_CURRENCY = env('SUPPLIER_BASE_CURRENCY', default='EUR')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# Fichiers envoyés et miniatures sur Cloudinary ; DEFAULT_FILE_STORAGE / STATICFILES_STORAGE
+# sont ignorés depuis Django 5.1 (sinon : disque local du conteneur, non servi en production)
+STORAGES = {
+    'default': {'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
 
 # REST Framework
 REST_FRAMEWORK = {
@@ -218,6 +278,9 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Lecture rapide des listes (.values() + orjson) : basenames des viewsets concernés
+API_FAST_READ_VIEWSETS = env.list('API_FAST_READ_VIEWSETS', default=[])
+
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = DEBUG
 if not DEBUG: